@@ -1,107 +1,1740 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 import os
 from datetime import datetime, timedelta
 import random
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import csv
+import hashlib
+import sqlite3
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from bs4 import BeautifulSoup
+from lxml import etree
+import io
 import re
+import numpy as np
+import threading
+import time
+import bisect
+import math
+import zlib
+import functools
+import contextvars
+import cProfile
+import pstats
+import hmac
+import tempfile
+import gzip
+import brotli
+import orjson
+import asyncio
+import aiohttp
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from urllib.parse import urlsplit, parse_qs
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from zoneinfo import ZoneInfo
+
+try:
+    import fcntl
+except ImportError:  # Windows: the prefetch budget can't be shared between processes
+    fcntl = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson, several times faster on chart-sized payloads.
+
+    Output is compact UTF-8 in dict order (no sort_keys or indent); types
+    orjson doesn't handle go through DefaultJSONProvider.default.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Straight to bytes, skipping the str round trip of the default implementation
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.options | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Initialize VADER sentiment analyzer
 vader_analyzer = SentimentIntensityAnalyzer()
 
-def get_real_stock_data(symbol):
-    """Fetch real stock data from Yahoo Finance API with Indian stock support"""
-    try:
-        # List of Indian stocks that need .NS suffix
-        indian_stocks = [
-            'TCS', 'INFY', 'WIPRO', 'HCLTECH', 'TECHM', 'HDFCBANK', 'ICICIBANK', 'KOTAKBANK', 
-            'AXISBANK', 'SBIN', 'RELIANCE', 'HINDUNILVR', 'ITC', 'BHARTIARTL', 'MARUTI', 
-            'SUNPHARMA', 'DRREDDY', 'CIPLA', 'DIVISLAB', 'BIOCON', 'ONGC', 'IOC', 'BPCL', 
-            'ADANIGREEN', 'TATAPOWER', 'ZOMATO', 'PAYTM', 'POLICYBZR', 'NAZARA'
-        ]
-        
-        # Add .NS suffix for Indian stocks
-        yahoo_symbol = f"{symbol}.NS" if symbol in indian_stocks else symbol
+# Stock data cache settings (TTL is shorter while the symbol's exchange is trading)
+STOCK_CACHE_MAX_ENTRIES = int(os.environ.get('STOCK_CACHE_MAX_ENTRIES', 256))
+STOCK_CACHE_TTL_OPEN = float(os.environ.get('STOCK_CACHE_TTL_OPEN', 60))
+STOCK_CACHE_TTL_CLOSED = float(os.environ.get('STOCK_CACHE_TTL_CLOSED', 900))
+# How long an expired price entry is kept as last-known-good data: served
+# (labelled with its age) while a refresh runs, or when the refresh fails
+STOCK_CACHE_STALE_TTL = float(os.environ.get('STOCK_CACHE_STALE_TTL', 7 * 86400))
+
+# Bulk price lookups: symbols per spark request and the range fetched per mode
+SPARK_BATCH_SIZE = int(os.environ.get('SPARK_BATCH_SIZE', 20))
+BULK_PRICE_RANGES = {
+    'quote': '10d'  # about 7 trading days, enough for the homepage sparkline
+}
+
+# Shared pool for fanning out independent upstream calls, and the time budget
+# /api/analyze_sentiment waits on them before answering with partial data
+UPSTREAM_EXECUTOR_WORKERS = int(os.environ.get('UPSTREAM_EXECUTOR_WORKERS', 16))
+ANALYZE_DEADLINE_SECONDS = float(os.environ.get('ANALYZE_DEADLINE_SECONDS', 10))
+
+# Clients may ask for chart_data and sentiment_data as columns
+# ({"date": [...], "price": [...], ...}) instead of one object per point,
+# with ?format=columnar or this media type in Accept
+COLUMNAR_MEDIA_TYPE = 'application/vnd.stock-sentiment.columnar+json'
+
+# Sections analyze_stock can produce, and limits for the batch endpoint
+ANALYZE_SECTIONS = ('news', 'prices', 'sentiment_data', 'insights', 'keywords')
+BATCH_MAX_SYMBOLS = int(os.environ.get('BATCH_MAX_SYMBOLS', 200))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 8))
+
+# Listings file loaded into the symbol registry at import; point SYMBOLS_FILE
+# at a full NSE/NYSE/NASDAQ export to serve a larger universe
+SYMBOLS_FILE = os.environ.get('SYMBOLS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symbols.csv'))
+
+# Sentiment result memo: in-memory LRU size, plus an optional SQLite file
+# (e.g. on a mounted volume) so results survive worker restarts
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.environ.get('SENTIMENT_CACHE_MAX_ENTRIES', 10000))
+SENTIMENT_CACHE_DB = os.environ.get('SENTIMENT_CACHE_DB', '')
+SENTIMENT_CACHE_DB_MAX_ROWS = int(os.environ.get('SENTIMENT_CACHE_DB_MAX_ROWS', 200000))
+
+# Optional SQLite file of daily OHLCV bars. When set, chart refreshes only
+# download bars since the last stored one and longer ranges are read from disk.
+PRICE_HISTORY_DB = os.environ.get('PRICE_HISTORY_DB', '')
+# Chart ranges get_real_stock_data and /api/price_history accept, in days
+PRICE_HISTORY_RANGES = {'30d': 30, '3mo': 92, '1y': 366, '5y': 1827}
+# Intraday bar sizes, with the ranges Yahoo serves each of them for
+# (1m bars only go back about a week). Intraday charts are never stored on disk.
+PRICE_INTRADAY_RANGES = {'1m': ('1d', '5d'), '5m': ('1d', '5d', '1mo'), '15m': ('1d', '5d', '1mo')}
+
+# Long price series are downsampled with Largest-Triangle-Three-Buckets to
+# ?points= (default CHART_DEFAULT_POINTS, at most CHART_MAX_POINTS) before
+# they are sent; market cards default to SPARKLINE_DEFAULT_POINTS
+CHART_DEFAULT_POINTS = int(os.environ.get('CHART_DEFAULT_POINTS', 500))
+CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 5000))
+SPARKLINE_DEFAULT_POINTS = int(os.environ.get('SPARKLINE_DEFAULT_POINTS', 60))
+
+# Upstream base URLs; point these at a local stand-in (benchmarks/yahoo_stub.py) to run offline
+YAHOO_QUERY_BASE_URL = os.environ.get('YAHOO_QUERY_BASE_URL', 'https://query1.finance.yahoo.com').rstrip('/')
+YAHOO_WEB_BASE_URL = os.environ.get('YAHOO_WEB_BASE_URL', 'https://finance.yahoo.com').rstrip('/')
+
+# Pooled HTTP client settings; keep HTTP_POOL_SIZE in line with gunicorn --threads
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 8))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+HTTP_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Per-host circuit breakers around upstream calls. A breaker opens when, over
+# its last CIRCUIT_BREAKER_WINDOW calls (and at least CIRCUIT_BREAKER_MIN_CALLS),
+# the share of failed calls (errors, 429, 5xx) or of calls slower than
+# CIRCUIT_BREAKER_SLOW_CALL_SECONDS reaches its threshold. While open, calls
+# fail immediately; after CIRCUIT_BREAKER_OPEN_SECONDS a few probe calls
+# decide whether it closes again.
+CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CIRCUIT_BREAKER_WINDOW = int(os.environ.get('CIRCUIT_BREAKER_WINDOW', 20))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.environ.get('CIRCUIT_BREAKER_MIN_CALLS', 10))
+CIRCUIT_BREAKER_ERROR_RATE = float(os.environ.get('CIRCUIT_BREAKER_ERROR_RATE', 0.5))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.environ.get('CIRCUIT_BREAKER_SLOW_CALL_SECONDS', 5))
+CIRCUIT_BREAKER_SLOW_CALL_RATE = float(os.environ.get('CIRCUIT_BREAKER_SLOW_CALL_RATE', 0.8))
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.environ.get('CIRCUIT_BREAKER_OPEN_SECONDS', 30))
+CIRCUIT_BREAKER_HALF_OPEN_PROBES = int(os.environ.get('CIRCUIT_BREAKER_HALF_OPEN_PROBES', 1))
+
+# Async upstream client (used by asgi_app): concurrent requests allowed per
+# upstream host, shared by every request handled on the event loop
+ASYNC_MAX_CONCURRENCY_PER_HOST = int(os.environ.get('ASYNC_MAX_CONCURRENCY_PER_HOST', 32))
+# Threads serving the Flask routes that have no async handler, like gunicorn --threads
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 8))
+
+# Background prefetch of the tracked universe (off by default). Intervals are
+# per symbol and depend on whether its exchange is open; the rate budget caps
+# every upstream request (retries and fallbacks included) made by the
+# scheduler across all symbols. The budget's state lives in
+# PREFETCH_BUDGET_FILE so that all worker processes on a host share it;
+# set it to '' to give each process its own budget.
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PREFETCH_INTERVAL_OPEN = float(os.environ.get('PREFETCH_INTERVAL_OPEN', 120))
+PREFETCH_INTERVAL_CLOSED = float(os.environ.get('PREFETCH_INTERVAL_CLOSED', 1800))
+PREFETCH_JITTER = float(os.environ.get('PREFETCH_JITTER', 0.1))
+PREFETCH_MAX_CALLS_PER_MINUTE = float(os.environ.get('PREFETCH_MAX_CALLS_PER_MINUTE', 60))
+PREFETCH_BUDGET_FILE = os.environ.get('PREFETCH_BUDGET_FILE', os.path.join(tempfile.gettempdir(), 'stock-sentiment-prefetch.budget'))
+# Comma-separated symbols to keep warm; defaults to every listing in the registry
+PREFETCH_SYMBOLS = os.environ.get('PREFETCH_SYMBOLS', '')
+
+# On-demand profiling of a single API request with ?profile=1. Only honoured
+# when the X-Profile-Token header matches PROFILE_TOKEN (unset disables it);
+# with PROFILE_DIR set, each profile is also saved there as a .prof file.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 25))
+
+# HTTP caching of API responses. max-age is what is left of the price and
+# news cache TTLs; afterwards browsers and the CDN may keep serving a response for
+# HTTP_STALE_WHILE_REVALIDATE seconds while they refetch it. Symbol search
+# only changes with SYMBOLS_FILE, so it is cached for SEARCH_RESPONSE_MAX_AGE.
+HTTP_STALE_WHILE_REVALIDATE = int(os.environ.get('HTTP_STALE_WHILE_REVALIDATE', 300))
+SEARCH_RESPONSE_MAX_AGE = int(os.environ.get('SEARCH_RESPONSE_MAX_AGE', 3600))
+# Responses at least this large are sent brotli- or gzip-compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+
+# Most of a Yahoo quote news page read when scraping headlines (pages run 1-2 MB)
+NEWS_PAGE_MAX_BYTES = int(os.environ.get('NEWS_PAGE_MAX_BYTES', 2 * 1024 * 1024))
+
+# How long fetched news stays cached when requested on demand
+NEWS_CACHE_TTL = float(os.environ.get('NEWS_CACHE_TTL', 300))
+
+# Near-duplicate news (the same story syndicated by several publishers) is
+# collapsed into one item before scoring. Two items are duplicates when the
+# Jaccard similarity of their word-bigram sets reaches NEWS_DUPLICATE_SIMILARITY;
+# MinHash LSH with NEWS_MINHASH_BANDS x NEWS_MINHASH_ROWS hashes finds the candidates.
+NEWS_DEDUP_ENABLED = os.environ.get('NEWS_DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+NEWS_DUPLICATE_SIMILARITY = float(os.environ.get('NEWS_DUPLICATE_SIMILARITY', 0.6))
+NEWS_MINHASH_BANDS = int(os.environ.get('NEWS_MINHASH_BANDS', 16))
+NEWS_MINHASH_ROWS = int(os.environ.get('NEWS_MINHASH_ROWS', 4))
+
+# Optional SQLite news archive. When set, news is stored once per item and
+# scored at ingest; analyze_sentiment reads a recent window from it and
+# refreshes a symbol in the background once its last fetch is NEWS_CACHE_TTL old.
+NEWS_ARCHIVE_DB = os.environ.get('NEWS_ARCHIVE_DB', '')
+NEWS_ARCHIVE_WINDOW_DAYS = float(os.environ.get('NEWS_ARCHIVE_WINDOW_DAYS', 7))
+NEWS_ARCHIVE_MAX_ITEMS = int(os.environ.get('NEWS_ARCHIVE_MAX_ITEMS', 8))
+
+# Daily sentiment series: half-life of the decayed mean and the rolling
+# windows reported alongside it, both in trading days
+SENTIMENT_DECAY_HALFLIFE_DAYS = float(os.environ.get('SENTIMENT_DECAY_HALFLIFE_DAYS', 3))
+SENTIMENT_ROLLING_WINDOWS = (3, 7, 30)
+
+# Regular trading sessions per market: (timezone, open, close)
+MARKET_HOURS = {
+    'US': (ZoneInfo('America/New_York'), (9, 30), (16, 0)),
+    'IN': (ZoneInfo('Asia/Kolkata'), (9, 15), (15, 30))
+}
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and coalesced loading.
+
+    With stale_ttl, expired entries are kept that much longer as stale
+    copies for get_stale() and get_or_revalidate().
+    """
+
+    def __init__(self, max_entries=256, stale_ttl=0):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, stored_at)
+        self._inflight = {}  # key -> Future shared by concurrent loaders
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def _lookup(self, key):
+        """Return (found, value) for a live entry; caller must hold the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        now = time.monotonic()
+        if entry[0] <= now:
+            if entry[0] + self.stale_ttl <= now:
+                del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def _lookup_stale(self, key):
+        """Return (value, age in seconds) for a retained expired entry, else (None, None); caller must hold the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        now = time.monotonic()
+        if not entry[0] <= now < entry[0] + self.stale_ttl:
+            return None, None
+        self.stale_hits += 1
+        return entry[1], now - entry[2]
+
+    def _store(self, key, value, ttl):
+        """Insert an entry and evict least recently used ones; caller must hold the lock"""
+        now = time.monotonic()
+        self._entries[key] = (now + ttl, value, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def peek(self, key):
+        """get without counting a hit or miss, for callers that count the lookup with record_lookup"""
+        with self._lock:
+            return self._lookup(key)[1]
+
+    def record_lookup(self, result):
+        """Count one lookup done through peek: 'hit', 'miss' or 'coalesced'"""
+        with self._lock:
+            if result == 'hit':
+                self.hits += 1
+            elif result == 'miss':
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def get_ttl(self, key):
+        """Seconds until key's live entry expires, or None if there is none; not counted as a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            remaining = entry[0] - time.monotonic()
+            return remaining if remaining > 0 else None
+
+    def get_stale(self, key):
+        """Return (value, age in seconds) of an expired entry still within stale_ttl, else (None, None)"""
+        with self._lock:
+            return self._lookup_stale(key)
+
+    def get_or_load(self, key, loader, ttl):
+        """Return the cached value or call loader() once, even for concurrent misses.
+
+        A loader result of None is handed to waiting callers but not cached.
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+        return self._load(key, future, loader, ttl)
+
+    def get_or_revalidate(self, key, loader, ttl, executor):
+        """Stale-while-revalidate get_or_load; returns (value, stale age in seconds or None).
+
+        When only a stale copy is left it is returned at once and loader()
+        runs on executor (once, however many callers see the stale copy);
+        a failed refresh leaves the stale copy in place. Without any copy
+        this blocks like get_or_load.
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value, None
+            stale, age = self._lookup_stale(key)
+            if stale is not None:
+                if key not in self._inflight:
+                    future = self._inflight[key] = Future()
+                    executor.submit(self._load, key, future, loader, ttl)
+                return stale, age
+        return self.get_or_load(key, loader, ttl), None
+
+    def refresh(self, key, loader, ttl):
+        """Reload key even while it is live; not counted as a lookup.
+
+        A load already in flight for key is awaited instead of starting
+        another, and concurrent misses wait for this one, as in get_or_load.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight[key] = Future()
+
+        if not is_leader:
+            return future.result()
+        return self._load(key, future, loader, ttl)
+
+    def _load(self, key, future, loader, ttl):
+        """Run loader() as the leader for key and settle future with its result"""
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if value is not None:
+                self._store(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'stale_hits': self.stale_hits,
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0
+            }
+
+class Metric:
+    """One Prometheus metric family; samples are keyed by a tuple of label values"""
+
+    type = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        return [f"{self.name}{format_metric_labels(self.label_names, labels)} {format_metric_value(value)}"]
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    # Covers a single headline score (tens of microseconds) up to a slow upstream call
+    DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(labels)
+            if sample is None:
+                # [per-bucket counts (last one is +Inf), sum]
+                sample = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            sample[0][index] += 1
+            sample[1] += value
+
+    def _render_sample(self, labels, value):
+        with self._lock:
+            counts, total = list(value[0]), value[1]
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            bucket_labels = format_metric_labels(self.label_names + ('le',), labels + (format_metric_value(bound),))
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        label_text = format_metric_labels(self.label_names, labels)
+        lines.append(f"{self.name}_sum{label_text} {format_metric_value(total)}")
+        lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics for /metrics, plus collectors that read existing stats() at scrape time"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        return self._add(Counter(self.prefix + name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._add(Gauge(self.prefix + name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self._add(Histogram(self.prefix + name, help_text, label_names, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """Register func() -> iterable of scrape-time metrics; usable as a decorator"""
+        self._collectors.append(func)
+        return func
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                for metric in collect():
+                    lines.extend(metric.render())
+            except Exception as e:
+                print(f"Error collecting metrics from {collect.__name__}: {e}")
+        return '\n'.join(lines) + '\n'
+
+def format_metric_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_metric_label(value)}"' for name, value in zip(names, values)) + '}'
+
+def escape_metric_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_metric_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+metrics = MetricsRegistry('stock_sentiment_')
+
+STAGE_SECONDS = metrics.histogram('stage_duration_seconds', 'Time spent in each analysis pipeline stage', ('stage',))
+UPSTREAM_REQUESTS = metrics.counter('upstream_requests_total', 'Upstream HTTP requests by host, market of the symbol asked for and outcome (ok, http_error, timeout, error, rejected)', ('host', 'market', 'outcome'))
+UPSTREAM_SECONDS = metrics.histogram('upstream_request_duration_seconds', 'Upstream HTTP request latency by host and market, including retries', ('host', 'market'))
+FALLBACKS = metrics.counter('fallbacks_total', 'Responses that used placeholder data, by kind and market', ('kind', 'market'))
+NEWS_DUPLICATES = metrics.counter('news_duplicates_total', 'Fetched news items collapsed into an earlier near-duplicate, by source', ('source',))
+DEADLINE_MISSES = metrics.counter('analysis_deadline_misses_total', 'Analysis fetches that missed ANALYZE_DEADLINE_SECONDS', ('source', 'market'))
+HTTP_IN_FLIGHT = metrics.gauge('http_requests_in_flight', 'Requests currently being handled, by endpoint', ('endpoint',))
+HTTP_SECONDS = metrics.histogram('http_request_duration_seconds', 'Request handling time by endpoint and status, including streamed bodies', ('endpoint', 'status'))
+
+class RequestTimings:
+    """Per-stage durations of one request, reported in its Server-Timing header"""
+
+    def __init__(self):
+        self._stages = {}  # stage -> [seconds, calls], in first-seen order
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header(self, total=None):
+        """Server-Timing value; stages that ran concurrently can add up to more than total"""
+        with self._lock:
+            stages = [(stage, seconds, calls) for stage, (seconds, calls) in self._stages.items()]
+        parts = []
+        for stage, seconds, calls in stages:
+            part = f"{stage};dur={seconds * 1000:.1f}"
+            if calls > 1:
+                part += f';desc="{calls} calls"'
+            parts.append(part)
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.1f}")
+        return ', '.join(parts)
+
+class RequestProfile:
+    """cProfile data for one request, gathered from every thread that worked on it"""
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Profile the calling thread until stop(profile)"""
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop(self, profile):
+        profile.disable()
+        with self._lock:
+            self._profiles.append(profile)
+
+    def run(self, func, *args):
+        profile = self.start()
+        try:
+            return func(*args)
+        finally:
+            self.stop(profile)
+
+    def summarize(self, label):
+        """Top functions by own time, and the path of the saved .prof file if PROFILE_DIR is set"""
+        with self._lock:
+            stats = pstats.Stats(*self._profiles)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        path = None
+        if PROFILE_DIR:
+            path = os.path.join(PROFILE_DIR, f"{label}-{int(time.time() * 1000)}.prof")
+            stats.dump_stats(path)
+        return {
+            'total_calls': stats.total_calls,
+            'total_seconds': round(stats.total_tt, 6),
+            'hot_functions': [{
+                'function': pstats.func_std_string(func),
+                'calls': calls,
+                'own_ms': round(own * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            } for func, (_, calls, own, cumulative, _) in rows],
+            'file': path
+        }
+
+# State of the request being handled; executor tasks see it through submit_in_context
+current_request_timings = contextvars.ContextVar('current_request_timings', default=None)
+current_request_profile = contextvars.ContextVar('current_request_profile', default=None)
+# RateBudget that every upstream request made in this context is charged to
+current_upstream_budget = contextvars.ContextVar('current_upstream_budget', default=None)
+
+def submit_in_context(executor, func, *args):
+    """executor.submit that keeps the caller's request timings (and profile, if any) for func"""
+    profile = current_request_profile.get()
+    if profile is not None:
+        return executor.submit(contextvars.copy_context().run, profile.run, func, *args)
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+def note_request_timing(stage, seconds):
+    """Add to the current request's Server-Timing, if a request is being timed"""
+    timings = current_request_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+def timed_stage(stage):
+    """Decorator recording each call's duration under stage in STAGE_SECONDS and the request's Server-Timing"""
+    labels = (stage,)
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    STAGE_SECONDS.observe(elapsed, labels)
+                    note_request_timing(stage, elapsed)
+            return async_wrapper
         
-        # Using Yahoo Finance API with specific parameters for 30 days of data
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{yahoo_symbol}?interval=1d&range=30d"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                STAGE_SECONDS.observe(elapsed, labels)
+                note_request_timing(stage, elapsed)
+        return wrapper
+    return decorate
+
+# Cache of Yahoo chart results keyed by resolved Yahoo symbol
+stock_data_cache = TTLCache(max_entries=STOCK_CACHE_MAX_ENTRIES, stale_ttl=STOCK_CACHE_STALE_TTL)
+
+# Cache of spark results keyed by "<mode>:<yahoo symbol>"
+bulk_price_cache = TTLCache(max_entries=STOCK_CACHE_MAX_ENTRIES * 2, stale_ttl=STOCK_CACHE_STALE_TTL)
+
+# Cache of processed news items keyed by our symbol
+news_cache = TTLCache(max_entries=STOCK_CACHE_MAX_ENTRIES)
+
+# Downsampled chart columns keyed by (yahoo symbol, range, interval, points,
+# source data_timestamp), so a refreshed source chart gets new entries
+downsampled_chart_cache = TTLCache(max_entries=STOCK_CACHE_MAX_ENTRIES * 4)
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of making an upstream call while the host's breaker is open"""
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open breaker for one upstream host.
+
+    acquire() before each call (raises CircuitOpenError when the call must
+    not be made) and record() its outcome afterwards.
+    """
+
+    FAILURE_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, host):
+        self.host = host
+        self.state = 'closed'
+        self._outcomes = deque(maxlen=CIRCUIT_BREAKER_WINDOW)  # (failed, slow) per recent call
+        self._opened_at = 0.0
+        self._probes = 0  # probe calls in flight while half-open
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def acquire(self):
+        """Admit a call; returns True when it is a half-open probe"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < CIRCUIT_BREAKER_OPEN_SECONDS:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit open for {self.host}")
+                self.state = 'half_open'
+                self._probes = 0
+            if self.state == 'half_open':
+                if self._probes >= CIRCUIT_BREAKER_HALF_OPEN_PROBES:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit half-open for {self.host}, probe in progress")
+                self._probes += 1
+                return True
+            return False
+
+    def record(self, probe, failed, elapsed):
+        slow = elapsed >= CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+        with self._lock:
+            self.calls += 1
+            self.failures += failed
+            self.slow_calls += slow
+            if probe:
+                self._probes = max(0, self._probes - 1)
+                if failed or slow:
+                    self._open()
+                elif self.state == 'half_open':
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                    print(f"Circuit closed for {self.host}")
+                return
+            if self.state != 'closed':
+                # Admitted before the breaker opened; the probes decide from here
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) < CIRCUIT_BREAKER_MIN_CALLS:
+                return
+            error_rate, slow_rate = self._rates()
+            if error_rate >= CIRCUIT_BREAKER_ERROR_RATE or slow_rate >= CIRCUIT_BREAKER_SLOW_CALL_RATE:
+                self._open()
+
+    def release(self, probe):
+        """Forget an admitted call that ended without an outcome (e.g. it was cancelled)"""
+        if probe:
+            with self._lock:
+                self._probes = max(0, self._probes - 1)
+
+    def _open(self):
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        print(f"Circuit opened for {self.host} for {CIRCUIT_BREAKER_OPEN_SECONDS:.0f}s")
+
+    def _rates(self):
+        if not self._outcomes:
+            return 0.0, 0.0
+        count = len(self._outcomes)
+        return (sum(failed for failed, _ in self._outcomes) / count,
+                sum(slow for _, slow in self._outcomes) / count)
+
+    def stats(self):
+        with self._lock:
+            error_rate, slow_rate = self._rates()
+            retry_in = None
+            if self.state == 'open':
+                retry_in = round(max(0.0, CIRCUIT_BREAKER_OPEN_SECONDS - (time.monotonic() - self._opened_at)), 1)
+            return {
+                'state': self.state,
+                'retry_in_seconds': retry_in,
+                'window_calls': len(self._outcomes),
+                'window_error_rate': round(error_rate, 3),
+                'window_slow_rate': round(slow_rate, 3),
+                'calls': self.calls,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened
+            }
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per upstream host, created on first use"""
+
+    def __init__(self, enabled=CIRCUIT_BREAKER_ENABLED):
+        self.enabled = enabled
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """Breaker for host, or None when breakers are disabled"""
+        if not self.enabled:
+            return None
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(host, CircuitBreaker(host))
+        return breaker
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'thresholds': {
+                'window': CIRCUIT_BREAKER_WINDOW,
+                'min_calls': CIRCUIT_BREAKER_MIN_CALLS,
+                'error_rate': CIRCUIT_BREAKER_ERROR_RATE,
+                'slow_call_seconds': CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+                'slow_call_rate': CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                'open_seconds': CIRCUIT_BREAKER_OPEN_SECONDS,
+                'half_open_probes': CIRCUIT_BREAKER_HALF_OPEN_PROBES
+            },
+            'hosts': {host: breaker.stats() for host, breaker in list(self._breakers.items())}
         }
+
+# Shared by http_session and async_upstream, so both see the same host health
+circuit_breakers = CircuitBreakerRegistry()
+
+class CircuitBreakerSession(requests.Session):
+    """requests.Session that routes every request through its host's circuit breaker.
+
+    market ('US' or 'IN', for the symbol the request is about) labels the
+    upstream metrics; requests not about one market count as 'unknown'.
+    """
+
+    def request(self, method, url, *args, market='unknown', **kwargs):
+        budget = current_upstream_budget.get()
+        if budget is not None:
+            budget.acquire()
+        host = urlsplit(url).netloc
+        breaker = circuit_breakers.get(host)
+        try:
+            probe = breaker.acquire() if breaker is not None else False
+        except CircuitOpenError:
+            UPSTREAM_REQUESTS.inc((host, market, 'rejected'))
+            raise
+        
+        started = time.monotonic()
+        outcome = 'error'
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            outcome = 'http_error' if response.status_code in CircuitBreaker.FAILURE_STATUSES else 'ok'
+            return response
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            if breaker is not None:
+                breaker.record(probe, outcome != 'ok', elapsed)
+            UPSTREAM_REQUESTS.inc((host, market, outcome))
+            UPSTREAM_SECONDS.observe(elapsed, (host, market))
+            note_request_timing('upstream', elapsed)
+
+class BudgetedRetry(Retry):
+    """Retry that charges each retried attempt to the current upstream budget, if any"""
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        budget = current_upstream_budget.get()
+        if budget is not None:
+            budget.acquire()
+        return retry
+
+def create_http_session():
+    """Build a keep-alive session that retries GETs on connection errors, 429 and 5xx"""
+    retry = BudgetedRetry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=0,  # a read timeout already cost us the full timeout, don't repeat it
+        status=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = CircuitBreakerSession()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': HTTP_USER_AGENT})
+    return session
+
+# Shared by all request threads; connections are opened lazily, after gunicorn forks
+http_session = create_http_session()
+
+# Worker threads are started lazily, so this is safe to create before gunicorn forks
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_EXECUTOR_WORKERS, thread_name_prefix='upstream')
+
+# Runs whole per-symbol pipelines for batch requests; kept separate from
+# upstream_executor because each pipeline itself submits to that pool
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+class AsyncUpstreamClient:
+    """aiohttp counterpart of http_session, with per-host concurrency caps and coalesced loads.
+
+    The session belongs to the event loop that first uses it; asgi_app opens
+    and closes it through the ASGI lifespan protocol.
+    """
+
+    RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, max_per_host=ASYNC_MAX_CONCURRENCY_PER_HOST):
+        self.max_per_host = max_per_host
+        self._session = None
+        self._semaphores = {}  # host -> asyncio.Semaphore
+        self._active = {}  # host -> requests currently holding its semaphore
+        self._inflight = {}  # (cache id, key) -> Task shared by concurrent loaders
+        self._background = set()  # spawned tasks, referenced until they finish
+        self.requests = 0
+        self.retries = 0
+        self.coalesced = 0
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            # Concurrency is capped by the per-host semaphores, not the connector
+            self._session = aiohttp.ClientSession(
+                headers={'User-Agent': HTTP_USER_AGENT},
+                connector=aiohttp.TCPConnector(limit=0, ttl_dns_cache=300)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._semaphores.clear()
+        self._active.clear()
+
+    async def get(self, url, params=None, as_json=True, timeout=10, max_bytes=None, market='unknown'):
+        """GET url and return parsed JSON (or the raw body), retrying connection errors, 429 and 5xx.
+
+        With as_json=False, max_bytes stops reading the body after that many bytes.
+        Raises CircuitOpenError without any I/O while the host's breaker is open.
+        market labels the upstream metrics, like CircuitBreakerSession's.
+        """
+        session = await self.start()
+        host = urlsplit(url).netloc
+        breaker = circuit_breakers.get(host)
+        try:
+            probe = breaker.acquire() if breaker is not None else False
+        except CircuitOpenError:
+            UPSTREAM_REQUESTS.inc((host, market, 'rejected'))
+            raise
         
-        response = requests.get(url, headers=headers, timeout=10)
-        data = response.json()
+        started = time.monotonic()
+        outcome = 'error'
+        try:
+            result = await self._get(session, host, url, params, as_json, timeout, max_bytes)
+            outcome = 'ok'
+            return result
+        except asyncio.CancelledError:
+            # Says nothing about the host's health
+            outcome = None
+            raise
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise
+        except aiohttp.ClientResponseError:
+            # _get only raises these for a final 429 or 5xx
+            outcome = 'http_error'
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            if outcome is None:
+                if breaker is not None:
+                    breaker.release(probe)
+            else:
+                if breaker is not None:
+                    breaker.record(probe, outcome != 'ok', elapsed)
+                UPSTREAM_REQUESTS.inc((host, market, outcome))
+                UPSTREAM_SECONDS.observe(elapsed, (host, market))
+                note_request_timing('upstream', elapsed)
+
+    async def _get(self, session, host, url, params, as_json, timeout, max_bytes):
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
         
-        if "chart" in data and "result" in data["chart"] and len(data["chart"]["result"]) > 0:
-            result = data["chart"]["result"][0]
-            
-            if "timestamp" in result and "indicators" in result:
-                timestamps = result["timestamp"]
-                quotes = result["indicators"]["quote"][0]
-                
-                # Get all available data points (up to 30 days)
-                chart_data = []
-                current_price = 0
-                previous_price = 0
-                
-                # Process all available timestamps
-                for i, timestamp in enumerate(timestamps):
-                    if (i < len(quotes["close"]) and 
-                        quotes["close"][i] is not None and 
-                        quotes["close"][i] > 0):
-                        
-                        price = float(quotes["close"][i])
-                        volume = int(quotes["volume"][i]) if quotes["volume"][i] is not None else 0
-                        
-                        chart_data.append({
-                            "date": timestamp * 1000,  # Convert to milliseconds
-                            "price": round(price, 2),  # Ensure 2 decimal places
-                            "volume": volume
-                        })
-                
-                # Get current and previous prices from the last two valid data points
-                if len(chart_data) >= 2:
-                    current_price = chart_data[-1]["price"]
-                    previous_price = chart_data[-2]["price"]
-                elif len(chart_data) == 1:
-                    current_price = chart_data[0]["price"]
-                    previous_price = current_price
-                else:
-                    # Fallback if no data
-                    current_price = 0
-                    previous_price = 0
-                
-                # Calculate price change
-                if previous_price == 0:
-                    previous_price = current_price
-                price_change = current_price - previous_price
-                price_change_percent = (price_change / previous_price) * 100 if previous_price != 0 else 0
-                
-                return {
-                    "chart_data": chart_data,
-                    "current_price": round(current_price, 2),
-                    "price_change": round(price_change, 2),
-                    "price_change_percent": round(price_change_percent, 2),
-                    "data_timestamp": datetime.now().isoformat(),
-                    "data_source": "Yahoo Finance (Real-time)"
-                }
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(HTTP_BACKOFF_FACTOR * (2 ** (attempt - 1)))
+            try:
+                async with semaphore:
+                    self.requests += 1
+                    self._active[host] = self._active.get(host, 0) + 1
+                    try:
+                        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                            if response.status in self.RETRY_STATUSES:
+                                if attempt < HTTP_MAX_RETRIES:
+                                    continue
+                                response.raise_for_status()
+                            if as_json:
+                                return await response.json(content_type=None)
+                            if max_bytes is None:
+                                return await response.read()
+                            body = bytearray()
+                            while len(body) < max_bytes:
+                                chunk = await response.content.read(max_bytes - len(body))
+                                if not chunk:
+                                    break
+                                body += chunk
+                            return bytes(body)
+                    finally:
+                        self._active[host] -= 1
+            except aiohttp.ClientConnectionError as e:
+                # A read timeout already cost us the full timeout, don't repeat it
+                if isinstance(e, asyncio.TimeoutError) or attempt == HTTP_MAX_RETRIES:
+                    raise
+
+    async def get_or_load(self, cache, key, loader, ttl):
+        """Async TTLCache.get_or_load: one loader task per key, awaited by every concurrent miss.
+
+        loader is a coroutine function; a None result is not cached. Callers
+        that stop waiting (e.g. at a deadline) don't cancel the shared load.
+        """
+        value = cache.peek(key)
+        if value is not None:
+            cache.record_lookup('hit')
+            return value
+        
+        inflight_key = (id(cache), key)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            cache.record_lookup('miss')
+            task = asyncio.ensure_future(self._load(cache, inflight_key, key, loader, ttl))
+            self._inflight[inflight_key] = task
         else:
-            # Fallback to simulated data if API fails
-            return get_simulated_stock_data(symbol)
-            
+            cache.record_lookup('coalesced')
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def get_or_revalidate(self, cache, key, loader, ttl):
+        """Async TTLCache.get_or_revalidate; returns (value, stale age in seconds or None)"""
+        # Only peek here: a miss is counted once, by get_or_load, like the sync version does
+        value = cache.peek(key)
+        if value is not None:
+            cache.record_lookup('hit')
+            return value, None
+        
+        stale, age = cache.get_stale(key)
+        if stale is not None:
+            inflight_key = (id(cache), key)
+            if inflight_key not in self._inflight:
+                self._inflight[inflight_key] = self.spawn(self._load(cache, inflight_key, key, loader, ttl))
+            return stale, age
+        return await self.get_or_load(cache, key, loader, ttl), None
+
+    def spawn(self, coroutine):
+        """Run a coroutine in the background without awaiting it"""
+        task = asyncio.ensure_future(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _load(self, cache, inflight_key, key, loader, ttl):
+        try:
+            value = await loader()
+            if value is not None:
+                cache.set(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    def stats(self):
+        return {
+            'session_open': self._session is not None and not self._session.closed,
+            'max_per_host': self.max_per_host,
+            'active_by_host': dict(self._active),
+            'requests': self.requests,
+            'retries': self.retries,
+            'coalesced': self.coalesced,
+            'inflight_loads': len(self._inflight)
+        }
+
+# Used only on the asgi_app event loop; the WSGI app keeps using http_session
+async_upstream = AsyncUpstreamClient()
+
+def get_market_for_yahoo_symbol(yahoo_symbol):
+    """Return the market code ('US' or 'IN') a Yahoo symbol trades on"""
+    if yahoo_symbol.endswith(('.NS', '.BO')) or yahoo_symbol in ('^NSEI', '^BSESN'):
+        return 'IN'
+    return 'US'
+
+def get_symbol_market(symbol):
+    """Market code ('US' or 'IN') for one of our symbols"""
+    return get_market_for_yahoo_symbol(resolve_yahoo_symbol(symbol))
+
+def is_market_open(market, now=None):
+    """Check whether the given market is inside its regular weekday session"""
+    tz, (open_hour, open_minute), (close_hour, close_minute) = MARKET_HOURS[market]
+    local_now = (now or datetime.now(tz=ZoneInfo('UTC'))).astimezone(tz)
+    if local_now.weekday() >= 5:
+        return False
+    minutes = local_now.hour * 60 + local_now.minute
+    return open_hour * 60 + open_minute <= minutes < close_hour * 60 + close_minute
+
+def get_stock_cache_ttl(yahoo_symbol):
+    """Cache TTL in seconds for a symbol, based on whether its market is open"""
+    if is_market_open(get_market_for_yahoo_symbol(yahoo_symbol)):
+        return STOCK_CACHE_TTL_OPEN
+    return STOCK_CACHE_TTL_CLOSED
+
+Listing = namedtuple('Listing', ['symbol', 'name', 'exchange', 'currency', 'yahoo_symbol'])
+
+CURRENCY_SIGNS = {'USD': '$', 'INR': '₹'}
+INDIAN_EXCHANGES = frozenset(['NSE', 'BSE'])
+
+class SymbolRegistry:
+    """Immutable set of listings with O(1) symbol lookups and typeahead indexes.
+
+    search() walks prefix indexes (symbol, first word of the name, any word
+    of the name) and then a trigram index for substring matches, stopping as
+    soon as it has enough results, so its cost doesn't grow with the number
+    of listings.
+    """
+
+    PREFIX_MAX_LENGTH = 10
+
+    def __init__(self, listings):
+        self.listings = tuple(listings)
+        self._by_symbol = {listing.symbol: listing for listing in self.listings}
+        
+        # Postings are tuples of listing positions in file order
+        symbol_prefixes = {}
+        first_word_prefixes = {}
+        word_prefixes = {}
+        trigrams = {}
+        for position, listing in enumerate(self.listings):
+            symbol_lower = listing.symbol.lower()
+            words = listing.name.lower().split()
+            self._add_prefixes(symbol_prefixes, symbol_lower, position)
+            self._add_prefixes(first_word_prefixes, listing.name.lower(), position)
+            for word in words:
+                self._add_prefixes(word_prefixes, word, position)
+            for text in (symbol_lower, listing.name.lower()):
+                for i in range(len(text) - 2):
+                    postings = trigrams.setdefault(text[i:i + 3], [])
+                    if not postings or postings[-1] != position:
+                        postings.append(position)
+        self._symbol_prefixes = self._freeze(symbol_prefixes)
+        self._first_word_prefixes = self._freeze(first_word_prefixes)
+        self._word_prefixes = self._freeze(word_prefixes)
+        self._trigrams = self._freeze(trigrams)
+
+    def _add_prefixes(self, index, term, position):
+        for length in range(1, min(len(term), self.PREFIX_MAX_LENGTH) + 1):
+            postings = index.setdefault(term[:length], [])
+            if not postings or postings[-1] != position:
+                postings.append(position)
+
+    @staticmethod
+    def _freeze(index):
+        return {key: tuple(postings) for key, postings in index.items()}
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls(
+                Listing(row['symbol'].strip(), row['name'].strip(), row['exchange'].strip(),
+                        row['currency'].strip(), row['yahoo_symbol'].strip() or row['symbol'].strip())
+                for row in csv.DictReader(f)
+            )
+
+    def __contains__(self, symbol):
+        return symbol in self._by_symbol
+
+    def __len__(self):
+        return len(self.listings)
+
+    def get(self, symbol):
+        return self._by_symbol.get(symbol)
+
+    def symbols(self):
+        return [listing.symbol for listing in self.listings]
+
+    def search(self, query, limit=20):
+        """Listings matching query, best first: exact symbol, symbol prefix, name prefix, word prefix, substring"""
+        query = query.strip().lower()
+        if not query:
+            return []
+        
+        key = query[:self.PREFIX_MAX_LENGTH]
+        buckets = [
+            (self._symbol_prefixes.get(key, ()), lambda listing: listing.symbol.lower().startswith(query)),
+            (self._first_word_prefixes.get(key, ()), lambda listing: listing.name.lower().startswith(query)),
+            (self._word_prefixes.get(key, ()), lambda listing: any(word.startswith(query) for word in listing.name.lower().split()))
+        ]
+        if len(query) >= 3:
+            # Walk the rarest trigram's postings and verify the full substring
+            rarest = min((self._trigrams.get(query[i:i + 3], ()) for i in range(len(query) - 2)), key=len)
+            buckets.append((rarest, lambda listing: query in listing.symbol.lower() or query in listing.name.lower()))
+        
+        results = []
+        seen = set()
+        exact = self._by_symbol.get(query.upper())
+        if exact is not None:
+            results.append(exact)
+            seen.add(exact.symbol)
+        
+        for postings, matches in buckets:
+            for position in postings:
+                if len(results) >= limit:
+                    return results
+                listing = self.listings[position]
+                if listing.symbol not in seen and matches(listing):
+                    results.append(listing)
+                    seen.add(listing.symbol)
+        return results[:limit]
+
+symbol_registry = SymbolRegistry.from_csv(SYMBOLS_FILE)
+
+def get_company_name(symbol):
+    listing = symbol_registry.get(symbol)
+    return listing.name if listing else f"{symbol} Corporation"
+
+def is_indian_symbol(symbol):
+    listing = symbol_registry.get(symbol)
+    return listing is not None and listing.exchange in INDIAN_EXCHANGES
+
+def get_currency_sign(symbol):
+    listing = symbol_registry.get(symbol)
+    return CURRENCY_SIGNS.get(listing.currency, '$') if listing else '$'
+
+class SQLitePriceStore:
+    """On-disk daily OHLCV bars per Yahoo symbol, one row per UTC trading day.
+
+    price_series records how far back each symbol has been backfilled and
+    its latest bar, so refreshes only ask Yahoo for bars from that day on.
+    The connection is opened lazily and per process, like SQLiteSentimentStore.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self.reads = 0
+        self.bars_written = 0
+        self.errors = 0
+
+    def _connect(self):
+        """Return this process's connection; caller must hold the lock"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS price_bars ('
+                'yahoo_symbol TEXT NOT NULL, day INTEGER NOT NULL, ts INTEGER NOT NULL, '
+                'open REAL, high REAL, low REAL, close REAL NOT NULL, volume INTEGER NOT NULL, '
+                'PRIMARY KEY (yahoo_symbol, day)) WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS price_series ('
+                'yahoo_symbol TEXT PRIMARY KEY, covered_from INTEGER NOT NULL, last_ts INTEGER NOT NULL, refreshed_at REAL NOT NULL)'
+            )
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get_series(self, yahoo_symbol):
+        """Return (covered_from, last_ts) for a stored symbol, or None"""
+        with self._lock:
+            try:
+                return self._connect().execute(
+                    'SELECT covered_from, last_ts FROM price_series WHERE yahoo_symbol = ?', (yahoo_symbol,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading price series for {yahoo_symbol}: {e}")
+                return None
+
+    def get_bars(self, yahoo_symbol, since_ts):
+        """Return stored (timestamp, open, high, low, close, volume) rows from since_ts on, oldest first"""
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    'SELECT ts, open, high, low, close, volume FROM price_bars '
+                    'WHERE yahoo_symbol = ? AND day >= ? ORDER BY day',
+                    (yahoo_symbol, since_ts // 86400)
+                ).fetchall()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading price bars for {yahoo_symbol}: {e}")
+                return []
+            self.reads += 1
+            return rows
+
+    def add_bars(self, yahoo_symbol, bars, covered_from):
+        """Merge fetched rows (a later bar for the same day replaces the earlier one) and extend the series"""
+        if not bars:
+            return
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.executemany(
+                    'INSERT OR REPLACE INTO price_bars (yahoo_symbol, day, ts, open, high, low, close, volume) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(yahoo_symbol, bar[0] // 86400) + tuple(bar) for bar in bars]
+                )
+                connection.execute(
+                    'INSERT INTO price_series (yahoo_symbol, covered_from, last_ts, refreshed_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (yahoo_symbol) DO UPDATE SET '
+                    'covered_from = MIN(covered_from, excluded.covered_from), '
+                    'last_ts = MAX(last_ts, excluded.last_ts), refreshed_at = excluded.refreshed_at',
+                    (yahoo_symbol, covered_from, max(bar[0] for bar in bars), time.time())
+                )
+                connection.commit()
+                self.bars_written += len(bars)
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error writing price bars for {yahoo_symbol}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'reads': self.reads,
+                'bars_written': self.bars_written,
+                'errors': self.errors
+            }
+
+# Daily bar history on disk; None keeps the plain range=30d chart fetch
+price_store = SQLitePriceStore(PRICE_HISTORY_DB) if PRICE_HISTORY_DB else None
+
+def resolve_yahoo_symbol(symbol):
+    """Map one of our symbols to the symbol Yahoo Finance lists it under"""
+    listing = symbol_registry.get(symbol)
+    return listing.yahoo_symbol if listing else symbol
+
+def get_price_range_error(range_, interval):
+    """Why a chart range/interval pair can't be served, or None if it can"""
+    if interval == '1d':
+        if range_ not in PRICE_HISTORY_RANGES:
+            return f"range must be one of {list(PRICE_HISTORY_RANGES)} for interval 1d"
+        return None
+    if interval not in PRICE_INTRADAY_RANGES:
+        return f"interval must be one of {['1d', *PRICE_INTRADAY_RANGES]}"
+    if range_ not in PRICE_INTRADAY_RANGES[interval]:
+        return f"range must be one of {list(PRICE_INTRADAY_RANGES[interval])} for interval {interval}"
+    return None
+
+@timed_stage('stock_fetch')
+def get_real_stock_data(symbol, range_='30d', interval='1d'):
+    """Fetch real stock data from Yahoo Finance API with Indian stock support"""
+    error = get_price_range_error(range_, interval)
+    if error is not None:
+        raise ValueError(error)
+    
+    yahoo_symbol = resolve_yahoo_symbol(symbol)
+    stale_age = None
+    
+    try:
+        # An expired entry is served at once while it refreshes in the background
+        stock_data, stale_age = stock_data_cache.get_or_revalidate(
+            get_stock_cache_key(yahoo_symbol, range_, interval),
+            lambda: load_stock_chart(yahoo_symbol, range_, interval),
+            get_stock_cache_ttl(yahoo_symbol),
+            upstream_executor
+        )
     except Exception as e:
         print(f"Error fetching real stock data: {e}")
-        # Fallback to simulated data
+        stock_data = None
+    
+    if stock_data is None:
+        # Fallback to simulated data (never cached) only when no good copy was ever fetched
         return get_simulated_stock_data(symbol)
+    
+    if stale_age is not None:
+        return mark_stale_stock_data(stock_data, stale_age)
+    # Shallow copy so callers can't modify the cached entry
+    return dict(stock_data)
+
+def mark_stale_stock_data(stock_data, age):
+    """Copy of a last-known-good stock data entry with its age in data_source.
+
+    data_timestamp is left as the time the data was fetched.
+    """
+    stale = dict(stock_data)
+    stale['data_source'] = f"{stock_data.get('data_source', 'Yahoo Finance')} (Last known good, {format_data_age(age)} old)"
+    stale['data_age_seconds'] = int(age)
+    return stale
+
+def format_data_age(seconds):
+    """Short human-readable age, e.g. '45s', '12m', '3h', '2d'"""
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
+    return f"{int(seconds)}s"
+
+def get_stock_cache_key(yahoo_symbol, range_, interval='1d'):
+    """stock_data_cache key; the default 30d range is keyed by the bare symbol, which bulk lookups reuse"""
+    if interval != '1d':
+        return f"{range_}@{interval}:{yahoo_symbol}"
+    return yahoo_symbol if range_ == '30d' else f"{range_}:{yahoo_symbol}"
+
+def load_stock_chart(yahoo_symbol, range_='30d', interval='1d'):
+    """Fetch chart data for a Yahoo symbol: daily bars incrementally through price_store if enabled, else the whole range"""
+    if price_store is not None and interval == '1d':
+        return load_price_history(yahoo_symbol, range_)
+    return fetch_yahoo_chart(yahoo_symbol, range_, interval)
+
+def fetch_yahoo_chart(yahoo_symbol, range_='30d', interval='1d'):
+    """Download chart data (30 daily bars by default) for a resolved Yahoo symbol, or None on failure"""
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v8/finance/chart/{yahoo_symbol}?interval={interval}&range={range_}"
+        response = http_session.get(url, timeout=10, market=get_market_for_yahoo_symbol(yahoo_symbol))
+        return parse_yahoo_chart(response.json())
+            
+    except Exception as e:
+        print(f"Error fetching real stock data for {yahoo_symbol}: {e}")
+        return None
+
+def fetch_yahoo_bars(yahoo_symbol, params):
+    """Download daily OHLCV rows for chart query params (range or period1/period2), or None on failure"""
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v8/finance/chart/{yahoo_symbol}"
+        response = http_session.get(url, params=dict(params, interval='1d'), timeout=10, market=get_market_for_yahoo_symbol(yahoo_symbol))
+        return parse_yahoo_chart_bars(response.json())
+    except Exception as e:
+        print(f"Error fetching price bars for {yahoo_symbol}: {e}")
+        return None
+
+def load_price_history(yahoo_symbol, range_):
+    """Bring price_store up to date for yahoo_symbol and return range_ of it as stock data, or None"""
+    start_ts, params, covered_from = plan_price_refresh(yahoo_symbol, range_)
+    return finish_price_refresh(yahoo_symbol, start_ts, fetch_yahoo_bars(yahoo_symbol, params), covered_from)
+
+def plan_price_refresh(yahoo_symbol, range_):
+    """Decide what to ask Yahoo for: the whole range once, then only bars since the last stored day.
+
+    Returns (start_ts, chart query params, covered_from).
+    """
+    now = int(time.time())
+    # Start of the oldest UTC day in the range (today counts as one)
+    start_ts = (now // 86400 - PRICE_HISTORY_RANGES[range_] + 1) * 86400
+    series = price_store.get_series(yahoo_symbol)
+    
+    if series is None or series[0] > start_ts:
+        # Range not on disk yet: backfill it in one request
+        return start_ts, {'range': range_}, start_ts
+    
+    # Re-fetch the last stored day too, its bar may have still been forming
+    return start_ts, {'period1': series[1] // 86400 * 86400, 'period2': now}, series[0]
+
+def finish_price_refresh(yahoo_symbol, start_ts, bars, covered_from):
+    """Merge freshly fetched bars (None if the fetch failed) and read the range back from disk"""
+    data_source = "Yahoo Finance (Real-time)"
+    if bars is None:
+        # Upstream failed; whatever is already on disk is still real data
+        data_source = "Yahoo Finance (Stored)"
+    else:
+        price_store.add_bars(yahoo_symbol, bars, covered_from)
+    
+    stored = price_store.get_bars(yahoo_symbol, start_ts)
+    if not stored:
+        return None
+    return build_stock_data_from_bars(stored, data_source)
+
+def parse_yahoo_chart(data):
+    """Convert a chart response into stock data, or None if it has no usable result"""
+    if "chart" in data and data["chart"].get("result"):
+        return build_stock_data_from_chart(data["chart"]["result"][0])
+    
+    # API returned no usable result
+    return None
+
+def parse_yahoo_chart_bars(data):
+    """Extract OHLCV rows from a chart response, or None if it has no usable result"""
+    if "chart" in data and data["chart"].get("result"):
+        return extract_chart_bars(data["chart"]["result"][0])
+    return None
+
+def extract_chart_bars(result):
+    """Return (timestamp, open, high, low, close, volume) rows with a valid close from one chart/spark result.
+
+    Returns None if the result has no prices at all. Spark results only
+    carry closes, so open/high/low are None and volume is 0 for them.
+    """
+    if "timestamp" not in result or "indicators" not in result:
+        return None
+    
+    timestamps = result["timestamp"]
+    quotes = result["indicators"]["quote"][0]
+    closes = quotes.get("close") or []
+    opens = quotes.get("open") or []
+    highs = quotes.get("high") or []
+    lows = quotes.get("low") or []
+    volumes = quotes.get("volume") or []
+    
+    def value_at(values, i):
+        return float(values[i]) if i < len(values) and values[i] is not None else None
+    
+    bars = []
+    for i, timestamp in enumerate(timestamps):
+        if (i < len(closes) and 
+            closes[i] is not None and 
+            closes[i] > 0):
+            volume = int(volumes[i]) if i < len(volumes) and volumes[i] is not None else 0
+            bars.append((int(timestamp), value_at(opens, i), value_at(highs, i), value_at(lows, i), float(closes[i]), volume))
+    return bars
+
+def build_stock_data_from_chart(result, data_source="Yahoo Finance (Real-time)"):
+    """Convert one Yahoo chart/spark result into our stock data shape, or None if it has no prices"""
+    bars = extract_chart_bars(result)
+    if bars is None:
+        return None
+    return build_stock_data_from_bars(bars, data_source)
+
+def build_stock_data_from_bars(bars, data_source="Yahoo Finance (Real-time)"):
+    """Convert (timestamp, open, high, low, close, volume) rows into our stock data shape.
+
+    chart_data is kept as columns ({'date': [...], 'price': [...], ...});
+    see format_chart_series for the per-point form most responses use.
+    """
+    chart_data = build_chart_columns(bars)
+    prices = chart_data["price"]
+    
+    # Get current and previous prices from the last two valid data points
+    if len(prices) >= 2:
+        current_price = prices[-1]
+        previous_price = prices[-2]
+    elif len(prices) == 1:
+        current_price = prices[0]
+        previous_price = current_price
+    else:
+        # Fallback if no data
+        current_price = 0
+        previous_price = 0
+    
+    # Calculate price change
+    if previous_price == 0:
+        previous_price = current_price
+    price_change = current_price - previous_price
+    price_change_percent = (price_change / previous_price) * 100 if previous_price != 0 else 0
+    
+    return {
+        "chart_data": chart_data,
+        "current_price": round(current_price, 2),
+        "price_change": round(price_change, 2),
+        "price_change_percent": round(price_change_percent, 2),
+        "data_timestamp": datetime.now().isoformat(),
+        "data_source": data_source
+    }
+
+def build_chart_columns(bars):
+    """chart_data columns from (timestamp, open, high, low, close, volume) rows.
+
+    open/high/low are left out when no bar has them (spark results).
+    """
+    timestamps, opens, highs, lows, closes, volumes = zip(*bars) if bars else ((),) * 6
+    columns = {
+        "date": [timestamp * 1000 for timestamp in timestamps],  # Convert to milliseconds
+        "price": [round(close, 2) for close in closes],  # Ensure 2 decimal places
+        "volume": list(volumes)
+    }
+    if any(open_ is not None for open_ in opens):
+        for name, values in (("open", opens), ("high", highs), ("low", lows)):
+            columns[name] = [None if value is None else round(value, 2) for value in values]
+    return columns
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw (x, y) with threshold points.
+
+    The first and last points are always kept. The points between them
+    are split into threshold - 2 buckets, and each bucket keeps the point
+    forming the largest triangle with the point kept before it and the
+    average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket b covers [edges[b], edges[b + 1]); buckets hold at least one point since n > threshold
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    average_x = np.add.reduceat(x[:n - 1], edges[:-1]) / sizes
+    average_y = np.add.reduceat(y[:n - 1], edges[:-1]) / sizes
+    # The last bucket looks ahead to the last point itself
+    next_x = np.append(average_x[1:], x[-1])
+    next_y = np.append(average_y[1:], y[-1])
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the triangle areas; only the argmax matters
+        areas = np.abs(
+            (x[previous] - next_x[bucket]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+def downsample_chart_columns(columns, points):
+    """chart_data columns reduced to at most points by LTTB on (date, price); other columns follow the kept bars"""
+    indices = lttb_indices(columns['date'], columns['price'], points).tolist()
+    return {name: [values[i] for i in indices] for name, values in columns.items()}
+
+def downsample_stock_data(stock_data, yahoo_symbol, range_, interval, points):
+    """stock_data with chart_data downsampled to at most points, memoized per chart and resolution.
+
+    Adds 'source_points' (the full count) when points were dropped.
+    """
+    columns = stock_data['chart_data']
+    if len(columns['date']) <= points:
+        return stock_data
+    key = (yahoo_symbol, range_, interval, points, stock_data.get('data_timestamp'))
+    chart_data = downsampled_chart_cache.get_or_load(key, lambda: downsample_chart_columns(columns, points), float('inf'))
+    return dict(stock_data, chart_data=chart_data, source_points=len(columns['date']))
+
+def get_spark_chunks(yahoo_symbols):
+    """(market, chunk) pairs covering yahoo_symbols in chunks of at most SPARK_BATCH_SIZE.
+
+    Each chunk holds one market's symbols, so its request can be labelled with it.
+    """
+    by_market = {}
+    for yahoo_symbol in yahoo_symbols:
+        by_market.setdefault(get_market_for_yahoo_symbol(yahoo_symbol), []).append(yahoo_symbol)
+    return [
+        (market, symbols[i:i + SPARK_BATCH_SIZE])
+        for market, symbols in by_market.items()
+        for i in range(0, len(symbols), SPARK_BATCH_SIZE)
+    ]
+
+def fetch_yahoo_spark(yahoo_symbols, range_):
+    """Download daily closes for many Yahoo symbols, SPARK_BATCH_SIZE symbols of one market per request.
+
+    Returns a dict of yahoo_symbol -> stock data; symbols Yahoo didn't
+    return (or whole chunks that failed) are simply absent.
+    """
+    results = {}
+    for market, chunk in get_spark_chunks(yahoo_symbols):
+        try:
+            url = f"{YAHOO_QUERY_BASE_URL}/v7/finance/spark"
+            params = {'symbols': ','.join(chunk), 'range': range_, 'interval': '1d'}
+            response = http_session.get(url, params=params, timeout=10, market=market)
+            results.update(parse_yahoo_spark(response.json(), chunk))
+        except Exception as e:
+            print(f"Error fetching spark data for {','.join(chunk)}: {e}")
+    return results
+
+def parse_yahoo_spark(data, yahoo_symbols):
+    """Convert a spark response into {yahoo_symbol: stock data} for the requested symbols"""
+    results = {}
+    for spark in (data.get("spark") or {}).get("result") or []:
+        if spark.get("symbol") in yahoo_symbols and spark.get("response"):
+            stock_data = build_stock_data_from_chart(spark["response"][0], "Yahoo Finance Spark (Real-time)")
+            if stock_data is not None:
+                results[spark["symbol"]] = stock_data
+    return results
+
+@timed_stage('bulk_prices')
+def get_bulk_stock_data(symbols, mode='quote'):
+    """Fetch stock data for many symbols with as few upstream requests as possible.
+
+    mode='quote' returns only the last few daily closes (enough for the
+    current price, day change and a 7-point sparkline). They come from the
+    spark endpoint, which has no OHLC or volumes, so volume is 0 unless the
+    full chart was already cached.
+    Returns a dict of symbol -> data in the get_real_stock_data shape.
+    """
+    yahoo_symbols, results, missing = get_cached_bulk_stock_data(symbols, mode)
+    if missing:
+        fetched = fetch_yahoo_spark(sorted({yahoo_symbols[symbol] for symbol in missing}), BULK_PRICE_RANGES[mode])
+        store_bulk_stock_data(mode, yahoo_symbols, results, missing, fetched)
+    return results
+
+def get_cached_bulk_stock_data(symbols, mode):
+    """Split symbols into cached results and ones that still need a spark fetch.
+
+    Returns (yahoo_symbols, results, missing).
+    """
+    if mode not in BULK_PRICE_RANGES:
+        raise ValueError(f"Unknown bulk price mode: {mode}")
+    
+    yahoo_symbols = {symbol: resolve_yahoo_symbol(symbol) for symbol in symbols}
+    results = {}
+    missing = []
+    
+    for symbol, yahoo_symbol in yahoo_symbols.items():
+        # A cached full chart answers either mode; probing for one isn't counted as a stock_data lookup
+        stock_data = stock_data_cache.peek(yahoo_symbol) or bulk_price_cache.get(get_bulk_cache_key(mode, yahoo_symbol))
+        if stock_data is not None:
+            results[symbol] = dict(stock_data)
+        else:
+            missing.append(symbol)
+    return yahoo_symbols, results, missing
+
+def get_bulk_cache_key(mode, yahoo_symbol):
+    return f"{mode}:{yahoo_symbol}"
+
+def store_bulk_stock_data(mode, yahoo_symbols, results, missing, fetched):
+    """Cache freshly fetched spark data and fill in results for the missing symbols"""
+    for yahoo_symbol, stock_data in fetched.items():
+        bulk_price_cache.set(get_bulk_cache_key(mode, yahoo_symbol), stock_data, get_stock_cache_ttl(yahoo_symbol))
+    
+    for symbol in missing:
+        stock_data = fetched.get(yahoo_symbols[symbol])
+        if stock_data is not None:
+            results[symbol] = dict(stock_data)
+        else:
+            results[symbol] = get_last_known_bulk_stock_data(mode, yahoo_symbols[symbol]) or get_simulated_stock_data(symbol)
+
+def get_last_known_bulk_stock_data(mode, yahoo_symbol):
+    """Stale chart or spark entry for a symbol whose spark fetch failed, labelled with its age, or None"""
+    for cache, key in ((stock_data_cache, yahoo_symbol), (bulk_price_cache, get_bulk_cache_key(mode, yahoo_symbol))):
+        stock_data, age = cache.get_stale(key)
+        if stock_data is not None:
+            return mark_stale_stock_data(stock_data, age)
+    return None
+
+SIMULATED_DATA_SOURCE = "Simulated Data (Fallback)"
 
 def get_simulated_stock_data(symbol):
     """Generate simulated stock data as fallback"""
+    FALLBACKS.inc(('simulated_prices', get_symbol_market(symbol)))
     base_price = random.uniform(50, 300)
-    chart_data = []
+    chart_data = {"date": [], "price": [], "volume": []}
     current_price = base_price
     
     for i in range(30):
@@ -112,14 +1745,12 @@ def get_simulated_stock_data(symbol):
         change = random.uniform(-0.05, 0.05)
         current_price = current_price * (1 + change)
         
-        chart_data.append({
-            "date": timestamp,
-            "price": round(current_price, 2),
-            "volume": random.randint(1000000, 10000000)
-        })
+        chart_data["date"].append(timestamp)
+        chart_data["price"].append(round(current_price, 2))
+        chart_data["volume"].append(random.randint(1000000, 10000000))
     
     # Calculate price change
-    previous_price = chart_data[-2]["price"] if len(chart_data) > 1 else current_price
+    previous_price = chart_data["price"][-2] if len(chart_data["price"]) > 1 else current_price
     price_change = current_price - previous_price
     price_change_percent = (price_change / previous_price) * 100 if previous_price != 0 else 0
     
@@ -129,61 +1760,210 @@ def get_simulated_stock_data(symbol):
         "price_change": round(price_change, 2),
         "price_change_percent": round(price_change_percent, 2),
         "data_timestamp": datetime.now().isoformat(),
-        "data_source": "Simulated Data (Fallback)"
+        "data_source": SIMULATED_DATA_SOURCE
     }
 
+def select_yahoo_news(data, symbol, company_name):
+    """Filter a Yahoo search response down to the raw news entries about the stock"""
+    if "news" not in data or not data["news"]:
+        return []
+    
+    # Filter news to ensure it's related to the specific stock
+    filtered_news = []
+    for news in data["news"]:
+        title = news.get("title", "").lower()
+        summary = news.get("summary", "").lower()
+        
+        # Check if news is related to the stock symbol or company name
+        is_relevant = (
+            symbol.lower() in title or 
+            symbol.lower() in summary or
+            company_name.lower().split()[0] in title or  # First word of company name
+            any(word in title for word in company_name.lower().split()[:2])  # First two words
+        )
+        
+        if is_relevant:
+            filtered_news.append(news)
+    
+    return filtered_news
+
+def get_yahoo_news_candidates(data, symbol, company_name):
+    """Unscored (item_id, text to score, item) triples for the relevant news in a Yahoo search response"""
+    candidates = []
+    for news in select_yahoo_news(data, symbol, company_name):
+        # Extract news content
+        item = {
+            'title': news.get("title", ""),
+            'summary': news.get("summary", ""),
+            'link': news.get("link", f"https://finance.yahoo.com/quote/{symbol}"),
+            'publisher': news.get("publisher", "Yahoo Finance"),
+            'published': news.get("providerPublishTime", int(datetime.now().timestamp()))
+        }
+        candidates.append((get_news_item_id(item, news.get("uuid")), item['title'] + " " + item['summary'], item))
+    return candidates
+
+def get_news_item_id(item, uuid=None):
+    """Stable archive ID for a news item: Yahoo's uuid when present, else a hash of link and title"""
+    if uuid:
+        return str(uuid)
+    return hashlib.blake2b(f"{item['link']}\n{item['title']}".encode('utf-8'), digest_size=16).hexdigest()
+
+def get_news_shingles(text):
+    """Word bigrams of text (single words when it has only one), hashed to 32-bit ints"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) > 1:
+        words = [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return {zlib.crc32(word.encode('utf-8')) for word in words}
+
+class MinHashLSH:
+    """Banded MinHash index for finding near-duplicate texts.
+
+    Each text gets bands * rows min-hashes of its shingles, using the hash
+    family (a*x + b) mod p with p the largest prime below 2**32 and a, b < p,
+    so a*x + b < 2**64 and the uint64 arithmetic never overflows. Texts that
+    agree on every row of at least one band become candidates; query returns
+    their keys, which callers still verify with the exact Jaccard similarity.
+    """
+
+    _PRIME = np.uint64(4294967291)
+
+    def __init__(self, bands=None, rows=None, seed=1):
+        self.bands = bands or NEWS_MINHASH_BANDS
+        self.rows = rows or NEWS_MINHASH_ROWS
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self._PRIME, size=self.bands * self.rows, dtype=np.uint64)
+        self._b = rng.integers(0, self._PRIME, size=self.bands * self.rows, dtype=np.uint64)
+        # Mixes a band's rows into one int; colliding bands only add candidates
+        self._band_mix = rng.integers(1, 1 << 63, size=self.rows, dtype=np.uint64)
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def signatures(self, shingle_sets):
+        """(len(shingle_sets), bands * rows) array of min-hashes of non-empty shingle sets, in one pass"""
+        lengths = [len(shingles) for shingles in shingle_sets]
+        values = np.array([value for shingles in shingle_sets for value in shingles], dtype=np.uint64) % self._PRIME
+        # One row per hash function, so the per-text minimum runs along contiguous memory
+        hashes = (np.outer(self._a, values) + self._b[:, None]) % self._PRIME
+        starts = np.concatenate(([0], np.cumsum(lengths[:-1], dtype=np.int64)))
+        return np.minimum.reduceat(hashes, starts, axis=1).T
+
+    def band_keys(self, signatures):
+        """Per signature, one int key per band"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows)
+        return (bands * self._band_mix).sum(axis=2).tolist()
+
+    def insert(self, key, band_keys):
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(key)
+
+    def query(self, band_keys):
+        """Keys sharing at least one band with band_keys, in insertion order"""
+        found = set()
+        for buckets, band_key in zip(self._buckets, band_keys):
+            found.update(buckets.get(band_key, ()))
+        return sorted(found)
+
+def cluster_news_texts(texts):
+    """Group near-duplicate texts; returns lists of indices, each led by its earliest text.
+
+    Greedy in input order: a text joins the first earlier cluster leader it
+    is NEWS_DUPLICATE_SIMILARITY-similar to, otherwise it leads a new cluster.
+    """
+    if not NEWS_DEDUP_ENABLED or len(texts) < 2:
+        return [[i] for i in range(len(texts))]
+    
+    shingle_sets = [get_news_shingles(text) for text in texts]
+    hashed = [i for i, shingles in enumerate(shingle_sets) if shingles]
+    if not hashed:
+        return [[i] for i in range(len(texts))]
+    index = MinHashLSH()
+    signatures = np.zeros((len(texts), index.bands * index.rows), dtype=np.uint64)
+    signatures[hashed] = index.signatures([shingle_sets[i] for i in hashed])
+    band_keys = dict(zip(hashed, index.band_keys(signatures[hashed])))
+    
+    clusters = {}
+    for i, shingles in enumerate(shingle_sets):
+        if i not in band_keys:
+            clusters[i] = [i]
+            continue
+        leaders = index.query(band_keys[i])
+        if leaders:
+            # The share of equal min-hashes estimates the similarity to within
+            # about 0.06 (one standard deviation); skip candidates clearly below
+            # the threshold before the exact check
+            estimates = (signatures[leaders] == signatures[i]).mean(axis=1)
+            leaders = [leader for leader, estimate in zip(leaders, estimates.tolist()) if estimate >= NEWS_DUPLICATE_SIMILARITY - 0.1]
+        for leader in leaders:
+            other = shingle_sets[leader]
+            if len(shingles & other) >= NEWS_DUPLICATE_SIMILARITY * len(shingles | other):
+                clusters[leader].append(i)
+                break
+        else:
+            clusters[i] = [i]
+            index.insert(i, band_keys[i])
+    return list(clusters.values())
+
+def get_news_cluster_size(item):
+    """How many fetched items an item stands for (1 unless near-duplicates were collapsed into it)"""
+    return item.get('cluster_size', 1)
+
+def get_story_weight(copies):
+    """Aggregation weight of a story with this many copies: grows with them, but only
+    logarithmically, so a widely syndicated story counts for more without drowning out the rest"""
+    return 1 + math.log(copies)
+
+def get_news_cluster_weight(item):
+    """get_story_weight of the story an item stands for"""
+    return get_story_weight(get_news_cluster_size(item))
+
+def merge_news_cluster(items):
+    """The first item of a cluster, carrying the cluster's total size"""
+    size = sum(get_news_cluster_size(item) for item in items)
+    return dict(items[0], cluster_size=size) if size > 1 else items[0]
+
+def collapse_news_candidates(candidates, source):
+    """Keep one (item_id, text, item) candidate per near-duplicate cluster, fingerprinting the text to score"""
+    clusters = cluster_news_texts([text for _, text, _ in candidates])
+    if len(clusters) < len(candidates):
+        NEWS_DUPLICATES.inc((source,), len(candidates) - len(clusters))
+    collapsed = []
+    for cluster in clusters:
+        item_id, text, _ = candidates[cluster[0]]
+        collapsed.append((item_id, text, merge_news_cluster([candidates[i][2] for i in cluster])))
+    return collapsed
+
+def count_news_stories(candidates):
+    """Number of distinct stories among (item_id, text, item) candidates"""
+    return len(cluster_news_texts([text for _, text, _ in candidates]))
+
+def collapse_news_items(news_items):
+    """Keep one news item per near-duplicate cluster, fingerprinting title and summary"""
+    clusters = cluster_news_texts([f"{item['title']} {item['summary']}" for item in news_items])
+    if len(clusters) == len(news_items):
+        return list(news_items)
+    return [merge_news_cluster([news_items[i] for i in cluster]) for cluster in clusters]
+
+def score_news_candidates(candidates):
+    """Attach ML sentiment to candidate items, scoring all texts in one batch"""
+    # Perform ML sentiment analysis on the news content in one batch
+    sentiment_results = analyze_sentiment_ml_batch([text for _, text, _ in candidates])
+    return [
+        dict(item, sentiment=sentiment_result['sentiment'], confidence=sentiment_result['confidence'])
+        for (_, _, item), sentiment_result in zip(candidates, sentiment_results)
+    ]
+
+def build_yahoo_news_items(data, symbol, company_name):
+    """Filter a Yahoo search response down to news about the stock and score it"""
+    # Take up to 8 distinct stories, so syndicated copies don't crowd out the rest
+    return score_news_candidates(collapse_news_candidates(get_yahoo_news_candidates(data, symbol, company_name), 'search')[:8])
+
+@timed_stage('news_fetch')
 def get_real_news_from_yahoo(symbol, company_name):
     """Fetch real news from Yahoo Finance API with stock-specific filtering"""
     try:
         # Yahoo Finance news API endpoint - search for specific stock
-        url = f"https://query1.finance.yahoo.com/v1/finance/search?q={symbol}&quotesCount=1&newsCount=15"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        data = response.json()
-        
-        news_items = []
-        if "news" in data and data["news"]:
-            # Filter news to ensure it's related to the specific stock
-            filtered_news = []
-            for news in data["news"]:
-                title = news.get("title", "").lower()
-                summary = news.get("summary", "").lower()
-                
-                # Check if news is related to the stock symbol or company name
-                is_relevant = (
-                    symbol.lower() in title or 
-                    symbol.lower() in summary or
-                    company_name.lower().split()[0] in title or  # First word of company name
-                    any(word in title for word in company_name.lower().split()[:2])  # First two words
-                )
-                
-                if is_relevant:
-                    filtered_news.append(news)
-            
-            # Take up to 8 relevant news items
-            for news in filtered_news[:8]:
-                # Extract news content
-                title = news.get("title", "")
-                summary = news.get("summary", "")
-                link = news.get("link", f"https://finance.yahoo.com/quote/{symbol}")
-                publisher = news.get("publisher", "Yahoo Finance")
-                published = news.get("providerPublishTime", int(datetime.now().timestamp()))
-                
-                # Perform ML sentiment analysis on the news content
-                sentiment_result = analyze_sentiment_ml(title + " " + summary)
-                
-                news_items.append({
-                    'title': title,
-                    'summary': summary,
-                    'link': link,
-                    'publisher': publisher,
-                    'published': published,
-                    'sentiment': sentiment_result['sentiment'],
-                    'confidence': sentiment_result['confidence']
-                })
+        url = f"{YAHOO_QUERY_BASE_URL}/v1/finance/search?q={symbol}&quotesCount=1&newsCount=15"
+        response = http_session.get(url, timeout=10, market=get_symbol_market(symbol))
+        news_items = build_yahoo_news_items(response.json(), symbol, company_name)
         
         # If we don't have enough relevant news, try alternative method
         if len(news_items) < 3:
@@ -197,6 +1977,7 @@ def get_real_news_from_yahoo(symbol, company_name):
         # Fallback to alternative news source
         return get_alternative_news(symbol, company_name)
 
+@timed_stage('news_scrape')
 def get_alternative_news(symbol, company_name):
     """Alternative news scraping method with multiple Indian news sources"""
     try:
@@ -223,116 +2004,360 @@ def get_alternative_news(symbol, company_name):
         
         # Try Yahoo Finance first (most reliable)
         try:
-            url = f"https://finance.yahoo.com/quote/{symbol}.NS/news"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for news articles in the page
-            news_elements = soup.find_all('h3', class_='Mb(5px)')
-            
-            for i, element in enumerate(news_elements[:6]):  # Limit to 6 items
-                title = element.get_text().strip()
-                if title and (symbol.lower() in title.lower() or company_name.lower().split()[0] in title.lower()):
-                    # Find the link
-                    link_element = element.find('a')
-                    link = link_element.get('href') if link_element else f"https://finance.yahoo.com/quote/{symbol}.NS"
-                    
-                    # Perform ML sentiment analysis
-                    sentiment_result = analyze_sentiment_ml(title)
-                    
-                    news_items.append({
-                        'title': title,
-                        'summary': f"Latest news about {company_name} from Yahoo Finance",
-                        'link': link,
-                        'publisher': 'Yahoo Finance',
-                        'published': int(datetime.now().timestamp()) - (i * 3600),
-                        'sentiment': sentiment_result['sentiment'],
-                        'confidence': sentiment_result['confidence']
-                    })
+            news_items = parse_yahoo_news_page(fetch_yahoo_news_page(symbol), symbol, company_name)
         except Exception as e:
             print(f"Error scraping Yahoo Finance: {e}")
         
-        # If we don't have enough news, try to get some generic Indian market news
-        if len(news_items) < 3:
-            try:
-                # Try to get general Indian market news
-                generic_news = [
-                    {
-                        'title': f"{company_name} Stock Analysis - Indian Market Update",
-                        'summary': f"Latest market analysis for {company_name} in the Indian stock market.",
-                        'link': f"https://finance.yahoo.com/quote/{symbol}.NS",
-                        'publisher': 'Market Analysis',
-                        'published': int(datetime.now().timestamp()),
-                        'sentiment': 'Neutral',
-                        'confidence': 0.6
-                    },
-                    {
-                        'title': f"{company_name} - NSE Trading Update",
-                        'summary': f"Trading update for {company_name} on the National Stock Exchange.",
-                        'link': f"https://finance.yahoo.com/quote/{symbol}.NS",
-                        'publisher': 'NSE Update',
-                        'published': int(datetime.now().timestamp()) - 3600,
-                        'sentiment': 'Neutral',
-                        'confidence': 0.6
-                    },
-                    {
-                        'title': f"Indian Market: {company_name} Performance Review",
-                        'summary': f"Performance review of {company_name} in the Indian equity market.",
-                        'link': f"https://finance.yahoo.com/quote/{symbol}.NS",
-                        'publisher': 'Market Review',
-                        'published': int(datetime.now().timestamp()) - 7200,
-                        'sentiment': 'Neutral',
-                        'confidence': 0.6
-                    }
-                ]
-                
-                # Add generic news if we don't have enough specific news
-                for news in generic_news[:3-len(news_items)]:
-                    news_items.append(news)
-                    
-            except Exception as e:
-                print(f"Error adding generic news: {e}")
-        
+        add_generic_news(news_items, symbol, company_name)
         return news_items
         
     except Exception as e:
         print(f"Error with alternative news scraping: {e}")
         return []
 
+def fetch_yahoo_news_page(symbol):
+    """Download the start of a symbol's Yahoo quote news page, at most NEWS_PAGE_MAX_BYTES of it"""
+    url = f"{YAHOO_WEB_BASE_URL}/quote/{symbol}.NS/news"
+    with http_session.get(url, timeout=10, stream=True, market=get_symbol_market(symbol)) as response:
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= NEWS_PAGE_MAX_BYTES:
+                break
+        return b''.join(chunks)[:NEWS_PAGE_MAX_BYTES]
+
+def parse_yahoo_news_page(content, symbol, company_name):
+    """Pull headlines about the stock out of a Yahoo quote news page and score them.
+
+    Only the search-fallback paths use this, so the items are tagged is_fallback.
+    """
+    scored = score_news_candidates(collapse_news_candidates(get_yahoo_news_page_candidates(content, symbol, company_name), 'page'))
+    return [dict(item, is_fallback=True) for item in scored]
+
+# href of the first link inside a headline element
+FIRST_LINK_XPATH = etree.XPath('(.//a/@href)[1]')
+
+def iter_yahoo_news_headlines(content):
+    """Yield the h3.Mb(5px) headline elements of a Yahoo news page in document order.
+
+    Parses incrementally with lxml, so callers that stop early skip parsing
+    the rest of the page. Each headline is valid until the next one is
+    requested; everything parsed before it is then dropped from the tree,
+    so memory stays bounded by the markup between two h3 elements.
+    """
+    for _, element in etree.iterparse(io.BytesIO(content), events=('end',), tag='h3', html=True, recover=True, no_network=True):
+        if 'Mb(5px)' in (element.get('class') or '').split():
+            yield element
+        element.clear()
+        # Remove finished siblings of the h3 and of each of its ancestors
+        node = element
+        while node is not None:
+            while node.getprevious() is not None:
+                del node.getparent()[0]
+            node = node.getparent()
+
+def get_yahoo_news_page_candidates(content, symbol, company_name):
+    """Unscored (item_id, text to score, item) triples for the headlines on a Yahoo quote news page"""
+    candidates = []
+    if not content:
+        return candidates
+    
+    for i, element in enumerate(iter_yahoo_news_headlines(content)):
+        if i >= 6:  # Limit to 6 items
+            break
+        title = ''.join(element.itertext()).strip()
+        if title and (symbol.lower() in title.lower() or company_name.lower().split()[0] in title.lower()):
+            # Find the link
+            hrefs = FIRST_LINK_XPATH(element)
+            link = hrefs[0] if hrefs else f"https://finance.yahoo.com/quote/{symbol}.NS"
+            
+            item = {
+                'title': title,
+                'summary': f"Latest news about {company_name} from Yahoo Finance",
+                'link': link,
+                'publisher': 'Yahoo Finance',
+                'published': int(datetime.now().timestamp()) - (i * 3600)
+            }
+            # The summary is boilerplate, so only the headline is scored
+            candidates.append((get_news_item_id(item), title, item))
+    
+    return candidates
+
+def add_generic_news(news_items, symbol, company_name):
+    """Pad news_items in place to 3 entries with generic market updates, tagged is_placeholder"""
+    # If we don't have enough news, try to get some generic Indian market news
+    if len(news_items) >= 3:
+        return
+    FALLBACKS.inc(('generic_news', get_symbol_market(symbol)))
+    
+    try:
+        # Try to get general Indian market news
+        generic_news = [
+            {
+                'title': f"{company_name} Stock Analysis - Indian Market Update",
+                'summary': f"Latest market analysis for {company_name} in the Indian stock market.",
+                'link': f"https://finance.yahoo.com/quote/{symbol}.NS",
+                'publisher': 'Market Analysis',
+                'published': int(datetime.now().timestamp()),
+                'sentiment': 'Neutral',
+                'confidence': 0.6,
+                'is_placeholder': True
+            },
+            {
+                'title': f"{company_name} - NSE Trading Update",
+                'summary': f"Trading update for {company_name} on the National Stock Exchange.",
+                'link': f"https://finance.yahoo.com/quote/{symbol}.NS",
+                'publisher': 'NSE Update',
+                'published': int(datetime.now().timestamp()) - 3600,
+                'sentiment': 'Neutral',
+                'confidence': 0.6,
+                'is_placeholder': True
+            },
+            {
+                'title': f"Indian Market: {company_name} Performance Review",
+                'summary': f"Performance review of {company_name} in the Indian equity market.",
+                'link': f"https://finance.yahoo.com/quote/{symbol}.NS",
+                'publisher': 'Market Review',
+                'published': int(datetime.now().timestamp()) - 7200,
+                'sentiment': 'Neutral',
+                'confidence': 0.6,
+                'is_placeholder': True
+            }
+        ]
+        
+        # Add generic news if we don't have enough specific news
+        for news in generic_news[:3-len(news_items)]:
+            news_items.append(news)
+            
+    except Exception as e:
+        print(f"Error adding generic news: {e}")
+
+# Financial lexicon: tag -> base words. All tags are matched together in a
+# single pass over a text's tokens (find_lexicon_hits), including simple
+# inflections, so 'cuts' matches 'cut' but 'execute' does not.
+FINANCIAL_LEXICON = {
+    # analyze_sentiment_ml
+    'positive': ['profit', 'growth', 'revenue', 'gain', 'rise', 'increase', 'strong', 'beat', 'exceed', 'surge', 'rally', 'bullish', 'upgrade', 'positive', 'success', 'breakthrough', 'record', 'high', 'boost', 'improve', 'expansion', 'partnership', 'deal', 'acquisition', 'investment'],
+    'negative': ['loss', 'decline', 'fall', 'drop', 'crash', 'plunge', 'slump', 'weak', 'poor', 'disappoint', 'miss', 'cut', 'reduce', 'layoff', 'crisis', 'concern', 'risk', 'threat', 'challenge', 'problem', 'issue', 'trouble', 'struggle', 'pressure', 'volatility', 'uncertainty', 'bearish', 'pessimistic', 'downgrade', 'warning', 'caution'],
+    # generate_summarized_insights
+    'important': ['revenue', 'growth', 'earnings', 'profit', 'loss', 'acquisition', 'merger', 'partnership', 'expansion', 'investment', 'dividend', 'stock', 'market', 'analyst', 'forecast', 'outlook', 'guidance', 'quarterly', 'annual', 'breakthrough', 'innovation', 'technology', 'product', 'service'],
+    'insight_positive': ['strong', 'growth', 'increase', 'positive', 'success', 'excellent', 'robust'],
+    'insight_negative': ['decline', 'decrease', 'negative', 'concern', 'challenge', 'issue', 'problem'],
+    # generate_risk_factors / generate_opportunities
+    'risk': ['regulatory', 'competition', 'challenge', 'concern', 'issue', 'problem', 'decline'],
+    'opportunity': ['growth', 'expansion', 'partnership', 'innovation', 'breakthrough', 'acquisition'],
+    # extract_keywords_from_news
+    'keyword_positive': ['growth', 'profit', 'revenue', 'success', 'strong', 'increase', 'gain', 'rise', 'boost', 'improve', 'excellent', 'outstanding', 'record', 'breakthrough', 'innovation', 'expansion', 'partnership', 'deal', 'acquisition', 'investment', 'upgrade', 'beat', 'exceed', 'surge', 'rally', 'bullish', 'optimistic', 'confidence', 'momentum', 'leadership', 'dominance'],
+    'keyword_negative': ['loss', 'decline', 'fall', 'drop', 'crash', 'plunge', 'slump', 'weak', 'poor', 'disappoint', 'miss', 'cut', 'reduce', 'layoff', 'crisis', 'concern', 'risk', 'threat', 'challenge', 'problem', 'issue', 'trouble', 'struggle', 'pressure', 'volatility', 'uncertainty', 'bearish', 'pessimistic', 'downgrade', 'warning', 'caution'],
+    'keyword_neutral': ['market', 'company', 'stock', 'share', 'price', 'earnings', 'quarter', 'year', 'report', 'analyst', 'forecast', 'expectation', 'guidance', 'outlook', 'trend', 'sector', 'industry', 'business', 'financial', 'result', 'performance', 'data', 'news', 'update', 'announcement', 'statement', 'conference', 'call', 'meeting', 'agreement']
+}
+
+# Risk/opportunity keywords that produce a label, in reporting order
+RISK_FACTOR_LABELS = {
+    'regulatory': 'Regulatory concerns',
+    'competition': 'Competitive pressure',
+    'challenge': 'Market challenges'
+}
+OPPORTUNITY_LABELS = {
+    'growth': 'Growth opportunities',
+    'partnership': 'Strategic partnerships',
+    'expansion': 'Market expansion'
+}
+
+# Words left out of the keyword cloud
+KEYWORD_STOPWORDS = frozenset(['the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'man', 'oil', 'sit', 'try', 'use', 'she', 'put', 'end', 'why', 'let', 'say', 'ask', 'run', 'own', 'set', 'too', 'any', 'many', 'some', 'time', 'very', 'when', 'come', 'here', 'just', 'like', 'long', 'make', 'much', 'over', 'such', 'take', 'than', 'them', 'well', 'were'])
+
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+WORD_PATTERN = re.compile(r'\w+')
+KEYWORD_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')
+
+def get_lexicon_forms(word):
+    """Return the surface forms a lexicon word matches (plurals, -ed/-ing/-er/-est)"""
+    forms = {word, word + 's', word + 'es', word + 'ed', word + 'ing', word + 'er', word + 'est'}
+    if word.endswith('e'):
+        forms |= {word + 'd', word[:-1] + 'ing', word + 'r', word + 'st'}
+    if word.endswith('y') and len(word) > 2 and word[-2] not in 'aeiou':
+        forms |= {word[:-1] + 'ies', word[:-1] + 'ied'}
+    # Doubled final consonant: cut -> cutting, drop -> dropped
+    if len(word) >= 3 and word[-1] not in 'aeiouwxy' and word[-2] in 'aeiou' and word[-3] not in 'aeiou':
+        forms |= {word + word[-1] + 'ed', word + word[-1] + 'ing'}
+    return forms
+
+def build_lexicon_index(lexicon):
+    """Map every surface form to the (tag, word) pairs it counts towards"""
+    index = {}
+    for tag, words in lexicon.items():
+        for word in words:
+            for form in get_lexicon_forms(word):
+                index.setdefault(form, []).append((tag, word))
+    return {form: tuple(entries) for form, entries in index.items()}
+
+LEXICON_INDEX = build_lexicon_index(FINANCIAL_LEXICON)
+
+# Part of every sentiment cache key, so editing the scoring word lists
+# doesn't serve results computed with the old ones
+SENTIMENT_CACHE_VERSION = hashlib.blake2b(
+    json.dumps([FINANCIAL_LEXICON['positive'], FINANCIAL_LEXICON['negative']]).encode('utf-8'),
+    digest_size=4
+).hexdigest()
+
+class SQLiteSentimentStore:
+    """Size-capped on-disk table of sentiment results keyed by text hash.
+
+    The connection is opened lazily and per process, so the store can be
+    created at import time under gunicorn --preload.
+    """
+
+    def __init__(self, path, max_rows):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._writes_since_trim = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _connect(self):
+        """Return this process's connection; caller must hold the lock"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sentiment_cache ('
+                'key TEXT PRIMARY KEY, sentiment TEXT NOT NULL, confidence REAL NOT NULL, created_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS sentiment_cache_created_at ON sentiment_cache (created_at)')
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key):
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    'SELECT sentiment, confidence FROM sentiment_cache WHERE key = ?', (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading sentiment cache: {e}")
+                return None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {'sentiment': row[0], 'confidence': row[1]}
+
+    def set(self, key, result):
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.execute(
+                    'INSERT OR REPLACE INTO sentiment_cache (key, sentiment, confidence, created_at) VALUES (?, ?, ?, ?)',
+                    (key, result['sentiment'], result['confidence'], time.time())
+                )
+                # Trim the oldest rows now and then rather than on every write
+                self._writes_since_trim += 1
+                if self._writes_since_trim >= 1000:
+                    self._writes_since_trim = 0
+                    connection.execute(
+                        'DELETE FROM sentiment_cache WHERE key IN ('
+                        'SELECT key FROM sentiment_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                        (self.max_rows,)
+                    )
+                connection.commit()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error writing sentiment cache: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'max_rows': self.max_rows,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Memoized sentiment results; entries never expire, only get evicted by size
+sentiment_cache = TTLCache(max_entries=SENTIMENT_CACHE_MAX_ENTRIES)
+sentiment_store = SQLiteSentimentStore(SENTIMENT_CACHE_DB, SENTIMENT_CACHE_DB_MAX_ROWS) if SENTIMENT_CACHE_DB else None
+
+def get_sentiment_cache_key(tokens):
+    """Hash of the cleaned text, prefixed with the scoring version"""
+    digest = hashlib.blake2b(' '.join(tokens).encode('utf-8'), digest_size=16).hexdigest()
+    return f"{SENTIMENT_CACHE_VERSION}:{digest}"
+
+def get_cached_sentiment(key):
+    """Look a sentiment result up in memory, then on disk"""
+    result = sentiment_cache.get(key)
+    if result is None and sentiment_store is not None:
+        result = sentiment_store.get(key)
+        if result is not None:
+            sentiment_cache.set(key, result, float('inf'))
+    return dict(result) if result is not None else None
+
+def store_cached_sentiment(key, result):
+    sentiment_cache.set(key, dict(result), float('inf'))
+    if sentiment_store is not None:
+        sentiment_store.set(key, result)
+
+def tokenize_text(text):
+    """Lowercase word tokens, matching the cleanup analyze_sentiment_ml applies"""
+    return WORD_PATTERN.findall(text.lower())
+
+def find_lexicon_hits(tokens):
+    """Return {tag: set of lexicon words} present in tokens, in one pass over them"""
+    hits = {}
+    for token in tokens:
+        for tag, word in LEXICON_INDEX.get(token, ()):
+            hits.setdefault(tag, set()).add(word)
+    return hits
+
+def clean_sentiment_tokens(text):
+    """Lowercase and strip punctuation, keeping words (and financial terms) as tokens"""
+    return NON_WORD_PATTERN.sub(' ', text.lower()).split()
+
+def get_combined_sentiment_score(tokens):
+    """VADER compound score of the cleaned text plus the financial lexicon bias"""
+    # VADER sentiment analysis
+    vader_compound = vader_analyzer.polarity_scores(' '.join(tokens))['compound']
+    
+    # Count distinct financial sentiment words
+    hits = find_lexicon_hits(tokens)
+    pos_count = len(hits.get('positive', ()))
+    neg_count = len(hits.get('negative', ()))
+    
+    # Adjust sentiment based on financial context
+    financial_bias = (pos_count - neg_count) * 0.1
+    
+    # Combine VADER analysis with financial context
+    return vader_compound + financial_bias
+
+@timed_stage('sentiment_ml')
 def analyze_sentiment_ml(text):
     """Perform sentiment analysis using VADER"""
     try:
         # Clean the text but preserve important financial terms
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
-        text = ' '.join(text.split())
+        tokens = clean_sentiment_tokens(text)
         
-        if not text.strip():
+        if not tokens:
             return {'sentiment': 'Neutral', 'confidence': 0.5}
         
-        # VADER sentiment analysis
-        vader_scores = vader_analyzer.polarity_scores(text)
-        vader_compound = vader_scores['compound']
-        vader_positive = vader_scores['pos']
-        vader_negative = vader_scores['neg']
-        vader_neutral = vader_scores['neu']
+        # The same headline is scored for every user who looks up the ticker
+        cache_key = get_sentiment_cache_key(tokens)
+        cached = get_cached_sentiment(cache_key)
+        if cached is not None:
+            return cached
         
-        # Enhanced sentiment analysis with financial context
-        financial_positive_words = ['profit', 'growth', 'revenue', 'gain', 'rise', 'increase', 'strong', 'beat', 'exceed', 'surge', 'rally', 'bullish', 'upgrade', 'positive', 'success', 'breakthrough', 'record', 'high', 'boost', 'improve', 'expansion', 'partnership', 'deal', 'acquisition', 'investment']
-        financial_negative_words = ['loss', 'decline', 'fall', 'drop', 'crash', 'plunge', 'slump', 'weak', 'poor', 'disappoint', 'miss', 'cut', 'reduce', 'layoff', 'crisis', 'concern', 'risk', 'threat', 'challenge', 'problem', 'issue', 'trouble', 'struggle', 'pressure', 'volatility', 'uncertainty', 'bearish', 'pessimistic', 'downgrade', 'warning', 'caution']
-        
-        # Count financial sentiment words
-        pos_count = sum(1 for word in financial_positive_words if word in text)
-        neg_count = sum(1 for word in financial_negative_words if word in text)
-        
-        # Adjust sentiment based on financial context
-        financial_bias = (pos_count - neg_count) * 0.1
-        
-        # Combine VADER analysis with financial context
-        combined_score = vader_compound + financial_bias
+        combined_score = get_combined_sentiment_score(tokens)
         
         # Determine sentiment based on combined score
         if combined_score >= 0.2:
@@ -345,15 +2370,69 @@ def analyze_sentiment_ml(text):
             sentiment = 'Neutral'
             confidence = 0.5 + (0.2 - abs(combined_score)) * 0.5
         
-        return {
+        result = {
             'sentiment': sentiment,
             'confidence': round(confidence, 2)
         }
+        store_cached_sentiment(cache_key, result)
+        return result
         
     except Exception as e:
         print(f"Error in sentiment analysis: {e}")
         return {'sentiment': 'Neutral', 'confidence': 0.5}
 
+@timed_stage('sentiment_ml_batch')
+def analyze_sentiment_ml_batch(texts):
+    """Score many texts at once; results match analyze_sentiment_ml item for item.
+
+    Each text is cleaned and tokenized once for both the VADER and lexicon
+    stages, and the score -> label/confidence mapping runs over NumPy arrays.
+    """
+    try:
+        results = [None] * len(texts)
+        pending = {}  # cache key -> (tokens, indexes) of distinct texts that still need scoring
+        for i, text in enumerate(texts):
+            tokens = clean_sentiment_tokens(text)
+            if not tokens:
+                results[i] = {'sentiment': 'Neutral', 'confidence': 0.5}
+                continue
+            cache_key = get_sentiment_cache_key(tokens)
+            if cache_key in pending:
+                pending[cache_key][1].append(i)
+                continue
+            results[i] = get_cached_sentiment(cache_key)
+            if results[i] is None:
+                pending[cache_key] = (tokens, [i])
+        
+        if not pending:
+            return results
+        
+        combined = np.array([get_combined_sentiment_score(tokens) for tokens, _ in pending.values()], dtype=np.float64)
+        
+        # Same thresholds and confidence formulas as analyze_sentiment_ml
+        magnitude = np.abs(combined)
+        is_positive = combined >= 0.2
+        is_negative = combined <= -0.2
+        confidence = np.where(
+            is_positive | is_negative,
+            np.minimum(0.95, 0.6 + magnitude * 0.4),
+            0.5 + (0.2 - magnitude) * 0.5
+        )
+        labels = np.where(is_positive, 'Positive', np.where(is_negative, 'Negative', 'Neutral'))
+        
+        for (cache_key, (_, indexes)), label, value in zip(pending.items(), labels, confidence):
+            # Python's round() (not np.round) so values are identical to the scalar path
+            result = {'sentiment': str(label), 'confidence': round(float(value), 2)}
+            store_cached_sentiment(cache_key, result)
+            for i in indexes:
+                results[i] = dict(result)
+        return results
+        
+    except Exception as e:
+        print(f"Error in batch sentiment analysis: {e}")
+        return [analyze_sentiment_ml(text) for text in texts]
+
+@timed_stage('insights')
 def generate_summarized_insights(news_items, symbol, company_name):
     """Generate summarized insights from news items using extractive summarization"""
     try:
@@ -369,40 +2448,23 @@ def generate_summarized_insights(news_items, symbol, company_name):
         sentences = all_text.split('. ')
         key_sentences = []
         
-        # Keywords to look for in important sentences
-        important_keywords = [
-            'revenue', 'growth', 'earnings', 'profit', 'loss', 'acquisition', 'merger',
-            'partnership', 'expansion', 'investment', 'dividend', 'stock', 'market',
-            'analyst', 'forecast', 'outlook', 'guidance', 'quarterly', 'annual',
-            'breakthrough', 'innovation', 'technology', 'product', 'service'
-        ]
-        
         # Score sentences based on keyword presence and length
         scored_sentences = []
         for sentence in sentences:
             if len(sentence.strip()) > 20:  # Minimum length
                 score = 0
                 sentence_lower = sentence.lower()
+                hits = find_lexicon_hits(WORD_PATTERN.findall(sentence_lower))
                 
                 # Score based on important keywords
-                for keyword in important_keywords:
-                    if keyword in sentence_lower:
-                        score += 2
+                score += 2 * len(hits.get('important', ()))
                 
                 # Score based on company name mention
                 if company_name.lower() in sentence_lower or symbol.lower() in sentence_lower:
                     score += 1
                 
                 # Score based on sentiment words
-                positive_words = ['strong', 'growth', 'increase', 'positive', 'success', 'excellent', 'robust']
-                negative_words = ['decline', 'decrease', 'negative', 'concern', 'challenge', 'issue', 'problem']
-                
-                for word in positive_words:
-                    if word in sentence_lower:
-                        score += 1
-                for word in negative_words:
-                    if word in sentence_lower:
-                        score += 1
+                score += len(hits.get('insight_positive', ())) + len(hits.get('insight_negative', ()))
                 
                 if score > 0:
                     scored_sentences.append((sentence.strip(), score))
@@ -463,16 +2525,11 @@ def generate_risk_factors(news_items, negative_ratio):
         risk_factors.append("High negative sentiment in recent news")
     
     # Look for specific risk-related keywords in news
-    risk_keywords = ['regulatory', 'competition', 'challenge', 'concern', 'issue', 'problem', 'decline']
     for item in news_items:
-        for keyword in risk_keywords:
-            if keyword.lower() in item['title'].lower() or keyword.lower() in item['summary'].lower():
-                if f"Regulatory concerns" not in risk_factors and 'regulatory' in keyword:
-                    risk_factors.append("Regulatory concerns")
-                elif f"Competitive pressure" not in risk_factors and 'competition' in keyword:
-                    risk_factors.append("Competitive pressure")
-                elif f"Market challenges" not in risk_factors and 'challenge' in keyword:
-                    risk_factors.append("Market challenges")
+        risk_hits = find_lexicon_hits(tokenize_text(item['title'] + " " + item['summary'])).get('risk', ())
+        for keyword, label in RISK_FACTOR_LABELS.items():
+            if keyword in risk_hits and label not in risk_factors:
+                risk_factors.append(label)
     
     if not risk_factors:
         risk_factors = ["Market volatility", "Economic uncertainty"]
@@ -487,68 +2544,495 @@ def generate_opportunities(news_items, positive_ratio):
         opportunities.append("Strong positive momentum in recent news")
     
     # Look for specific opportunity-related keywords in news
-    opportunity_keywords = ['growth', 'expansion', 'partnership', 'innovation', 'breakthrough', 'acquisition']
     for item in news_items:
-        for keyword in opportunity_keywords:
-            if keyword.lower() in item['title'].lower() or keyword.lower() in item['summary'].lower():
-                if f"Growth opportunities" not in opportunities and 'growth' in keyword:
-                    opportunities.append("Growth opportunities")
-                elif f"Strategic partnerships" not in opportunities and 'partnership' in keyword:
-                    opportunities.append("Strategic partnerships")
-                elif f"Market expansion" not in opportunities and 'expansion' in keyword:
-                    opportunities.append("Market expansion")
+        opportunity_hits = find_lexicon_hits(tokenize_text(item['title'] + " " + item['summary'])).get('opportunity', ())
+        for keyword, label in OPPORTUNITY_LABELS.items():
+            if keyword in opportunity_hits and label not in opportunities:
+                opportunities.append(label)
     
     if not opportunities:
         opportunities = ["Market recovery potential", "Innovation opportunities"]
     
     return opportunities[:3]  # Limit to 3 opportunities
 
-def generate_stock_sentiment_data(symbol, chart_data):
-    """Generate realistic sentiment data based on stock symbol and price movement"""
-    
-    # Simplified sentiment profiles
-    sentiment_profiles = {
-        'AAPL': {'base_sentiment': 0.3, 'volatility': 0.4},
-        'MSFT': {'base_sentiment': 0.4, 'volatility': 0.3},
-        'GOOGL': {'base_sentiment': 0.2, 'volatility': 0.5},
-        'AMZN': {'base_sentiment': 0.1, 'volatility': 0.6},
-        'TSLA': {'base_sentiment': -0.1, 'volatility': 0.8},
-        'META': {'base_sentiment': 0.0, 'volatility': 0.7},
-        'NVDA': {'base_sentiment': 0.5, 'volatility': 0.4},
-        'JPM': {'base_sentiment': 0.2, 'volatility': 0.3},
-        'V': {'base_sentiment': 0.3, 'volatility': 0.2},
-        'JNJ': {'base_sentiment': 0.1, 'volatility': 0.2}
-    }
+def add_missing_columns(connection, table, columns):
+    """ALTER TABLE in the (name, definition) columns an older database was created without"""
+    existing = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+    for name, definition in columns:
+        if name not in existing:
+            connection.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+class SQLiteNewsArchive:
+    """On-disk news items keyed by a stable item ID, scored once at ingest.
+
+    news_symbols indexes items per symbol by publish time and news_items
+    per UTC day; news_ingests remembers when each symbol was last fetched.
+    Each item stores the cluster_id of its story (the item ID of the
+    story's first archived copy) and whether it was scraped from the news
+    page fallback, and each symbol link when it was made.
+    The connection is opened lazily and per process, like SQLiteSentimentStore.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self.reads = 0
+        self.items_added = 0
+        self.items_seen = 0
+        self.errors = 0
+
+    def _connect(self):
+        """Return this process's connection; caller must hold the lock"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS news_items ('
+                'item_id TEXT PRIMARY KEY, title TEXT NOT NULL, summary TEXT NOT NULL, link TEXT, publisher TEXT, '
+                'published INTEGER NOT NULL, day INTEGER NOT NULL, sentiment TEXT NOT NULL, confidence REAL NOT NULL, '
+                'ingested_at REAL NOT NULL, cluster_id TEXT, is_fallback INTEGER NOT NULL DEFAULT 0)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS news_items_day ON news_items (day)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS news_symbols ('
+                'symbol TEXT NOT NULL, published INTEGER NOT NULL, item_id TEXT NOT NULL, linked_at REAL NOT NULL DEFAULT 0, '
+                'PRIMARY KEY (symbol, published, item_id)) WITHOUT ROWID'
+            )
+            # Archives created before stories were tracked: their items count as one-copy stories
+            add_missing_columns(connection, 'news_items', [('cluster_id', 'TEXT'), ('is_fallback', 'INTEGER NOT NULL DEFAULT 0')])
+            add_missing_columns(connection, 'news_symbols', [('linked_at', 'REAL NOT NULL DEFAULT 0')])
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS news_ingests (symbol TEXT PRIMARY KEY, ingested_at REAL NOT NULL)'
+            )
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get_known_clusters(self, item_ids):
+        """Return {item_id: cluster_id} for the item_ids already archived"""
+        if not item_ids:
+            return {}
+        with self._lock:
+            try:
+                placeholders = ','.join('?' * len(item_ids))
+                rows = self._connect().execute(
+                    f'SELECT item_id, COALESCE(cluster_id, item_id) FROM news_items WHERE item_id IN ({placeholders})',
+                    list(item_ids)
+                ).fetchall()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading news archive: {e}")
+                return {}
+            return dict(rows)
+
+    def add(self, symbol, new_items, item_ids):
+        """Store newly scored (item_id, item) pairs, tag every fetched item_id with symbol and mark it ingested.
+
+        An item without a 'cluster_id' starts a story of its own; items
+        tagged is_fallback are read back with the tag.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.executemany(
+                    'INSERT OR IGNORE INTO news_items '
+                    '(item_id, title, summary, link, publisher, published, day, sentiment, confidence, ingested_at, cluster_id, is_fallback) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [
+                        (item_id, item['title'], item['summary'], item['link'], item['publisher'], int(item['published']),
+                         int(item['published']) // 86400, item['sentiment'], item['confidence'], now,
+                         item.get('cluster_id', item_id), int(bool(item.get('is_fallback'))))
+                        for item_id, item in new_items
+                    ]
+                )
+                # Items first seen under another symbol keep their original publish time
+                connection.executemany(
+                    'INSERT OR IGNORE INTO news_symbols (symbol, published, item_id, linked_at) '
+                    'SELECT ?, published, item_id, ? FROM news_items WHERE item_id = ?',
+                    [(symbol, now, item_id) for item_id in item_ids]
+                )
+                connection.execute(
+                    'INSERT OR REPLACE INTO news_ingests (symbol, ingested_at) VALUES (?, ?)', (symbol, now)
+                )
+                connection.commit()
+                self.items_added += len(new_items)
+                self.items_seen += len(item_ids)
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error writing news archive for {symbol}: {e}")
+
+    def last_ingested(self, symbol):
+        """Wall-clock time symbol's news was last fetched, or None if never"""
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    'SELECT ingested_at FROM news_ingests WHERE symbol = ?', (symbol,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading news archive: {e}")
+                return None
+            return row[0] if row else None
+
+    def get_window(self, symbol, since_ts, limit=None):
+        """Return symbol's items published at or after since_ts, newest first"""
+        return self._query_items(
+            'SELECT i.title, i.summary, i.link, i.publisher, i.published, i.sentiment, i.confidence, i.is_fallback '
+            'FROM news_symbols s JOIN news_items i ON i.item_id = s.item_id '
+            'WHERE s.symbol = ? AND s.published >= ? ORDER BY s.published DESC LIMIT ?',
+            (symbol, int(since_ts), -1 if limit is None else limit)
+        )
+
+    def get_story_rows(self, symbol, since_ts, linked_since=0):
+        """Return (item_id, cluster_id, published, sentiment, confidence, linked_at) for symbol's items
+        published at or after since_ts and linked to it at or after linked_since"""
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    'SELECT i.item_id, COALESCE(i.cluster_id, i.item_id), i.published, i.sentiment, i.confidence, s.linked_at '
+                    'FROM news_symbols s JOIN news_items i ON i.item_id = s.item_id '
+                    'WHERE s.symbol = ? AND s.published >= ? AND s.linked_at >= ?',
+                    (symbol, int(since_ts), linked_since)
+                ).fetchall()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading news archive: {e}")
+                return []
+            self.reads += 1
+            return rows
+
+    def get_day(self, day):
+        """Return every item published on a UTC day (days since the epoch), newest first"""
+        return self._query_items(
+            'SELECT title, summary, link, publisher, published, sentiment, confidence, is_fallback '
+            'FROM news_items WHERE day = ? ORDER BY published DESC',
+            (day,)
+        )
+
+    def _query_items(self, sql, params):
+        with self._lock:
+            try:
+                rows = self._connect().execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"Error reading news archive: {e}")
+                return []
+            self.reads += 1
+        items = []
+        for title, summary, link, publisher, published, sentiment, confidence, is_fallback in rows:
+            item = {
+                'title': title,
+                'summary': summary,
+                'link': link,
+                'publisher': publisher,
+                'published': published,
+                'sentiment': sentiment,
+                'confidence': confidence
+            }
+            if is_fallback:
+                # Tagged like parse_yahoo_news_page's items
+                item['is_fallback'] = True
+            items.append(item)
+        return items
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'reads': self.reads,
+                'items_added': self.items_added,
+                'items_seen': self.items_seen,
+                'errors': self.errors
+            }
+
+# Persistent news archive; None keeps news in news_cache only
+news_archive = SQLiteNewsArchive(NEWS_ARCHIVE_DB) if NEWS_ARCHIVE_DB else None
+
+# Last successful ingest per symbol in this process: throttles archive
+# refreshes to one per NEWS_CACHE_TTL and coalesces concurrent ones
+news_ingest_cache = TTLCache(max_entries=STOCK_CACHE_MAX_ENTRIES)
+
+@timed_stage('news_fetch')
+def ingest_symbol_news(symbol, company_name):
+    """Fetch symbol's latest news into news_archive, scoring only items it hasn't archived before.
+
+    Returns the number of new items, or None if every source failed.
+    """
+    candidates = None
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v1/finance/search?q={symbol}&quotesCount=1&newsCount=15"
+        response = http_session.get(url, timeout=10, market=get_symbol_market(symbol))
+        candidates = get_yahoo_news_candidates(response.json(), symbol, company_name)
+    except Exception as e:
+        print(f"Error fetching real news from Yahoo Finance: {e}")
     
-    profile = sentiment_profiles.get(symbol, {'base_sentiment': 0.0, 'volatility': 0.4})
-    sentiment_data = []
+    # Same fallback as get_real_news_from_yahoo when search finds too little
+    if candidates is None or count_news_stories(candidates) < 3:
+        try:
+            page_candidates = get_yahoo_news_page_candidates(fetch_yahoo_news_page(symbol), symbol, company_name)
+            candidates = (candidates or []) + tag_fallback_candidates(page_candidates)
+        except Exception as e:
+            print(f"Error scraping Yahoo Finance: {e}")
     
-    for i, price_point in enumerate(chart_data):
-        base_sentiment = profile['base_sentiment']
-        volatility = profile['volatility']
-        random_factor = random.uniform(-volatility, volatility)
-        
-        # Add price movement correlation
-        if i > 0:
-            price_change = (price_point['price'] - chart_data[i-1]['price']) / chart_data[i-1]['price']
-            price_sentiment_correlation = price_change * 0.5
-        else:
-            price_sentiment_correlation = 0
-        
-        final_sentiment = base_sentiment + random_factor + price_sentiment_correlation
-        final_sentiment = max(-1.0, min(1.0, final_sentiment))
-        
-        sentiment_data.append({
-            'date': price_point['date'],
-            'sentiment': round(final_sentiment, 2)
-        })
+    if candidates is None:
+        return None
+    return archive_news_candidates(symbol, candidates)
+
+def tag_fallback_candidates(candidates):
+    """News page candidates tagged is_fallback, as parse_yahoo_news_page tags its items"""
+    return [(item_id, text, dict(item, is_fallback=True)) for item_id, text, item in candidates]
+
+def archive_news_candidates(symbol, candidates):
+    """Score the candidates news_archive hasn't seen, store them and return how many were new.
+
+    Near-duplicates are scored once: every new copy of a story is archived
+    with the sentiment of its first new copy, and reads collapse them again.
+    """
+    # Drop repeats within the batch while keeping the first occurrence
+    unique = {}
+    for candidate in candidates:
+        unique.setdefault(candidate[0], candidate)
+    candidates = list(unique.values())
+    known = news_archive.get_known_clusters([item_id for item_id, _, _ in candidates])
+    
+    new_clusters = []
+    cluster_ids = []
+    for cluster in cluster_news_texts([text for _, text, _ in candidates]):
+        new_cluster = [candidates[i] for i in cluster if candidates[i][0] not in known]
+        if new_cluster:
+            new_clusters.append(new_cluster)
+            # New copies of an archived story join it; otherwise the first new copy starts one
+            cluster_ids.append(next((known[candidates[i][0]] for i in cluster if candidates[i][0] in known), new_cluster[0][0]))
+    if sum(len(cluster) for cluster in new_clusters) > len(new_clusters):
+        NEWS_DUPLICATES.inc(('archive',), sum(len(cluster) for cluster in new_clusters) - len(new_clusters))
+    
+    scored = score_news_candidates([cluster[0] for cluster in new_clusters])
+    new_items = [
+        (item_id, dict(item, sentiment=leader['sentiment'], confidence=leader['confidence'], cluster_id=cluster_id))
+        for cluster, leader, cluster_id in zip(new_clusters, scored, cluster_ids)
+        for item_id, _, item in cluster
+    ]
+    news_archive.add(symbol, new_items, [item_id for item_id, _, _ in candidates])
+    return len(new_items)
+
+def refresh_news_archive(symbol, company_name):
+    """Ingest symbol's news unless this process did so within NEWS_CACHE_TTL or is doing it now"""
+    news_ingest_cache.get_or_load(symbol, lambda: ingest_symbol_news(symbol, company_name), NEWS_CACHE_TTL)
+
+def get_archived_news_items(symbol, company_name):
+    """Recent news for a symbol from news_archive, padded with generic updates like get_alternative_news"""
+    since_ts = time.time() - NEWS_ARCHIVE_WINDOW_DAYS * 86400
+    # Read past the limit so it still holds after copies of a story are collapsed
+    news_items = collapse_news_items(news_archive.get_window(symbol, since_ts, NEWS_ARCHIVE_MAX_ITEMS * 4))[:NEWS_ARCHIVE_MAX_ITEMS]
+    add_generic_news(news_items, symbol, company_name)
+    return news_items
+
+# Numeric score per sentiment label, as in calculate_overall_sentiment
+SENTIMENT_LABEL_SCORES = {'Positive': 1.0, 'Negative': -1.0}
+
+def compute_daily_sentiment(dates, news_days, weighted_scores, weights, counts):
+    """Align per-UTC-day news aggregates to chart dates and derive the sentiment series.
+
+    News counts toward the first trading day on or after its UTC date
+    (weekend news lands on Monday); news newer than the last chart point
+    lands on that point, news older than the first is ignored. Returns
+    columns: {'date': [...], 'sentiment': [...], 'news_count': [...], ...}.
+    """
+    n = len(dates)
+    if n == 0:
+        return {name: [] for name in ('date', 'sentiment', 'news_count', 'daily', *(f"mean_{window}d" for window in SENTIMENT_ROLLING_WINDOWS))}
+    
+    trade_days = np.asarray(dates, dtype=np.int64) // 86400000
+    keep = news_days >= trade_days[0]
+    positions = np.minimum(np.searchsorted(trade_days, news_days[keep], side='left'), n - 1)
+    day_scores = np.bincount(positions, weights=weighted_scores[keep], minlength=n)
+    day_weights = np.bincount(positions, weights=weights[keep], minlength=n)
+    day_counts = np.bincount(positions, weights=counts[keep], minlength=n).astype(np.int64)
+    
+    # Exponentially decayed, confidence-weighted mean; the kernel is cut off
+    # once weights fall below 2**-20
+    decay = 0.5 ** (1 / SENTIMENT_DECAY_HALFLIFE_DAYS)
+    kernel = decay ** np.arange(min(n, int(np.ceil(SENTIMENT_DECAY_HALFLIFE_DAYS * 20))))
+    decayed_scores = np.convolve(day_scores, kernel)[:n]
+    decayed_weights = np.convolve(day_weights, kernel)[:n]
+    sentiment = np.divide(decayed_scores, decayed_weights, out=np.zeros(n), where=decayed_weights > 0)
     
-    return sentiment_data
+    # Rolling confidence-weighted means from prefix sums; NaN where a window has no news
+    score_sums = np.concatenate(([0.0], np.cumsum(day_scores)))
+    weight_sums = np.concatenate(([0.0], np.cumsum(day_weights)))
+    ends = np.arange(1, n + 1)
+    means = {'daily': np.divide(day_scores, day_weights, out=np.full(n, np.nan), where=day_weights > 0)}
+    for window in SENTIMENT_ROLLING_WINDOWS:
+        starts = np.maximum(ends - window, 0)
+        window_weights = weight_sums[ends] - weight_sums[starts]
+        means[f"mean_{window}d"] = np.divide(
+            score_sums[ends] - score_sums[starts], window_weights, out=np.full(n, np.nan), where=window_weights > 0
+        )
+    
+    columns = {'date': list(dates), 'sentiment': np.round(sentiment, 2).tolist(), 'news_count': day_counts.tolist()}
+    for name, values in means.items():
+        columns[name] = [None if np.isnan(value) else round(value, 2) for value in values.tolist()]
+    return columns
+
+class DailySentimentSeries:
+    """One symbol's news stories folded into per-UTC-day sums, updated incrementally.
+
+    A story is every copy sharing a cluster_id (an item's own ID when it
+    has none). It counts once, on the UTC day of its earliest copy (ties
+    broken by item ID) with that copy's label score and confidence, weighted
+    by get_story_weight of its copy count. add_items only folds in copies
+    it hasn't counted and re-sums just the days they touch, each in cluster
+    ID order, so the sums depend on which copies were added, never on the
+    order they arrived in: workers reading the same archive agree.
+    """
+
+    # Archive links are re-read from this long before the newest one seen,
+    # in case another process committed links stamped slightly earlier
+    ARCHIVE_OVERLAP_SECONDS = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # one archive sync at a time, so a reset can't interleave with another window
+        self._reset()
+
+    def _reset(self):
+        """Forget every folded-in copy; caller must hold the lock (or be __init__)"""
+        self._copies = {}  # item_id -> copies counted for it
+        self._stories = {}  # cluster_id -> [copies, (published, item_id) of earliest copy, day, score, confidence]
+        self._day_stories = {}  # UTC day -> cluster_ids counted on it
+        self._day_sums = {}  # UTC day -> (label score * weight, weight, stories)
+        self._version = 0
+        self._memo = None  # (version, chart dates, series)
+        self._archive_since = None  # since_ts of the archive rows folded in
+        self._linked_since = 0.0
+
+    def add_items(self, news_items):
+        """Fold in copies not counted yet and return the UTC days whose sums changed.
+
+        Items stand for get_news_cluster_size copies; 'item_id' and
+        'cluster_id' are used when present.
+        """
+        with self._lock:
+            touched = set()
+            for item in news_items:
+                item_id = item.get('item_id') or get_news_item_id(item)
+                copies = get_news_cluster_size(item)
+                counted = self._copies.get(item_id, 0)
+                if copies <= counted:
+                    continue
+                self._copies[item_id] = copies
+                cluster_id = item.get('cluster_id', item_id)
+                story = self._stories.setdefault(cluster_id, [0, None, None, 0.0, 0.0])
+                story[0] += copies - counted
+                first_copy = (int(item['published']), item_id)
+                if story[1] is None or first_copy < story[1]:
+                    if story[2] is not None:
+                        self._day_stories[story[2]].discard(cluster_id)
+                        touched.add(story[2])
+                    story[1:] = [first_copy, first_copy[0] // 86400,
+                                 SENTIMENT_LABEL_SCORES.get(item['sentiment'], 0.0), float(item['confidence'])]
+                    self._day_stories.setdefault(story[2], set()).add(cluster_id)
+                touched.add(story[2])
+            for day in touched:
+                self._sum_day(day)
+            if touched:
+                self._version += 1
+            return touched
+
+    def _sum_day(self, day):
+        """Recompute one day's sums from its stories; caller must hold the lock"""
+        cluster_ids = sorted(self._day_stories.get(day, ()))
+        if not cluster_ids:
+            self._day_stories.pop(day, None)
+            self._day_sums.pop(day, None)
+            return
+        weighted_score = weight = 0.0
+        for cluster_id in cluster_ids:
+            copies, _, _, score, confidence = self._stories[cluster_id]
+            story_weight = confidence * get_story_weight(copies)
+            weighted_score += score * story_weight
+            weight += story_weight
+        self._day_sums[day] = (weighted_score, weight, len(cluster_ids))
+
+    def sync_archive(self, archive, symbol, since_ts):
+        """Fold in symbol's archived copies published from since_ts on that were linked since the last sync.
+
+        A different since_ts (the chart window moved) starts over from the
+        archive, so the series never depends on earlier windows.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if self._archive_since != since_ts:
+                    self._reset()
+                    self._archive_since = since_ts
+            rows = archive.get_story_rows(symbol, since_ts, max(0.0, self._linked_since - self.ARCHIVE_OVERLAP_SECONDS))
+            self.add_items([
+                {'item_id': item_id, 'cluster_id': cluster_id, 'published': published, 'sentiment': sentiment, 'confidence': confidence}
+                for item_id, cluster_id, published, sentiment, confidence, _ in rows
+            ])
+            if rows:
+                self._linked_since = max(self._linked_since, max(row[5] for row in rows))
+
+    def get_series(self, dates):
+        """compute_daily_sentiment columns for chart dates, memoized until new copies or other dates come in"""
+        dates = tuple(dates)
+        with self._lock:
+            if self._memo is not None and self._memo[:2] == (self._version, dates):
+                return self._memo[2]
+            days = sorted(self._day_sums)
+            sums = np.array([self._day_sums[day] for day in days], dtype=np.float64).reshape(len(days), 3)
+            series = compute_daily_sentiment(dates, np.array(days, dtype=np.int64), sums[:, 0], sums[:, 1], sums[:, 2])
+            self._memo = (self._version, dates, series)
+            return series
+
+# Per-symbol DailySentimentSeries; entries only get evicted by size
+sentiment_series_cache = TTLCache(max_entries=STOCK_CACHE_MAX_ENTRIES)
+
+def generate_stock_sentiment_data(symbol, chart_data, news_items):
+    """Daily news sentiment for each chart point, aggregated from scored news items.
+
+    'sentiment' is the exponentially decayed, confidence-weighted mean label
+    score in [-1, 1] (0 until the first news); 'daily' and the rolling
+    'mean_Nd' fields are None for windows without news.
+
+    With news_archive set, the symbol's series folds in the archived copies
+    over the chart range by their stored cluster IDs; otherwise it folds in
+    news_items as they arrive.
+    """
+    series = sentiment_series_cache.get_or_load(symbol, DailySentimentSeries, float('inf'))
+    if news_archive is not None:
+        if chart_data['date']:
+            series.sync_archive(news_archive, symbol, chart_data['date'][0] // 1000)
+    else:
+        # Generic updates padding thin news aren't headlines; counting them would
+        # pull the series toward neutral exactly when real news is missing
+        series.add_items([item for item in news_items if not item.get('is_placeholder')])
+    return series.get_series(chart_data['date'])
 
 def get_stock_news_items(symbol, company_name):
     """Get real news items for a stock using Yahoo Finance API"""
-    return get_real_news_from_yahoo(symbol, company_name)
+    if news_archive is not None:
+        last_ingested = news_archive.last_ingested(symbol)
+        if last_ingested is None:
+            # Nothing archived yet, so this request has to wait for the first fetch
+            refresh_news_archive(symbol, company_name)
+        elif time.time() - last_ingested > NEWS_CACHE_TTL:
+            # Serve what's archived now and refresh off the request path
+            upstream_executor.submit(refresh_news_archive, symbol, company_name)
+        return get_archived_news_items(symbol, company_name)
+    
+    news_items = news_cache.get_or_load(
+        symbol,
+        lambda: get_real_news_from_yahoo(symbol, company_name),
+        NEWS_CACHE_TTL
+    )
+    return list(news_items)
 
+@timed_stage('keywords')
 def extract_keywords_from_news(news_items):
     """Extract keywords from real news content for word cloud"""
     try:
@@ -558,50 +3042,488 @@ def extract_keywords_from_news(news_items):
             all_text += " " + item.get('title', '') + " " + item.get('summary', '')
         
         # Clean and tokenize text
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', all_text.lower())
+        words = KEYWORD_PATTERN.findall(all_text.lower())
         
         # Count word frequencies
         word_freq = {}
         for word in words:
-            if word not in ['the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'man', 'oil', 'sit', 'try', 'use', 'she', 'put', 'end', 'why', 'let', 'say', 'ask', 'run', 'own', 'set', 'too', 'any', 'may', 'say', 'she', 'use', 'her', 'many', 'some', 'time', 'very', 'when', 'come', 'here', 'just', 'like', 'long', 'make', 'much', 'over', 'such', 'take', 'than', 'them', 'well', 'were']:
+            if word not in KEYWORD_STOPWORDS:
                 word_freq[word] = word_freq.get(word, 0) + 1
         
         # Sort by frequency and take top keywords
         sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
         
-        # Create keyword objects with sentiment
-        keywords = []
-        sentiment_keywords = {
-            'positive': ['growth', 'profit', 'revenue', 'success', 'strong', 'increase', 'gain', 'rise', 'boost', 'improve', 'excellent', 'outstanding', 'record', 'breakthrough', 'innovation', 'expansion', 'partnership', 'deal', 'acquisition', 'investment', 'upgrade', 'beat', 'exceed', 'surge', 'rally', 'bullish', 'optimistic', 'confidence', 'momentum', 'leadership', 'dominance'],
-            'negative': ['loss', 'decline', 'fall', 'drop', 'crash', 'plunge', 'slump', 'weak', 'poor', 'disappoint', 'miss', 'cut', 'reduce', 'layoff', 'crisis', 'concern', 'risk', 'threat', 'challenge', 'problem', 'issue', 'trouble', 'struggle', 'pressure', 'volatility', 'uncertainty', 'bearish', 'pessimistic', 'downgrade', 'warning', 'caution'],
-            'neutral': ['market', 'company', 'stock', 'share', 'price', 'earnings', 'quarter', 'year', 'report', 'analyst', 'forecast', 'expectation', 'guidance', 'outlook', 'trend', 'sector', 'industry', 'business', 'financial', 'result', 'performance', 'data', 'news', 'update', 'announcement', 'statement', 'conference', 'call', 'meeting', 'agreement']
-        }
+        # Create keyword objects with sentiment
+        keywords = []
+        
+        for word, freq in sorted_words[:15]:  # Top 15 keywords
+            hits = find_lexicon_hits([word])
+            sentiment = 'neutral'
+            for sent_type in ('positive', 'negative', 'neutral'):
+                if f'keyword_{sent_type}' in hits:
+                    sentiment = sent_type
+                    break
+            
+            keywords.append({
+                'text': word,
+                'weight': min(20, freq * 2),  # Scale weight
+                'sentiment': sentiment
+            })
+        
+        return keywords
+        
+    except Exception as e:
+        print(f"Error extracting keywords: {e}")
+        # Return default keywords if extraction fails
+        return [
+            {'text': 'market', 'weight': 15, 'sentiment': 'neutral'},
+            {'text': 'growth', 'weight': 12, 'sentiment': 'positive'},
+            {'text': 'revenue', 'weight': 10, 'sentiment': 'positive'},
+            {'text': 'earnings', 'weight': 8, 'sentiment': 'neutral'},
+            {'text': 'analysts', 'weight': 6, 'sentiment': 'neutral'}
+        ]
+
+# Index cards shown on the homepage, per market location
+DEFAULT_MARKETS = {
+    'US': [
+        {'symbol': '^DJI', 'name': 'Dow Jones Industrial Average', 'display_name': 'Dow Jones'},
+        {'symbol': '^GSPC', 'name': 'S&P 500', 'display_name': 'S&P 500'}
+    ],
+    'IN': [
+        {'symbol': '^NSEI', 'name': 'Nifty 50', 'display_name': 'Nifty 50'},
+        {'symbol': '^BSESN', 'name': 'S&P BSE Sensex', 'display_name': 'Sensex'}
+    ]
+}
+
+def calculate_overall_sentiment(news_items):
+    """Combine per-item sentiment into an overall label and confidence.
+
+    Items are weighted by confidence times get_news_cluster_weight, so a
+    story collapsed from several copies counts for more than one, but not
+    for as much as all of its copies would.
+    """
+    if not news_items:
+        overall_sentiment = 'Neutral'
+        confidence = 0.5
+    else:
+        # Calculate weighted sentiment based on ML confidence scores
+        total_weighted_score = 0
+        total_weight = 0
+        total_cluster_weight = 0
+        
+        for item in news_items:
+            sentiment = item['sentiment']
+            item_confidence = item['confidence']
+            cluster_weight = get_news_cluster_weight(item)
+            
+            # Convert sentiment to numeric score
+            if sentiment == 'Positive':
+                score = 1
+            elif sentiment == 'Negative':
+                score = -1
+            else:  # Neutral
+                score = 0
+            
+            # Weight by confidence and by how many copies of the story were collapsed
+            total_weighted_score += score * item_confidence * cluster_weight
+            total_weight += item_confidence * cluster_weight
+            total_cluster_weight += cluster_weight
+        
+        if total_weight > 0:
+            avg_weighted_score = total_weighted_score / total_weight
+            avg_confidence = total_weight / total_cluster_weight
+            
+            # Determine overall sentiment based on weighted score
+            if avg_weighted_score >= 0.3:
+                overall_sentiment = 'Positive'
+                confidence = min(0.95, avg_confidence + 0.1)
+            elif avg_weighted_score <= -0.3:
+                overall_sentiment = 'Negative'
+                confidence = min(0.95, avg_confidence + 0.1)
+            else:
+                overall_sentiment = 'Neutral'
+                confidence = avg_confidence
+        else:
+            overall_sentiment = 'Neutral'
+            confidence = 0.5
+    
+    return overall_sentiment, confidence
+
+def get_analysis_needs(sections):
+    """Which upstream fetches (news, prices) the requested sections depend on"""
+    sections = set(sections)
+    return bool({'news', 'insights', 'keywords', 'sentiment_data'} & sections), bool({'prices', 'sentiment_data'} & sections)
+
+def analyze_stock(symbol, sections=ANALYZE_SECTIONS, stock_data=None):
+    """Run the sentiment pipeline for one symbol and return the requested sections.
+
+    sections is any subset of ANALYZE_SECTIONS; upstream fetches that no
+    requested section depends on are skipped. Pass stock_data to reuse
+    prices that were already fetched (e.g. in bulk) instead of fetching them.
+    """
+    return merge_analysis_sections(iter_analysis_sections(symbol, sections, stock_data))
+
+def iter_analysis_sections(symbol, sections=ANALYZE_SECTIONS, stock_data=None):
+    """Yield analyze_stock's result as (section, fields) pairs, each as soon as its data is ready.
+
+    The first pair is 'meta' and the last is 'done' (degraded flags); in
+    between, price sections follow the price fetch and news sections follow
+    the news fetch, whichever finishes first. sentiment_data needs both and
+    comes just before 'done'.
+    """
+    company_name = get_company_name(symbol)
+    need_news, need_prices = get_analysis_needs(sections)
+    
+    # Fetch news and prices concurrently; slow sources are dropped at the deadline
+    deadline = time.monotonic() + ANALYZE_DEADLINE_SECONDS
+    futures = {}
+    if need_news:
+        # Get real news items using ML sentiment analysis
+        futures[submit_in_context(upstream_executor, get_stock_news_items, symbol, company_name)] = 'news'
+    if need_prices and stock_data is None:
+        # Get real stock data with Indian stock support
+        futures[submit_in_context(upstream_executor, get_real_stock_data, symbol)] = 'stock_data'
+    
+    yield 'meta', build_analysis_meta(symbol, company_name)
+    
+    if need_prices and stock_data is not None:
+        yield from build_price_sections(sections, stock_data)
+    news_items = []
+    
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if futures[future] == 'news':
+                news_items = future.result()
+                yield from build_news_sections(symbol, company_name, sections, news_items)
+            else:
+                stock_data = future.result()
+                yield from build_price_sections(sections, stock_data)
+    
+    degraded_sections = []
+    for future, source in futures.items():
+        if future not in pending:
+            continue
+        print(f"{'News' if source == 'news' else 'Stock data'} fetch for {symbol} missed the {ANALYZE_DEADLINE_SECONDS}s deadline")
+        DEADLINE_MISSES.inc((source, get_symbol_market(symbol)))
+        degraded_sections.append(source)
+        if source == 'news':
+            yield from build_news_sections(symbol, company_name, sections, [])
+        else:
+            stock_data = get_simulated_stock_data(symbol)
+            yield from build_price_sections(sections, stock_data)
+    
+    if 'sentiment_data' in sections:
+        yield 'sentiment_data', build_sentiment_data_section(symbol, stock_data, news_items)
+    
+    yield 'done', {'degraded': bool(degraded_sections), 'degraded_sections': degraded_sections}
+
+def merge_analysis_sections(pairs):
+    """Combine (section, fields) pairs into the single analyze_sentiment response"""
+    result = {}
+    for _, fields in pairs:
+        result.update(fields)
+    return result
+
+def encode_analysis_section(section, fields, columnar=False):
+    """One line of the streamed analyze_sentiment response"""
+    return app.json.dumps({'section': section, 'data': format_chart_series(fields, columnar)}) + '\n'
+
+def wants_columnar(format_param, accept):
+    """Whether a request asked for columnar chart series: ?format=columnar or COLUMNAR_MEDIA_TYPE in Accept"""
+    return format_param == 'columnar' or COLUMNAR_MEDIA_TYPE in (accept or '')
+
+def request_wants_columnar():
+    return wants_columnar(request.args.get('format'), request.headers.get('Accept'))
+
+def format_chart_series(fields, columnar):
+    """fields with chart_data and sentiment_data in the requested format.
+
+    Both are kept as columns internally and sent that way when columnar;
+    otherwise as the default list with one object per point.
+    """
+    if columnar or not ('chart_data' in fields or 'sentiment_data' in fields):
+        return fields
+    formatted = dict(fields)
+    if 'chart_data' in fields:
+        formatted['chart_data'] = chart_columns_to_rows(fields['chart_data'])
+    if 'sentiment_data' in fields:
+        formatted['sentiment_data'] = columns_to_rows(fields['sentiment_data'])
+    return formatted
+
+def chart_columns_to_rows(columns):
+    """[{'date', 'price', 'volume'}] per chart point, plus open/high/low where the bar has all three"""
+    rows = [{'date': date, 'price': price, 'volume': volume}
+            for date, price, volume in zip(columns['date'], columns['price'], columns['volume'])]
+    if 'open' in columns:
+        for row, open_, high, low in zip(rows, columns['open'], columns['high'], columns['low']):
+            if open_ is not None and high is not None and low is not None:
+                row.update({'open': open_, 'high': high, 'low': low})
+    return rows
+
+def columns_to_rows(columns):
+    """One dict per position from a dict of equal-length columns"""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+def slice_chart_columns(columns, start):
+    """The chart points from start on (negative counts from the end)"""
+    return {name: values[start:] for name, values in columns.items()}
+
+def build_analysis_meta(symbol, company_name):
+    """Fields every analyze_sentiment response starts with"""
+    # Determine currency and Indian stock status
+    return {
+        'symbol': symbol,
+        'company_name': company_name,
+        'currency': get_currency_sign(symbol),
+        'is_indian_stock': is_indian_symbol(symbol)
+    }
+
+def build_news_sections(symbol, company_name, sections, news_items):
+    """(section, fields) pairs computed from news items: news, insights, keywords"""
+    parts = []
+    
+    if 'news' in sections:
+        # Calculate overall sentiment based on real ML analysis
+        overall_sentiment, confidence = calculate_overall_sentiment(news_items)
+        parts.append(('news', {
+            'news_count': len(news_items),
+            'overall_sentiment': overall_sentiment,
+            'confidence': round(confidence, 2),
+            'news_items': news_items
+        }))
+    
+    if 'insights' in sections:
+        # Generate summarized insights from real news items
+        parts.append(('insights', {'insights': generate_summarized_insights(news_items, symbol, company_name)}))
+    
+    if 'keywords' in sections:
+        # Generate keyword cloud data from real news content
+        parts.append(('keywords', {'keywords': extract_keywords_from_news(news_items)}))
+    
+    return parts
+
+def build_price_sections(sections, stock_data):
+    """(section, fields) pairs computed from stock data: prices"""
+    parts = []
+    
+    if 'prices' in sections:
+        fields = {
+            'chart_data': stock_data["chart_data"],
+            'current_price': stock_data["current_price"],
+            'price_change': stock_data["price_change"],
+            'price_change_percent': stock_data["price_change_percent"],
+            'data_timestamp': stock_data.get("data_timestamp", datetime.now().isoformat()),
+            'data_source': stock_data.get("data_source", "Yahoo Finance (Real-time)")
+        }
+        if 'data_age_seconds' in stock_data:
+            # Last-known-good prices while a refresh runs
+            fields['data_age_seconds'] = stock_data['data_age_seconds']
+        parts.append(('prices', fields))
+    
+    return parts
+
+def build_sentiment_data_section(symbol, stock_data, news_items):
+    """sentiment_data fields: daily news sentiment aligned to the price chart"""
+    return {'sentiment_data': generate_stock_sentiment_data(symbol, stock_data["chart_data"], news_items)}
+
+class RateBudget:
+    """Token bucket shared by background jobs so they stay under an upstream call rate.
+
+    With a path, the bucket's state is kept in that file under an exclusive
+    flock, so every process using the same path draws from one budget.
+    """
+
+    def __init__(self, calls_per_minute, burst=5, path=None):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1.0, float(burst))
+        self.path = path if fcntl is not None else None
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, updated):
+        """(tokens, updated, seconds to wait) after trying to take one token at the current time"""
+        now = time.time()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, now, 0.0
+        return tokens, now, (1 - tokens) / self.rate
+
+    def _take_shared(self):
+        """_take on the state in self.path; caller must hold the lock"""
+        try:
+            with open(self.path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        tokens, updated = (float(value) for value in f.read().split())
+                    except ValueError:
+                        tokens, updated = self.capacity, time.time()
+                    tokens, updated, wait = self._take(tokens, updated)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(f"{tokens} {updated}")
+                    f.flush()
+                    return wait
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        except OSError as e:
+            print(f"Error using shared prefetch budget {self.path}, using a per-process one: {e}")
+            self.path = None
+            return None
+
+    def acquire(self, stop_event=None):
+        """Block until a call may be made; returns False if stop_event was set while waiting"""
+        while True:
+            with self._lock:
+                wait = self._take_shared() if self.path else None
+                if wait is None:
+                    self._tokens, self._updated, wait = self._take(self._tokens, self._updated)
+                if wait == 0:
+                    return True
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+class PrefetchScheduler:
+    """Background thread that keeps prices and news for the tracked universe warm.
+
+    Each stock is one job (chart + news); each market's default indices are
+    one job (a single bulk quote request). Jobs run every
+    PREFETCH_INTERVAL_OPEN seconds while their exchange trades and every
+    PREFETCH_INTERVAL_CLOSED seconds otherwise, with jitter, and refresh
+    the same caches the API endpoints read, joining loads they have in flight.
+    """
+
+    def __init__(self, symbols, default_markets, budget):
+        self.symbols = list(symbols)
+        self.default_markets = default_markets
+        self.budget = budget
+        self._next_run = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.errors = 0
+        self.last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # Spread the first run over a short window so workers don't fire together
+            now = time.monotonic()
+            jobs = [('stock', symbol) for symbol in self.symbols]
+            jobs += [('indices', market) for market in self.default_markets]
+            self._next_run = {job: now + random.uniform(0, 30) for job in jobs}
+            self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+            self._thread.start()
+        print(f"Prefetch scheduler started for {len(jobs)} jobs in process {os.getpid()}")
+
+    def stop(self, timeout=None):
+        """Ask the thread to exit; with a timeout, also wait up to that long for it"""
+        self._stop.set()
+        thread = self._thread
+        if timeout is not None and thread is not None:
+            thread.join(timeout)
+
+    def _get_interval(self, job):
+        kind, key = job
+        market = key if kind == 'indices' else get_market_for_yahoo_symbol(resolve_yahoo_symbol(key))
+        interval = PREFETCH_INTERVAL_OPEN if is_market_open(market) else PREFETCH_INTERVAL_CLOSED
+        return interval * random.uniform(1 - PREFETCH_JITTER, 1 + PREFETCH_JITTER)
+
+    def _get_entry_ttl(self, job):
+        """Keep prefetched entries alive until the next run is due, plus some slack"""
+        kind, key = job
+        market = key if kind == 'indices' else get_market_for_yahoo_symbol(resolve_yahoo_symbol(key))
+        interval = PREFETCH_INTERVAL_OPEN if is_market_open(market) else PREFETCH_INTERVAL_CLOSED
+        return interval * (1 + PREFETCH_JITTER) + 60
+
+    def _run_job(self, job):
+        kind, key = job
+        ttl = self._get_entry_ttl(job)
+        if kind == 'indices':
+            # get_bulk_stock_data has no in-flight loads to join (it fetches
+            # all its misses in one spark request), so these are plain writes
+            yahoo_symbols = [market['symbol'] for market in self.default_markets[key]]
+            for yahoo_symbol, stock_data in fetch_yahoo_spark(yahoo_symbols, BULK_PRICE_RANGES['quote']).items():
+                bulk_price_cache.set(get_bulk_cache_key('quote', yahoo_symbol), stock_data, max(ttl, get_stock_cache_ttl(yahoo_symbol)))
+            return
+        
+        yahoo_symbol = resolve_yahoo_symbol(key)
+        stock_data_cache.refresh(yahoo_symbol, lambda: load_stock_chart(yahoo_symbol), max(ttl, get_stock_cache_ttl(yahoo_symbol)))
         
-        for word, freq in sorted_words[:15]:  # Top 15 keywords
-            sentiment = 'neutral'
-            for sent_type, words_list in sentiment_keywords.items():
-                if word in words_list:
-                    sentiment = sent_type
-                    break
+        if self._stop.is_set():
+            return
+        company_name = get_company_name(key)
+        if news_archive is not None:
+            news_ingest_cache.refresh(key, lambda: ingest_symbol_news(key, company_name), max(ttl, NEWS_CACHE_TTL))
+            return
+        news_cache.refresh(key, lambda: get_real_news_from_yahoo(key, company_name), max(ttl, NEWS_CACHE_TTL))
+
+    def _run(self):
+        # Every upstream request made on this thread, including retries and
+        # news fallbacks, is charged to the budget by http_session
+        current_upstream_budget.set(self.budget)
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due = sorted((at, job) for job, at in self._next_run.items() if at <= now)
+            for _, job in due:
+                if self._stop.is_set():
+                    return
+                try:
+                    self._run_job(job)
+                    self.runs += 1
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = f"{job[0]} {job[1]}: {e}"
+                    print(f"Error prefetching {job[0]} {job[1]}: {e}")
+                self._next_run[job] = time.monotonic() + self._get_interval(job)
             
-            keywords.append({
-                'text': word,
-                'weight': min(20, freq * 2),  # Scale weight
-                'sentiment': sentiment
-            })
-        
-        return keywords
-        
-    except Exception as e:
-        print(f"Error extracting keywords: {e}")
-        # Return default keywords if extraction fails
-        return [
-            {'text': 'market', 'weight': 15, 'sentiment': 'neutral'},
-            {'text': 'growth', 'weight': 12, 'sentiment': 'positive'},
-            {'text': 'revenue', 'weight': 10, 'sentiment': 'positive'},
-            {'text': 'earnings', 'weight': 8, 'sentiment': 'neutral'},
-            {'text': 'analysts', 'weight': 6, 'sentiment': 'neutral'}
-        ]
+            wait = min(self._next_run.values()) - time.monotonic() if self._next_run else 60
+            self._stop.wait(min(60, max(1, wait)))
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'jobs': len(self._next_run),
+            'runs': self.runs,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
+
+prefetch_scheduler = PrefetchScheduler(
+    [symbol.strip() for symbol in PREFETCH_SYMBOLS.split(',') if symbol.strip()] or symbol_registry.symbols(),
+    DEFAULT_MARKETS,
+    RateBudget(PREFETCH_MAX_CALLS_PER_MINUTE, path=PREFETCH_BUDGET_FILE or None)
+) if PREFETCH_ENABLED else None
+prefetch_scheduler_pid = None
+
+def start_prefetch_scheduler():
+    """Start the prefetch thread in this process, if enabled and not already started here"""
+    global prefetch_scheduler_pid
+    if prefetch_scheduler is not None and prefetch_scheduler_pid != os.getpid():
+        prefetch_scheduler_pid = os.getpid()
+        prefetch_scheduler.start()
+
+def stop_prefetch_scheduler_before_fork():
+    """Stop the thread before a fork (e.g. gunicorn --preload forking workers), so no lock is held across it.
+
+    The forked children start their own; the parent leaves it stopped.
+    """
+    if prefetch_scheduler is not None and prefetch_scheduler_pid == os.getpid():
+        prefetch_scheduler.stop(timeout=5)
 
 @app.route('/')
 def home():
@@ -613,9 +3535,215 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'service': 'stock-sentiment-analysis'
+        'service': 'stock-sentiment-analysis',
+        'caches': {
+            'stock_data': stock_data_cache.stats(),
+            'bulk_prices': bulk_price_cache.stats(),
+            'sentiment': sentiment_cache.stats(),
+            'sentiment_disk': sentiment_store.stats() if sentiment_store is not None else None,
+            'news': news_cache.stats(),
+            'downsampled_charts': downsampled_chart_cache.stats(),
+            'price_history_disk': price_store.stats() if price_store is not None else None,
+            'news_archive': news_archive.stats() if news_archive is not None else None
+        },
+        'prefetch': prefetch_scheduler.stats() if prefetch_scheduler is not None else {'enabled': False},
+        'async_upstream': async_upstream.stats(),
+        'circuit_breakers': {host: breaker['state'] for host, breaker in circuit_breakers.stats()['hosts'].items()}
     }), 200
 
+@app.route('/api/circuit_breakers')
+def circuit_breaker_state():
+    """Per-upstream-host breaker state, recent error/slow-call rates and thresholds"""
+    return jsonify(circuit_breakers.stats())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@metrics.collector
+def collect_cache_metrics():
+    """Lookup counters, sizes and hit ratios of the in-process caches"""
+    lookups = Counter(metrics.prefix + 'cache_lookups_total', 'Cache lookups by result (hit, miss, coalesced, stale)', ('cache', 'result'))
+    entries = Gauge(metrics.prefix + 'cache_entries', 'Entries held, including stale ones', ('cache',))
+    hit_ratio = Gauge(metrics.prefix + 'cache_hit_ratio', 'Share of lookups answered without loading', ('cache',))
+    caches = (
+        ('stock_data', stock_data_cache),
+        ('bulk_prices', bulk_price_cache),
+        ('sentiment', sentiment_cache),
+        ('news', news_cache),
+        ('downsampled_charts', downsampled_chart_cache),
+        ('news_ingest', news_ingest_cache),
+        ('sentiment_series', sentiment_series_cache)
+    )
+    for name, cache in caches:
+        stats = cache.stats()
+        for result, field in (('hit', 'hits'), ('miss', 'misses'), ('coalesced', 'coalesced'), ('stale', 'stale_hits')):
+            lookups.inc((name, result), stats[field])
+        entries.set((name,), stats['entries'])
+        hit_ratio.set((name,), stats['hit_rate'])
+    return lookups, entries, hit_ratio
+
+@metrics.collector
+def collect_upstream_metrics():
+    """Circuit breaker states and async upstream requests in flight"""
+    states = Gauge(metrics.prefix + 'circuit_breaker_state', 'Current breaker state per upstream host (1 for the active state)', ('host', 'state'))
+    for host, stats in circuit_breakers.stats()['hosts'].items():
+        for state in ('closed', 'open', 'half_open'):
+            states.set((host, state), int(stats['state'] == state))
+    active = Gauge(metrics.prefix + 'async_upstream_in_flight', 'Async upstream requests currently holding a host slot', ('host',))
+    for host, count in async_upstream.stats()['active_by_host'].items():
+        active.set((host,), count)
+    return states, active
+
+# Content types worth compressing; NDJSON streams are sent as produced
+COMPRESSIBLE_MIMETYPES = frozenset(['application/json', 'text/html', 'text/plain', 'text/css', 'text/javascript', 'application/javascript'])
+
+def get_body_etag(body):
+    """Weak ETag for a response body. Weak, so it still matches once the body is compressed."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    opaque_tag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or (candidate[2:] if candidate.startswith('W/') else candidate) == opaque_tag:
+            return True
+    return False
+
+def build_cache_control(max_age):
+    """Cache-Control for a shareable response that is fresh for max_age seconds"""
+    return f"public, max-age={max(0, int(max_age))}, stale-while-revalidate={HTTP_STALE_WHILE_REVALIDATE}"
+
+def negotiate_content_encoding(accept_encoding):
+    """'br' or 'gzip', whichever Accept-Encoding ranks higher (br on a tie), or None"""
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for coding in ('br', 'gzip'):
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def compress_body(body, accept_encoding):
+    """(body, content encoding) with body compressed if it is large enough and the client accepts it"""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    encoding = negotiate_content_encoding(accept_encoding)
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY), encoding
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0), encoding
+    return body, None
+
+# Profiles carry file paths and internal timings: keep them out of shared caches
+PROFILED_CACHE_CONTROL = 'private, no-store'
+
+def cacheable_json_response(payload, cache_control):
+    """jsonify(payload) with an ETag and Cache-Control, or a 304 if the client's copy is current.
+
+    cache_control 'no-store' skips the ETag: the response must not be reused.
+    Profiled requests are never cacheable, since add_request_timing adds the
+    profile to the body afterwards.
+    """
+    if 'request_profile' in g:
+        cache_control = PROFILED_CACHE_CONTROL
+    response = jsonify(payload)
+    response.headers['Cache-Control'] = cache_control
+    if 'no-store' in cache_control:
+        return response
+
+    etag = get_body_etag(response.get_data())
+    response.headers['ETag'] = etag
+    if request.method in ('GET', 'HEAD') and etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+    return response
+
+# Registered before add_request_timing so that it runs after it (Flask runs
+# after_request hooks in reverse order) and compresses the final body
+@app.after_request
+def compress_response(response):
+    """Compress complete text and JSON responses for clients that accept br or gzip"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.is_streamed or response.direct_passthrough:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    body, encoding = compress_body(response.get_data(), request.headers.get('Accept-Encoding'))
+    if encoding is not None:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    g.metrics_status = '500'
+    HTTP_IN_FLIGHT.inc((g.metrics_endpoint,))
+    current_request_timings.set(RequestTimings())
+    
+    if request.args.get('profile') == '1' and request.path.startswith('/api/'):
+        token = request.headers.get('X-Profile-Token', '')
+        if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+            return jsonify({'error': 'Profiling requires a valid X-Profile-Token'}), 403
+        profile = RequestProfile()
+        current_request_profile.set(profile)
+        g.request_profile = profile
+        g.request_profile_thread = profile.start()
+
+@app.after_request
+def add_request_timing(response):
+    """Server-Timing for API responses, and the profile summary when ?profile=1.
+
+    A streamed body is still being produced at this point, so its header
+    only covers the work done before the first chunk.
+    """
+    g.metrics_status = str(response.status_code)
+    timings = current_request_timings.get()
+    if timings is not None and request.path.startswith('/api/'):
+        response.headers['Server-Timing'] = timings.header(time.perf_counter() - g.metrics_started)
+    
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        profile.stop(g.pop('request_profile_thread'))
+        current_request_profile.set(None)
+        response.headers['Cache-Control'] = PROFILED_CACHE_CONTROL
+        response.headers.pop('ETag', None)
+        summary = profile.summarize(g.metrics_endpoint.strip('/').replace('/', '_'))
+        payload = None if response.is_streamed else response.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload['profile'] = summary
+            response.set_data(app.json.dumps(payload))
+        elif summary['file']:
+            response.headers['X-Profile-File'] = summary['file']
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Runs after a streamed body has been fully sent
+    current_request_timings.set(None)
+    if 'metrics_started' not in g:
+        return
+    HTTP_IN_FLIGHT.dec((g.metrics_endpoint,))
+    HTTP_SECONDS.observe(time.perf_counter() - g.metrics_started, (g.metrics_endpoint, g.metrics_status))
+
 @app.route('/ping')
 def ping():
     return jsonify({'pong': True, 'timestamp': datetime.now().isoformat()})
@@ -629,311 +3757,735 @@ def about():
 def search_stocks():
     """API endpoint for stock search"""
     query = request.args.get('q', '').lower()
+    cache_control = build_cache_control(SEARCH_RESPONSE_MAX_AGE)
     if not query:
-        return jsonify([])
-    
-    # Expanded stock data including Indian stocks
-    stocks = [
-        # US Stocks
-        {"symbol": "AAPL", "name": "Apple Inc."},
-        {"symbol": "MSFT", "name": "Microsoft Corporation"},
-        {"symbol": "GOOGL", "name": "Alphabet Inc."},
-        {"symbol": "AMZN", "name": "Amazon.com Inc."},
-        {"symbol": "TSLA", "name": "Tesla Inc."},
-        {"symbol": "META", "name": "Meta Platforms Inc."},
-        {"symbol": "NVDA", "name": "NVIDIA Corporation"},
-        {"symbol": "JPM", "name": "JPMorgan Chase & Co."},
-        {"symbol": "V", "name": "Visa Inc."},
-        {"symbol": "JNJ", "name": "Johnson & Johnson"},
-        {"symbol": "NFLX", "name": "Netflix Inc."},
-        {"symbol": "UBER", "name": "Uber Technologies Inc."},
-        {"symbol": "SHOP", "name": "Shopify Inc."},
-        {"symbol": "ZM", "name": "Zoom Video Communications Inc."},
-        {"symbol": "PLTR", "name": "Palantir Technologies Inc."},
-        {"symbol": "MA", "name": "Mastercard Inc."},
-        {"symbol": "PYPL", "name": "PayPal Holdings Inc."},
-        {"symbol": "WMT", "name": "Walmart Inc."},
-        {"symbol": "DIS", "name": "Walt Disney Company"},
-        {"symbol": "NKE", "name": "Nike Inc."},
-        {"symbol": "XOM", "name": "Exxon Mobil Corporation"},
-        {"symbol": "BA", "name": "Boeing Company"},
-        {"symbol": "CAT", "name": "Caterpillar Inc."},
-        
-        # Indian Stocks
-        {"symbol": "TCS", "name": "Tata Consultancy Services Ltd."},
-        {"symbol": "INFY", "name": "Infosys Ltd."},
-        {"symbol": "WIPRO", "name": "Wipro Ltd."},
-        {"symbol": "HCLTECH", "name": "HCL Technologies Ltd."},
-        {"symbol": "TECHM", "name": "Tech Mahindra Ltd."},
-        {"symbol": "HDFCBANK", "name": "HDFC Bank Ltd."},
-        {"symbol": "ICICIBANK", "name": "ICICI Bank Ltd."},
-        {"symbol": "KOTAKBANK", "name": "Kotak Mahindra Bank Ltd."},
-        {"symbol": "AXISBANK", "name": "Axis Bank Ltd."},
-        {"symbol": "SBIN", "name": "State Bank of India"},
-        {"symbol": "RELIANCE", "name": "Reliance Industries Ltd."},
-        {"symbol": "HINDUNILVR", "name": "Hindustan Unilever Ltd."},
-        {"symbol": "ITC", "name": "ITC Ltd."},
-        {"symbol": "BHARTIARTL", "name": "Bharti Airtel Ltd."},
-        {"symbol": "MARUTI", "name": "Maruti Suzuki India Ltd."},
-        {"symbol": "SUNPHARMA", "name": "Sun Pharmaceutical Industries Ltd."},
-        {"symbol": "DRREDDY", "name": "Dr. Reddy's Laboratories Ltd."},
-        {"symbol": "CIPLA", "name": "Cipla Ltd."},
-        {"symbol": "DIVISLAB", "name": "Divi's Laboratories Ltd."},
-        {"symbol": "BIOCON", "name": "Biocon Ltd."},
-        {"symbol": "ONGC", "name": "Oil and Natural Gas Corporation Ltd."},
-        {"symbol": "IOC", "name": "Indian Oil Corporation Ltd."},
-        {"symbol": "BPCL", "name": "Bharat Petroleum Corporation Ltd."},
-        {"symbol": "ADANIGREEN", "name": "Adani Green Energy Ltd."},
-        {"symbol": "TATAPOWER", "name": "Tata Power Company Ltd."},
-        {"symbol": "ZOMATO", "name": "Zomato Ltd."},
-        {"symbol": "PAYTM", "name": "One97 Communications Ltd."},
-        {"symbol": "POLICYBZR", "name": "PB Fintech Ltd."},
-        {"symbol": "NAZARA", "name": "Nazara Technologies Ltd."}
-    ]
+        return cacheable_json_response([], cache_control)
     
-    results = []
-    for stock in stocks:
-        if (query in stock['symbol'].lower() or 
-            query in stock['name'].lower()):
-            results.append({
-                'symbol': stock['symbol'],
-                'name': stock['name'],
-                'display': f"{stock['symbol']} - {stock['name']}"
-            })
+    results = [{
+        'symbol': listing.symbol,
+        'name': listing.name,
+        'display': f"{listing.symbol} - {listing.name}"
+    } for listing in symbol_registry.search(query, limit=20)]
+    
+    return cacheable_json_response(results, cache_control)
+
+def build_default_markets_response(market_location, bulk_stock_data, columnar=False, full_chart=False):
+    """Build the get_default_markets payload from index prices.
+
+    Cards get the last 7 closes, or each index's whole chart with full_chart.
+    """
+    markets = DEFAULT_MARKETS['IN' if market_location == 'IN' else 'US']
+    
+    market_data = []
+    for market in markets:
+        try:
+            # Get real stock data for the market index
+            stock_data = bulk_stock_data[market['symbol']]
+            
+            market_info = {
+                'symbol': market['symbol'],
+                'name': market['name'],
+                'display_name': market['display_name'],
+                'current_price': stock_data['current_price'],
+                'price_change': stock_data['price_change'],
+                'price_change_percent': stock_data['price_change_percent'],
+                'chart_data': stock_data['chart_data'] if full_chart else slice_chart_columns(stock_data['chart_data'], -7),  # Last 7 days for default display
+                'currency': '₹' if market_location == 'IN' else '$',
+                'is_indian_market': market_location == 'IN'
+            }
+            market_data.append(format_chart_series(market_info, columnar))
+        except Exception as e:
+            print(f"Error fetching data for {market['symbol']}: {e}")
+            # Add fallback data
+            market_info = {
+                'symbol': market['symbol'],
+                'name': market['name'],
+                'display_name': market['display_name'],
+                'current_price': 0,
+                'price_change': 0,
+                'price_change_percent': 0,
+                'chart_data': {'date': [], 'price': [], 'volume': []},
+                'currency': '₹' if market_location == 'IN' else '$',
+                'is_indian_market': market_location == 'IN'
+            }
+            market_data.append(format_chart_series(market_info, columnar))
+    
+    # When the newest index price was fetched, so repeat responses hash the same
+    data_timestamps = [stock_data['data_timestamp'] for stock_data in bulk_stock_data.values() if stock_data.get('data_timestamp')]
     
-    return jsonify(results[:20])
+    return {
+        'markets': market_data,
+        'location': market_location,
+        'timestamp': max(data_timestamps) if data_timestamps else datetime.now().isoformat()
+    }
+
+def get_data_age(data_timestamp):
+    """Seconds since a data_timestamp (local time, as set when the data was fetched)"""
+    try:
+        return max(0.0, (datetime.now() - datetime.fromisoformat(data_timestamp)).total_seconds())
+    except (TypeError, ValueError):
+        return 0.0
+
+def get_stock_data_max_age(yahoo_symbol, stock_data):
+    """Seconds until stock_data's cached copy expires, or None for placeholder prices.
+
+    Counted from its data_timestamp, so a response built from a copy cached
+    a while ago isn't declared fresh for a whole TTL again.
+    """
+    if stock_data is None or not stock_data['chart_data']['date'] or stock_data.get('data_source') == SIMULATED_DATA_SOURCE:
+        return None
+    if 'data_age_seconds' in stock_data:
+        return 0
+    return max(0, get_stock_cache_ttl(yahoo_symbol) - get_data_age(stock_data.get('data_timestamp')))
+
+def get_default_markets_cache_control(market_location, bulk_stock_data):
+    """Cache-Control for get_default_markets: fresh until the first index price expires"""
+    markets = DEFAULT_MARKETS['IN' if market_location == 'IN' else 'US']
+    max_ages = [get_stock_data_max_age(market['symbol'], bulk_stock_data.get(market['symbol'])) for market in markets]
+    if None in max_ages:
+        # Placeholder prices; let the next request try again
+        return 'no-store'
+    return build_cache_control(min(max_ages))
+
+def parse_chart_params(args, default_range, default_points):
+    """(range, interval, points, error) from a price API's query parameters.
+
+    Intraday intervals default to the 1d range; error is None when the
+    combination can be served.
+    """
+    interval = args.get('interval', '1d')
+    range_ = args.get('range') or (default_range if interval == '1d' else '1d')
+    error = get_price_range_error(range_, interval)
+    try:
+        points = int(args.get('points', default_points))
+    except (TypeError, ValueError):
+        points = None
+    if error is None and (points is None or not 3 <= points <= CHART_MAX_POINTS):
+        error = f"points must be an integer from 3 to {CHART_MAX_POINTS}"
+    return range_, interval, points, error
+
+def get_market_charts(markets, range_, interval, points):
+    """Index stock data over a chosen range for the market cards, downsampled to points"""
+    futures = {
+        market['symbol']: submit_in_context(upstream_executor, get_real_stock_data, market['symbol'], range_, interval)
+        for market in markets
+    }
+    return {
+        symbol: downsample_stock_data(future.result(), symbol, range_, interval, points)
+        for symbol, future in futures.items()
+    }
 
 @app.route('/api/get_default_markets')
 def get_default_markets():
-    """API endpoint to get default market data (Dow Jones, S&P 500 for US; Sensex, Nifty for India)"""
+    """API endpoint to get default market data (Dow Jones, S&P 500 for US; Sensex, Nifty for India).
+
+    Cards show the last 7 daily closes unless range or interval is given;
+    then each index's chart over that range, downsampled to points.
+    """
     try:
         # Get market location from query parameter (default to US)
         market_location = request.args.get('location', 'US')
         
-        if market_location == 'IN':
-            # Indian markets
-            markets = [
-                {'symbol': '^NSEI', 'name': 'Nifty 50', 'display_name': 'Nifty 50'},
-                {'symbol': '^BSESN', 'name': 'S&P BSE Sensex', 'display_name': 'Sensex'}
-            ]
+        markets = DEFAULT_MARKETS['IN' if market_location == 'IN' else 'US']
+        
+        full_chart = 'range' in request.args or 'interval' in request.args
+        if full_chart:
+            range_, interval, points, error = parse_chart_params(request.args, '30d', SPARKLINE_DEFAULT_POINTS)
+            if error is not None:
+                return jsonify({'error': error}), 400
+            bulk_stock_data = get_market_charts(markets, range_, interval, points)
         else:
-            # US markets
-            markets = [
-                {'symbol': '^DJI', 'name': 'Dow Jones Industrial Average', 'display_name': 'Dow Jones'},
-                {'symbol': '^GSPC', 'name': 'S&P 500', 'display_name': 'S&P 500'}
-            ]
-        
-        market_data = []
-        for market in markets:
-            try:
-                # Get real stock data for the market index
-                stock_data = get_real_stock_data(market['symbol'])
-                
-                market_info = {
-                    'symbol': market['symbol'],
-                    'name': market['name'],
-                    'display_name': market['display_name'],
-                    'current_price': stock_data['current_price'],
-                    'price_change': stock_data['price_change'],
-                    'price_change_percent': stock_data['price_change_percent'],
-                    'chart_data': stock_data['chart_data'][-7:],  # Last 7 days for default display
-                    'currency': '₹' if market_location == 'IN' else '$',
-                    'is_indian_market': market_location == 'IN'
-                }
-                market_data.append(market_info)
-            except Exception as e:
-                print(f"Error fetching data for {market['symbol']}: {e}")
-                # Add fallback data
-                market_info = {
-                    'symbol': market['symbol'],
-                    'name': market['name'],
-                    'display_name': market['display_name'],
-                    'current_price': 0,
-                    'price_change': 0,
-                    'price_change_percent': 0,
-                    'chart_data': [],
-                    'currency': '₹' if market_location == 'IN' else '$',
-                    'is_indian_market': market_location == 'IN'
-                }
-                market_data.append(market_info)
-        
-        return jsonify({
-            'markets': market_data,
-            'location': market_location,
-            'timestamp': datetime.now().isoformat()
+            # One upstream request for all indices; only recent closes are shown
+            bulk_stock_data = get_bulk_stock_data([market['symbol'] for market in markets], mode='quote')
+        
+        response = cacheable_json_response(build_default_markets_response(market_location, bulk_stock_data, request_wants_columnar(), full_chart),
+                                           get_default_markets_cache_control(market_location, bulk_stock_data))
+        response.vary.add('Accept')
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/price_history')
+def price_history():
+    """API endpoint for OHLCV history over a longer range, daily (served from disk when PRICE_HISTORY_DB is set) or intraday.
+
+    Series longer than points (default CHART_DEFAULT_POINTS) are downsampled with LTTB.
+    """
+    symbol = request.args.get('symbol', '').strip()
+    range_, interval, points, error = parse_chart_params(request.args, '1y', CHART_DEFAULT_POINTS)
+    
+    if not symbol:
+        return jsonify({'error': 'Symbol is required'}), 400
+    if error is not None:
+        return jsonify({'error': error}), 400
+    
+    try:
+        yahoo_symbol = resolve_yahoo_symbol(symbol)
+        stock_data = downsample_stock_data(get_real_stock_data(symbol, range_, interval), yahoo_symbol, range_, interval, points)
+        max_age = get_stock_data_max_age(yahoo_symbol, stock_data)
+        stock_data.update({
+            'symbol': symbol,
+            'range': range_,
+            'interval': interval,
+            'currency': get_currency_sign(symbol)
         })
+        response = cacheable_json_response(format_chart_series(stock_data, request_wants_columnar()),
+                                           'no-store' if max_age is None else build_cache_control(max_age))
+        response.vary.add('Accept')
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analyze_sentiment', methods=['POST'])
+def uses_fallback_news(news_items):
+    """Whether any item came from the news page scrape or the generic padding instead of search"""
+    return any(item.get('is_fallback') or item.get('is_placeholder') for item in news_items)
+
+def get_news_max_age(symbol):
+    """Seconds until symbol's news is due to be fetched again"""
+    if news_archive is not None:
+        last_ingested = news_archive.last_ingested(symbol)
+        return 0 if last_ingested is None else max(0, NEWS_CACHE_TTL - (time.time() - last_ingested))
+    return news_cache.get_ttl(symbol) or 0
+
+def get_analysis_cache_control(symbol, result):
+    """Cache-Control for a full analysis: fresh until the first of its prices or news expires"""
+    if result.get('degraded') or result.get('data_source') == SIMULATED_DATA_SOURCE or uses_fallback_news(result.get('news_items', [])):
+        # Partial, placeholder or fallback data; let the next request try again
+        return 'no-store'
+    if 'data_age_seconds' in result:
+        return build_cache_control(0)
+    prices_max_age = get_stock_cache_ttl(resolve_yahoo_symbol(symbol)) - get_data_age(result.get('data_timestamp'))
+    return build_cache_control(min(prices_max_age, get_news_max_age(symbol)))
+
+@app.route('/api/analyze_sentiment', methods=['GET', 'POST'])
 def analyze_sentiment_endpoint():
-    """API endpoint for sentiment analysis with real news and ML analysis"""
-    data = request.get_json()
+    """API endpoint for sentiment analysis with real news and ML analysis.
+
+    GET ?symbol= answers are cacheable (ETag, Cache-Control); POST ones are not.
+    """
+    data = request.args if request.method == 'GET' else request.get_json()
     symbol = data.get('symbol')
     
     if not symbol:
         return jsonify({'error': 'Symbol is required'}), 400
     
-    try:
-        # Expanded company names including Indian stocks
-        company_names = {
-            # US Stocks
-            'AAPL': 'Apple Inc.',
-            'MSFT': 'Microsoft Corporation', 
-            'GOOGL': 'Alphabet Inc.',
-            'AMZN': 'Amazon.com Inc.',
-            'TSLA': 'Tesla Inc.',
-            'META': 'Meta Platforms Inc.',
-            'NVDA': 'NVIDIA Corporation',
-            'JPM': 'JPMorgan Chase & Co.',
-            'V': 'Visa Inc.',
-            'JNJ': 'Johnson & Johnson',
-            'NFLX': 'Netflix Inc.',
-            'UBER': 'Uber Technologies Inc.',
-            'SHOP': 'Shopify Inc.',
-            'ZM': 'Zoom Video Communications Inc.',
-            'PLTR': 'Palantir Technologies Inc.',
-            'MA': 'Mastercard Inc.',
-            'PYPL': 'PayPal Holdings Inc.',
-            'WMT': 'Walmart Inc.',
-            'DIS': 'Walt Disney Company',
-            'NKE': 'Nike Inc.',
-            'XOM': 'Exxon Mobil Corporation',
-            'BA': 'Boeing Company',
-            'CAT': 'Caterpillar Inc.',
-            
-            # Indian Stocks
-            'TCS': 'Tata Consultancy Services Ltd.',
-            'INFY': 'Infosys Ltd.',
-            'WIPRO': 'Wipro Ltd.',
-            'HCLTECH': 'HCL Technologies Ltd.',
-            'TECHM': 'Tech Mahindra Ltd.',
-            'HDFCBANK': 'HDFC Bank Ltd.',
-            'ICICIBANK': 'ICICI Bank Ltd.',
-            'KOTAKBANK': 'Kotak Mahindra Bank Ltd.',
-            'AXISBANK': 'Axis Bank Ltd.',
-            'SBIN': 'State Bank of India',
-            'RELIANCE': 'Reliance Industries Ltd.',
-            'HINDUNILVR': 'Hindustan Unilever Ltd.',
-            'ITC': 'ITC Ltd.',
-            'BHARTIARTL': 'Bharti Airtel Ltd.',
-            'MARUTI': 'Maruti Suzuki India Ltd.',
-            'SUNPHARMA': 'Sun Pharmaceutical Industries Ltd.',
-            'DRREDDY': 'Dr. Reddy\'s Laboratories Ltd.',
-            'CIPLA': 'Cipla Ltd.',
-            'DIVISLAB': 'Divi\'s Laboratories Ltd.',
-            'BIOCON': 'Biocon Ltd.',
-            'ONGC': 'Oil and Natural Gas Corporation Ltd.',
-            'IOC': 'Indian Oil Corporation Ltd.',
-            'BPCL': 'Bharat Petroleum Corporation Ltd.',
-            'ADANIGREEN': 'Adani Green Energy Ltd.',
-            'TATAPOWER': 'Tata Power Company Ltd.',
-            'ZOMATO': 'Zomato Ltd.',
-            'PAYTM': 'One97 Communications Ltd.',
-            'POLICYBZR': 'PB Fintech Ltd.',
-            'NAZARA': 'Nazara Technologies Ltd.'
-        }
-        
-        company_name = company_names.get(symbol, f"{symbol} Corporation")
-        
-        # Get real news items using ML sentiment analysis
-        news_items = get_stock_news_items(symbol, company_name)
-        
-        # Calculate overall sentiment based on real ML analysis
-        if not news_items:
-            overall_sentiment = 'Neutral'
-            confidence = 0.5
-        else:
-            # Calculate weighted sentiment based on ML confidence scores
-            total_weighted_score = 0
-            total_weight = 0
-            
-            for item in news_items:
-                sentiment = item['sentiment']
-                item_confidence = item['confidence']
-                
-                # Convert sentiment to numeric score
-                if sentiment == 'Positive':
-                    score = 1
-                elif sentiment == 'Negative':
-                    score = -1
-                else:  # Neutral
-                    score = 0
-                
-                # Weight by confidence
-                total_weighted_score += score * item_confidence
-                total_weight += item_confidence
-            
-            if total_weight > 0:
-                avg_weighted_score = total_weighted_score / total_weight
-                avg_confidence = total_weight / len(news_items)
-                
-                # Determine overall sentiment based on weighted score
-                if avg_weighted_score >= 0.3:
-                    overall_sentiment = 'Positive'
-                    confidence = min(0.95, avg_confidence + 0.1)
-                elif avg_weighted_score <= -0.3:
-                    overall_sentiment = 'Negative'
-                    confidence = min(0.95, avg_confidence + 0.1)
-                else:
-                    overall_sentiment = 'Neutral'
-                    confidence = avg_confidence
-            else:
-                overall_sentiment = 'Neutral'
-                confidence = 0.5
-        
-        # Get real stock data with Indian stock support
-        stock_data = get_real_stock_data(symbol)
-        chart_data = stock_data["chart_data"]
-        current_price = stock_data["current_price"]
-        price_change = stock_data["price_change"]
-        price_change_percent = stock_data["price_change_percent"]
-        data_timestamp = stock_data.get("data_timestamp", datetime.now().isoformat())
-        data_source = stock_data.get("data_source", "Yahoo Finance (Real-time)")
-        
-        # Determine currency and Indian stock status
-        indian_stocks = [
-            'TCS', 'INFY', 'WIPRO', 'HCLTECH', 'TECHM', 'HDFCBANK', 'ICICIBANK', 'KOTAKBANK', 
-            'AXISBANK', 'SBIN', 'RELIANCE', 'HINDUNILVR', 'ITC', 'BHARTIARTL', 'MARUTI', 
-            'SUNPHARMA', 'DRREDDY', 'CIPLA', 'DIVISLAB', 'BIOCON', 'ONGC', 'IOC', 'BPCL', 
-            'ADANIGREEN', 'TATAPOWER', 'ZOMATO', 'PAYTM', 'POLICYBZR', 'NAZARA'
-        ]
+    columnar = request_wants_columnar()
+    stream = data.get('stream') == '1' if request.method == 'GET' else data.get('stream')
+    if stream:
+        # Opt-in progressive mode: one NDJSON line per section as soon as it is ready
+        def generate():
+            try:
+                for section, fields in iter_analysis_sections(symbol):
+                    yield encode_analysis_section(section, fields, columnar)
+            except Exception as e:
+                print(f"Error streaming analysis for {symbol}: {e}")
+                yield encode_analysis_section('error', {'error': str(e)})
         
-        currency = "₹" if symbol in indian_stocks else "$"
-        is_indian_stock = symbol in indian_stocks
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    try:
+        result = analyze_stock(symbol)
+        if request.method == 'GET':
+            response = cacheable_json_response(format_chart_series(result, columnar), get_analysis_cache_control(symbol, result))
+            response.vary.add('Accept')
+            return response
+        return jsonify(format_chart_series(result, columnar))
         
-        # Generate realistic sentiment data based on stock symbol
-        sentiment_data = generate_stock_sentiment_data(symbol, chart_data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analyze_sentiment_batch', methods=['POST'])
+def analyze_sentiment_batch_endpoint():
+    """API endpoint that analyzes many symbols and streams one NDJSON line per symbol as it finishes"""
+    data = request.get_json(silent=True) or {}
+    symbols = data.get('symbols')
+    sections = data.get('sections') or list(ANALYZE_SECTIONS)
+    
+    if not isinstance(symbols, list) or not symbols:
+        return jsonify({'error': 'symbols must be a non-empty list'}), 400
+    if not isinstance(sections, list) or any(section not in ANALYZE_SECTIONS for section in sections):
+        return jsonify({'error': f"sections must be a list drawn from {list(ANALYZE_SECTIONS)}"}), 400
+    
+    # Drop blanks and duplicates while keeping the caller's order
+    symbols = list(dict.fromkeys(str(symbol).strip() for symbol in symbols if str(symbol).strip()))
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        return jsonify({'error': f"At most {BATCH_MAX_SYMBOLS} symbols per batch"}), 400
+    
+    # Each symbol's prices come through get_real_stock_data and the shared
+    # stock_data_cache, so its chart_data (OHLCV) matches /api/analyze_sentiment
+    futures = {
+        submit_in_context(batch_executor, analyze_stock, symbol, tuple(sections)): symbol
+        for symbol in symbols
+    }
+    columnar = request_wants_columnar()
+    
+    def generate():
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error analyzing {futures[future]} in batch: {e}")
+                    result = {'symbol': futures[future], 'error': str(e)}
+                yield app.json.dumps(format_chart_series(result, columnar)) + '\n'
+        finally:
+            # Client went away or we're done; don't run pipelines nobody will read
+            for future in futures:
+                future.cancel()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Asyncio data-access layer. Mirrors the blocking fetchers above and shares
+# their caches, parsers and fallbacks, but waits on the event loop so one
+# worker can hold hundreds of slow upstream requests at once.
+
+async def fetch_yahoo_chart_async(yahoo_symbol, range_='30d', interval='1d'):
+    """Async fetch_yahoo_chart"""
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v8/finance/chart/{yahoo_symbol}?interval={interval}&range={range_}"
+        return parse_yahoo_chart(await async_upstream.get(url, market=get_market_for_yahoo_symbol(yahoo_symbol)))
+    except Exception as e:
+        print(f"Error fetching real stock data for {yahoo_symbol}: {e}")
+        return None
+
+async def fetch_yahoo_bars_async(yahoo_symbol, params):
+    """Async fetch_yahoo_bars"""
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v8/finance/chart/{yahoo_symbol}"
+        return parse_yahoo_chart_bars(await async_upstream.get(url, params=dict(params, interval='1d'), market=get_market_for_yahoo_symbol(yahoo_symbol)))
+    except Exception as e:
+        print(f"Error fetching price bars for {yahoo_symbol}: {e}")
+        return None
+
+async def load_stock_chart_async(yahoo_symbol, range_='30d', interval='1d'):
+    """Async load_stock_chart (price_store reads and writes run in a worker thread)"""
+    if price_store is None or interval != '1d':
+        return await fetch_yahoo_chart_async(yahoo_symbol, range_, interval)
+    start_ts, params, covered_from = await asyncio.to_thread(plan_price_refresh, yahoo_symbol, range_)
+    bars = await fetch_yahoo_bars_async(yahoo_symbol, params)
+    return await asyncio.to_thread(finish_price_refresh, yahoo_symbol, start_ts, bars, covered_from)
+
+@timed_stage('stock_fetch')
+async def get_real_stock_data_async(symbol, range_='30d', interval='1d'):
+    """Async get_real_stock_data"""
+    error = get_price_range_error(range_, interval)
+    if error is not None:
+        raise ValueError(error)
+    
+    yahoo_symbol = resolve_yahoo_symbol(symbol)
+    
+    stale_age = None
+    
+    try:
+        stock_data, stale_age = await async_upstream.get_or_revalidate(
+            stock_data_cache,
+            get_stock_cache_key(yahoo_symbol, range_, interval),
+            lambda: load_stock_chart_async(yahoo_symbol, range_, interval),
+            get_stock_cache_ttl(yahoo_symbol)
+        )
+    except Exception as e:
+        print(f"Error fetching real stock data: {e}")
+        stock_data = None
+    
+    if stock_data is None:
+        # Fallback to simulated data (never cached) only when no good copy was ever fetched
+        return get_simulated_stock_data(symbol)
+    
+    if stale_age is not None:
+        return mark_stale_stock_data(stock_data, stale_age)
+    # Shallow copy so callers can't modify the cached entry
+    return dict(stock_data)
+
+async def fetch_yahoo_spark_chunk_async(market, chunk, range_):
+    """Download daily closes for one chunk of at most SPARK_BATCH_SIZE Yahoo symbols of one market"""
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v7/finance/spark"
+        params = {'symbols': ','.join(chunk), 'range': range_, 'interval': '1d'}
+        return parse_yahoo_spark(await async_upstream.get(url, params=params, market=market), chunk)
+    except Exception as e:
+        print(f"Error fetching spark data for {','.join(chunk)}: {e}")
+        return {}
+
+async def fetch_yahoo_spark_async(yahoo_symbols, range_):
+    """Async fetch_yahoo_spark; the chunks are requested concurrently"""
+    results = {}
+    chunks = get_spark_chunks(yahoo_symbols)
+    for chunk_results in await asyncio.gather(*(fetch_yahoo_spark_chunk_async(market, chunk, range_) for market, chunk in chunks)):
+        results.update(chunk_results)
+    return results
+
+@timed_stage('bulk_prices')
+async def get_bulk_stock_data_async(symbols, mode='quote'):
+    """Async get_bulk_stock_data"""
+    yahoo_symbols, results, missing = get_cached_bulk_stock_data(symbols, mode)
+    if missing:
+        fetched = await fetch_yahoo_spark_async(sorted({yahoo_symbols[symbol] for symbol in missing}), BULK_PRICE_RANGES[mode])
+        store_bulk_stock_data(mode, yahoo_symbols, results, missing, fetched)
+    return results
+
+@timed_stage('news_fetch')
+async def get_real_news_from_yahoo_async(symbol, company_name):
+    """Async get_real_news_from_yahoo"""
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v1/finance/search?q={symbol}&quotesCount=1&newsCount=15"
+        data = await async_upstream.get(url, market=get_symbol_market(symbol))
+        # Batch scoring is CPU-bound; keep it off the event loop
+        news_items = await asyncio.to_thread(build_yahoo_news_items, data, symbol, company_name)
         
-        # Generate summarized insights from real news items
-        insights = generate_summarized_insights(news_items, symbol, company_name)
+        # If we don't have enough relevant news, try alternative method
+        if len(news_items) < 3:
+            print(f"Not enough relevant news found for {symbol}, trying alternative method...")
+            return await get_alternative_news_async(symbol, company_name)
         
-        # Generate keyword cloud data from real news content
-        keywords = extract_keywords_from_news(news_items)
+        return news_items
         
-        return jsonify({
-            'symbol': symbol,
-            'company_name': company_name,
-            'news_count': len(news_items),
-            'overall_sentiment': overall_sentiment,
-            'confidence': round(confidence, 2),
-            'news_items': news_items,
-            'chart_data': chart_data,
-            'sentiment_data': sentiment_data,
-            'keywords': keywords,
-            'current_price': current_price,
-            'price_change': price_change,
-            'price_change_percent': price_change_percent,
-            'currency': currency,
-            'is_indian_stock': is_indian_stock,
-            'insights': insights,
-            'data_timestamp': data_timestamp,
-            'data_source': data_source
+    except Exception as e:
+        print(f"Error fetching real news from Yahoo Finance: {e}")
+        # Fallback to alternative news source
+        return await get_alternative_news_async(symbol, company_name)
+
+async def fetch_yahoo_news_page_async(symbol):
+    """Async fetch_yahoo_news_page"""
+    url = f"{YAHOO_WEB_BASE_URL}/quote/{symbol}.NS/news"
+    return await async_upstream.get(url, as_json=False, max_bytes=NEWS_PAGE_MAX_BYTES, market=get_symbol_market(symbol))
+
+@timed_stage('news_scrape')
+async def get_alternative_news_async(symbol, company_name):
+    """Async get_alternative_news (Yahoo quote news page, padded with generic updates)"""
+    news_items = []
+    try:
+        content = await fetch_yahoo_news_page_async(symbol)
+        # HTML parsing is CPU-bound; keep it off the event loop
+        news_items = await asyncio.to_thread(parse_yahoo_news_page, content, symbol, company_name)
+    except Exception as e:
+        print(f"Error scraping Yahoo Finance: {e}")
+    
+    add_generic_news(news_items, symbol, company_name)
+    return news_items
+
+@timed_stage('news_fetch')
+async def ingest_symbol_news_async(symbol, company_name):
+    """Async ingest_symbol_news"""
+    candidates = None
+    try:
+        url = f"{YAHOO_QUERY_BASE_URL}/v1/finance/search?q={symbol}&quotesCount=1&newsCount=15"
+        candidates = get_yahoo_news_candidates(await async_upstream.get(url, market=get_symbol_market(symbol)), symbol, company_name)
+    except Exception as e:
+        print(f"Error fetching real news from Yahoo Finance: {e}")
+    
+    # Same fallback as get_real_news_from_yahoo when search finds too little
+    if candidates is None or await asyncio.to_thread(count_news_stories, candidates) < 3:
+        try:
+            content = await fetch_yahoo_news_page_async(symbol)
+            # HTML parsing is CPU-bound; keep it off the event loop
+            page_candidates = await asyncio.to_thread(get_yahoo_news_page_candidates, content, symbol, company_name)
+            candidates = (candidates or []) + tag_fallback_candidates(page_candidates)
+        except Exception as e:
+            print(f"Error scraping Yahoo Finance: {e}")
+    
+    if candidates is None:
+        return None
+    # Scoring and the SQLite writes block; run them in a worker thread
+    return await asyncio.to_thread(archive_news_candidates, symbol, candidates)
+
+async def refresh_news_archive_async(symbol, company_name):
+    """Async refresh_news_archive"""
+    await async_upstream.get_or_load(news_ingest_cache, symbol, lambda: ingest_symbol_news_async(symbol, company_name), NEWS_CACHE_TTL)
+
+async def get_stock_news_items_async(symbol, company_name):
+    """Async get_stock_news_items (news_archive is read in a worker thread)"""
+    if news_archive is not None:
+        last_ingested = await asyncio.to_thread(news_archive.last_ingested, symbol)
+        if last_ingested is None:
+            # Nothing archived yet, so this request has to wait for the first fetch
+            await refresh_news_archive_async(symbol, company_name)
+        elif time.time() - last_ingested > NEWS_CACHE_TTL:
+            # Serve what's archived now and refresh off the request path
+            async_upstream.spawn(refresh_news_archive_async(symbol, company_name))
+        return await asyncio.to_thread(get_archived_news_items, symbol, company_name)
+    
+    news_items = await async_upstream.get_or_load(
+        news_cache,
+        symbol,
+        lambda: get_real_news_from_yahoo_async(symbol, company_name),
+        NEWS_CACHE_TTL
+    )
+    return list(news_items)
+
+async def analyze_stock_async(symbol, sections=ANALYZE_SECTIONS, stock_data=None):
+    """Async analyze_stock, with the same sections, deadline and degraded reporting"""
+    return merge_analysis_sections([pair async for pair in iter_analysis_sections_async(symbol, sections, stock_data)])
+
+async def iter_analysis_sections_async(symbol, sections=ANALYZE_SECTIONS, stock_data=None):
+    """Async iter_analysis_sections"""
+    company_name = get_company_name(symbol)
+    need_news, need_prices = get_analysis_needs(sections)
+    
+    # Fetch news and prices concurrently; slow sources are dropped at the deadline
+    deadline = time.monotonic() + ANALYZE_DEADLINE_SECONDS
+    tasks = {}
+    if need_news:
+        tasks[asyncio.ensure_future(get_stock_news_items_async(symbol, company_name))] = 'news'
+    if need_prices and stock_data is None:
+        tasks[asyncio.ensure_future(get_real_stock_data_async(symbol))] = 'stock_data'
+    
+    yield 'meta', build_analysis_meta(symbol, company_name)
+    
+    if need_prices and stock_data is not None:
+        for pair in build_price_sections(sections, stock_data):
+            yield pair
+    news_items = []
+    
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            break
+        for task in done:
+            if tasks[task] == 'news':
+                news_items = task.result()
+                # Insights and keywords are CPU-bound; keep them off the event loop
+                parts = await asyncio.to_thread(build_news_sections, symbol, company_name, sections, news_items)
+            else:
+                stock_data = task.result()
+                parts = build_price_sections(sections, stock_data)
+            for pair in parts:
+                yield pair
+    
+    degraded_sections = []
+    for task, source in tasks.items():
+        if task not in pending:
+            continue
+        print(f"{'News' if source == 'news' else 'Stock data'} fetch for {symbol} missed the {ANALYZE_DEADLINE_SECONDS}s deadline")
+        DEADLINE_MISSES.inc((source, get_symbol_market(symbol)))
+        degraded_sections.append(source)
+        if source == 'news':
+            parts = await asyncio.to_thread(build_news_sections, symbol, company_name, sections, [])
+        else:
+            stock_data = get_simulated_stock_data(symbol)
+            parts = build_price_sections(sections, stock_data)
+        for pair in parts:
+            yield pair
+    
+    if 'sentiment_data' in sections:
+        # Reads news_archive and folds news into the daily series
+        yield 'sentiment_data', await asyncio.to_thread(build_sentiment_data_section, symbol, stock_data, news_items)
+    
+    yield 'done', {'degraded': bool(degraded_sections), 'degraded_sections': degraded_sections}
+
+# ASGI entry point (uvicorn app:asgi_app). The upstream-bound endpoints run on
+# the event loop; every other route is served by the Flask app in a thread.
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that serves requests on a pool of ASGI_WSGI_THREADS threads.
+
+    asgiref runs the WSGI app on one thread shared by the whole process,
+    which serializes requests. Here each request runs on a plain pool
+    thread instead; requests beyond the pool size queue for a free one,
+    and the event loop never waits for a thread to finish.
+    """
+
+    def __init__(self, wsgi_application):
+        super().__init__(wsgi_application)
+        self._executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        instance = WsgiToAsgiInstance(self.wsgi_application)
+        # Shadow the class's thread-sensitive run_wsgi_app with the plain
+        # function it wraps, run on the pool, for this request only
+        run_wsgi_app = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+        instance.run_wsgi_app = sync_to_async(run_wsgi_app.__get__(instance), thread_sensitive=False, executor=self._executor)
+        await instance(scope, receive, send)
+
+wsgi_asgi_app = ThreadedWsgiToAsgi(app)
+
+async def read_asgi_body(receive):
+    """Collect the full request body from ASGI http.request messages"""
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            return body
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+def get_asgi_query(scope):
+    """{name: first value} of an ASGI scope's query string"""
+    return {key: values[0] for key, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+
+def get_asgi_header(scope, name):
+    """Value of a request header (lowercase bytes name) from an ASGI scope, or ''"""
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+async def send_asgi_json(send, payload, status=200, scope=None, cache_control=None):
+    """Send payload as a complete JSON response, serialized like jsonify.
+
+    Given the request scope, the body is compressed like compress_response
+    does; with cache_control too, it is sent like cacheable_json_response.
+    """
+    body = orjson.dumps(payload, default=app.json.default, option=app.json.options | orjson.OPT_APPEND_NEWLINE)
+    headers = [(b'content-type', b'application/json')]
+    
+    if cache_control is not None:
+        headers.append((b'cache-control', cache_control.encode('latin-1')))
+        if cache_control != 'no-store':
+            etag = get_body_etag(body)
+            headers.append((b'etag', etag.encode('latin-1')))
+            if etag_matches(get_asgi_header(scope, b'if-none-match'), etag):
+                await send({'type': 'http.response.start', 'status': 304, 'headers': headers + [(b'vary', b'Accept, Accept-Encoding')]})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+    
+    if scope is not None:
+        # Both ASGI JSON routes negotiate the chart series format
+        headers.append((b'vary', b'Accept, Accept-Encoding'))
+        if status == 200:
+            body, encoding = compress_body(body, get_asgi_header(scope, b'accept-encoding'))
+            if encoding is not None:
+                headers.append((b'content-encoding', encoding.encode('latin-1')))
+    
+    headers.append((b'content-length', str(len(body)).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def analyze_sentiment_async_endpoint(scope, receive, send):
+    """Async /api/analyze_sentiment (GET ?symbol= or POST)"""
+    is_get = scope['method'] == 'GET'
+    query = get_asgi_query(scope)
+    columnar = wants_columnar(query.get('format'), get_asgi_header(scope, b'accept'))
+    if is_get:
+        data = query
+    else:
+        try:
+            data = json.loads(await read_asgi_body(receive) or b'null')
+        except ValueError:
+            data = None
+    symbol = data.get('symbol') if isinstance(data, dict) else None
+    
+    if not symbol:
+        await send_asgi_json(send, {'error': 'Symbol is required'}, 400, scope)
+        return
+    
+    stream = data.get('stream') == '1' if is_get else data.get('stream')
+    if stream:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/x-ndjson')]
         })
+        try:
+            async for section, fields in iter_analysis_sections_async(symbol):
+                await send({'type': 'http.response.body', 'body': encode_analysis_section(section, fields, columnar).encode('utf-8'), 'more_body': True})
+        except Exception as e:
+            print(f"Error streaming analysis for {symbol}: {e}")
+            await send({'type': 'http.response.body', 'body': encode_analysis_section('error', {'error': str(e)}).encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    
+    try:
+        result = await analyze_stock_async(symbol)
+    except Exception as e:
+        await send_asgi_json(send, {'error': str(e)}, 500, scope)
+        return
+    await send_asgi_json(send, format_chart_series(result, columnar), 200, scope, get_analysis_cache_control(symbol, result) if is_get else None)
+
+async def get_default_markets_async_endpoint(scope, receive, send):
+    """Async /api/get_default_markets"""
+    try:
+        query = get_asgi_query(scope)
+        market_location = query.get('location', 'US')
+        columnar = wants_columnar(query.get('format'), get_asgi_header(scope, b'accept'))
         
+        markets = DEFAULT_MARKETS['IN' if market_location == 'IN' else 'US']
+        full_chart = 'range' in query or 'interval' in query
+        if full_chart:
+            range_, interval, points, error = parse_chart_params(query, '30d', SPARKLINE_DEFAULT_POINTS)
+            if error is not None:
+                await send_asgi_json(send, {'error': error}, 400, scope)
+                return
+            charts = await asyncio.gather(*(get_real_stock_data_async(market['symbol'], range_, interval) for market in markets))
+            downsampled = await asyncio.gather(*(
+                asyncio.to_thread(downsample_stock_data, stock_data, market['symbol'], range_, interval, points)
+                for market, stock_data in zip(markets, charts)
+            ))
+            bulk_stock_data = {market['symbol']: stock_data for market, stock_data in zip(markets, downsampled)}
+        else:
+            bulk_stock_data = await get_bulk_stock_data_async([market['symbol'] for market in markets], mode='quote')
+        result = build_default_markets_response(market_location, bulk_stock_data, columnar, full_chart)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        await send_asgi_json(send, {'error': str(e)}, 500, scope)
+        return
+    await send_asgi_json(send, result, 200, scope, get_default_markets_cache_control(market_location, bulk_stock_data))
+
+# (method, path) -> handler served natively on the event loop
+ASYNC_ROUTES = {
+    ('GET', '/api/analyze_sentiment'): analyze_sentiment_async_endpoint,
+    ('POST', '/api/analyze_sentiment'): analyze_sentiment_async_endpoint,
+    ('GET', '/api/get_default_markets'): get_default_markets_async_endpoint
+}
+
+async def handle_asgi_lifespan(receive, send):
+    """Open the async upstream client at startup and close it at shutdown"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await async_upstream.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_upstream.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def handle_async_route(handler, scope, receive, send):
+    """Run an ASYNC_ROUTES handler with the same request metrics as Flask routes"""
+    endpoint = scope['path']
+    status = ['500']
+    timings = RequestTimings()
+    current_request_timings.set(timings)
+    
+    async def send_and_note_status(message):
+        if message['type'] == 'http.response.start':
+            status[0] = str(message['status'])
+            server_timing = timings.header(time.perf_counter() - started)
+            message = dict(message, headers=list(message.get('headers', [])) + [(b'server-timing', server_timing.encode('latin-1'))])
+        await send(message)
+    
+    HTTP_IN_FLIGHT.inc((endpoint,))
+    started = time.perf_counter()
+    try:
+        await handler(scope, receive, send_and_note_status)
+    finally:
+        HTTP_IN_FLIGHT.dec((endpoint,))
+        HTTP_SECONDS.observe(time.perf_counter() - started, (endpoint, status[0]))
+
+async def asgi_app(scope, receive, send):
+    """ASGI application: async handlers for ASYNC_ROUTES, the Flask app for everything else"""
+    if scope['type'] == 'lifespan':
+        await handle_asgi_lifespan(receive, send)
+        return
+    
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+        # ?profile=1 takes the Flask path, where before_request checks the
+        # token and cProfile follows the request's threads
+        if handler is not None and get_asgi_query(scope).get('profile') != '1':
+            await handle_async_route(handler, scope, receive, send)
+            return
+    
+    await wsgi_asgi_app(scope, receive, send)
+
+# Workers start prefetching when they boot: at import, or right after
+# gunicorn --preload forks them from the master that imported the app
+if prefetch_scheduler is not None:
+    if hasattr(os, 'register_at_fork'):  # not on Windows, which doesn't fork
+        os.register_at_fork(before=stop_prefetch_scheduler_before_fork, after_in_child=start_prefetch_scheduler)
+    start_prefetch_scheduler()
 
 if __name__ == '__main__':
     # Get port from environment variable, default to 8080 (GCP standard)
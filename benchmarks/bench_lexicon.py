@@ -0,0 +1,94 @@
+"""Micro-benchmark: precompiled lexicon index vs. the old per-word substring scans,
+scalar vs. batch sentiment scoring, and cold vs. memoized scoring.
+
+Run from the repository root:
+
+    python benchmarks/bench_lexicon.py [--headlines 10000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+# Word lists exactly as analyze_sentiment_ml built them on every call before the index
+LEGACY_POSITIVE = ['profit', 'growth', 'revenue', 'gain', 'rise', 'increase', 'strong', 'beat', 'exceed', 'surge', 'rally', 'bullish', 'upgrade', 'positive', 'success', 'breakthrough', 'record', 'high', 'boost', 'improve', 'expansion', 'partnership', 'deal', 'acquisition', 'investment']
+LEGACY_NEGATIVE = ['loss', 'decline', 'fall', 'drop', 'crash', 'plunge', 'slump', 'weak', 'poor', 'disappoint', 'miss', 'cut', 'reduce', 'layoff', 'crisis', 'concern', 'risk', 'threat', 'challenge', 'problem', 'issue', 'trouble', 'struggle', 'pressure', 'volatility', 'uncertainty', 'bearish', 'pessimistic', 'downgrade', 'warning', 'caution']
+
+SUBJECTS = ['Apple', 'Infosys', 'Tesla', 'HDFC Bank', 'Reliance', 'Nvidia', 'Walmart', 'Zomato']
+EVENTS = [
+    'shares surge after earnings beat estimates',
+    'stock falls as margins disappoint analysts',
+    'announces partnership to boost cloud revenue',
+    'faces regulatory concern over data practices',
+    'cuts guidance amid weak consumer demand',
+    'to execute buyback plan, highlights record quarter',
+    'plunges on layoff reports and rising volatility',
+    'expands into new markets with acquisition deal'
+]
+TAILS = ['', ' - report', ' as investors weigh outlook', ' despite market uncertainty', ' in early trading']
+
+
+def build_corpus(size, seed=42):
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(EVENTS)}{rng.choice(TAILS)}" for _ in range(size)]
+
+
+def legacy_lexicon_counts(text):
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    text = ' '.join(text.split())
+    positive_words = list(LEGACY_POSITIVE)
+    negative_words = list(LEGACY_NEGATIVE)
+    return (sum(1 for word in positive_words if word in text),
+            sum(1 for word in negative_words if word in text))
+
+
+def indexed_lexicon_counts(text):
+    tokens = app.NON_WORD_PATTERN.sub(' ', text.lower()).split()
+    hits = app.find_lexicon_hits(tokens)
+    return len(hits.get('positive', ())), len(hits.get('negative', ()))
+
+
+def timed(label, func, corpus):
+    start = time.perf_counter()
+    for text in corpus:
+        func(text)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {elapsed / len(corpus) * 1e6:7.2f} us/headline")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headlines', type=int, default=10000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.headlines)
+    print(f"Corpus: {len(corpus)} headlines")
+
+    legacy = timed('substring scan (legacy)', legacy_lexicon_counts, corpus)
+    indexed = timed('lexicon index', indexed_lexicon_counts, corpus)
+    print(f"Lexicon stage speedup: {legacy / indexed:.1f}x")
+
+    # Cold runs start from an empty sentiment memo; the corpus repeats headlines
+    # the way real traffic does, so cold runs already get some memo hits
+    app.sentiment_cache.clear()
+    timed('analyze_sentiment_ml (cold)', app.analyze_sentiment_ml, corpus)
+    timed('analyze_sentiment_ml (warm)', app.analyze_sentiment_ml, corpus)
+
+    app.sentiment_cache.clear()
+    start = time.perf_counter()
+    batch_results = app.analyze_sentiment_ml_batch(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"{'analyze_sentiment_ml_batch':<28} {elapsed * 1000:9.1f} ms  {elapsed / len(corpus) * 1e6:7.2f} us/headline")
+
+    app.sentiment_cache.clear()
+    assert batch_results == [app.analyze_sentiment_ml(text) for text in corpus], "batch results differ from scalar path"
+
+if __name__ == '__main__':
+    main()
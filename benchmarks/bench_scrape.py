@@ -0,0 +1,107 @@
+"""Micro-benchmark: BeautifulSoup full-document parse (the old scraping path) vs.
+the lxml iterparse path that stops after the first headlines.
+
+Runs on synthetic Yahoo-like quote news pages by default; pass saved pages
+with --html to measure real markup.
+
+Needs beautifulsoup4, which the app itself no longer uses
+(pip install beautifulsoup4). Run from the repository root:
+
+    python benchmarks/bench_scrape.py [--pages 20] [--html saved_page.html ...]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+SYMBOL = 'TCS'
+COMPANY_NAME = 'Tata Consultancy Services'
+HEADLINES = [
+    'TCS shares surge after earnings beat estimates',
+    'TCS stock falls as margins disappoint analysts',
+    'TCS announces partnership to boost cloud revenue',
+    'TCS faces regulatory concern over data practices',
+    'Tata Consultancy wins record deal in Europe',
+    'TCS cuts guidance amid weak consumer demand',
+    'TCS expands into new markets with acquisition deal',
+    'Analysts upgrade TCS on record quarter'
+]
+
+
+def build_page(rng, target_bytes):
+    """A quote news page shaped like Yahoo's: a large head of inline scripts and
+    navigation, the headline list, then a long tail of related content"""
+    filler_script = '<script>window.__DATA__=' + '{"k":"' + 'x' * 4000 + '"};</script>'
+    nav = ''.join(f'<li><a href="/nav/{i}">Section {i}</a></li>' for i in range(200))
+    head = f"<html><head><title>{SYMBOL}.NS news</title>{filler_script * 40}</head><body><nav><ul>{nav}</ul></nav>"
+    headlines = ''.join(
+        f'<li><div><h3 class="Mb(5px)"><a href="/news/{SYMBOL}/{i}"><u>{title}</u></a></h3><p>Teaser {i}</p></div></li>'
+        for i, title in enumerate(rng.sample(HEADLINES, len(HEADLINES)))
+    )
+    related = []
+    size = len(head) + len(headlines)
+    while size < target_bytes:
+        block = f'<div class="related"><h3 class="Fz(s)">Related {len(related)}</h3><p>{"lorem ipsum " * 60}</p></div>'
+        related.append(block)
+        size += len(block)
+    return f"{head}<main><ul>{headlines}</ul>{''.join(related)}</main></body></html>".encode('utf-8')
+
+
+def soup_headlines(content):
+    """Titles and links as the BeautifulSoup scraper extracted them"""
+    soup = BeautifulSoup(content, 'html.parser')
+    results = []
+    for element in soup.find_all('h3', class_='Mb(5px)')[:6]:
+        title = element.get_text().strip()
+        if title and (SYMBOL.lower() in title.lower() or COMPANY_NAME.lower().split()[0] in title.lower()):
+            link_element = element.find('a')
+            link = link_element.get('href') if link_element else f"https://finance.yahoo.com/quote/{SYMBOL}.NS"
+            results.append((title, link))
+    return results
+
+
+def lxml_headlines(content):
+    return [(item['title'], item['link'])
+            for _, _, item in app.get_yahoo_news_page_candidates(content, SYMBOL, COMPANY_NAME)]
+
+
+def timed(label, func, pages):
+    start = time.perf_counter()
+    results = [func(page) for page in pages]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {elapsed / len(pages) * 1000:7.2f} ms/page")
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--page-bytes', type=int, default=1536 * 1024)
+    parser.add_argument('--html', nargs='*', default=[], help='saved Yahoo quote news pages to parse instead')
+    args = parser.parse_args()
+
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+    else:
+        rng = random.Random(42)
+        pages = [build_page(rng, args.page_bytes) for _ in range(args.pages)]
+    print(f"Pages: {len(pages)}, {sum(len(page) for page in pages) / len(pages) / 1024:.0f} KiB average")
+
+    soup_time, soup_results = timed('BeautifulSoup (legacy)', soup_headlines, pages)
+    lxml_time, lxml_results = timed('lxml iterparse', lxml_headlines, pages)
+    print(f"Scrape speedup: {soup_time / lxml_time:.1f}x")
+
+    assert soup_results == lxml_results, "lxml headlines differ from BeautifulSoup"
+
+if __name__ == '__main__':
+    main()
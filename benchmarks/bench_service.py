@@ -0,0 +1,289 @@
+"""Load benchmark: the HTTP API against a local Yahoo stand-in, with JSON output.
+
+Starts benchmarks/yahoo_stub.py in-process (synthetic payloads, or recorded
+ones with --fixtures; latency and 503s can be injected), points app.py at it
+through YAHOO_QUERY_BASE_URL / YAHOO_WEB_BASE_URL, serves the app on a local
+port and drives /api/analyze_sentiment, /api/get_default_markets and
+/api/search_stocks at each concurrency level. The report has req/s,
+p50/p95/p99 latency, status counts and the mean Server-Timing of each stage,
+plus micro-benchmarks of the scoring, keyword and insight code on a fixed
+headline corpus, so runs can be diffed across commits.
+
+Run from the repository root:
+
+    python benchmarks/bench_service.py [--concurrency 1,8,32] [--requests 200] [--delay 0.05] [--output bench.json]
+    python benchmarks/bench_service.py --server asgi --concurrency 64,256 --delay 0.5 --error-rate 0.02
+
+--cache-ttl 0 expires price and news entries immediately, so requests keep
+reaching the stand-in instead of the in-process caches. A level that hasn't
+finished within --level-timeout seconds aborts the run with exit status 1.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yahoo_stub  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANALYZE_SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'TSLA', 'TCS', 'INFY', 'RELIANCE', 'HDFCBANK']
+SEARCH_QUERIES = ['app', 'micro', 'tata', 'bank', 'inf', 'rel', 'a', 'tesla']
+NEWS_ITEMS_PER_CALL = 8
+# Seconds between progress lines while a level runs
+PROGRESS_INTERVAL = 10
+
+
+class LevelTimeout(Exception):
+    """A benchmark level did not finish in time, e.g. because the server stopped answering"""
+
+
+def scenario_request(scenario, i):
+    """(method, path, json body) for the i-th request of a scenario"""
+    if scenario == 'analyze':
+        return 'POST', '/api/analyze_sentiment', {'symbol': ANALYZE_SYMBOLS[i % len(ANALYZE_SYMBOLS)]}
+    if scenario == 'markets':
+        return 'GET', f"/api/get_default_markets?location={'US' if i % 2 == 0 else 'IN'}", None
+    if scenario == 'search':
+        return 'GET', f"/api/search_stocks?q={SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}", None
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def parse_server_timing(header):
+    """{stage: milliseconds} from a Server-Timing header"""
+    stages = {}
+    for entry in (header or '').split(','):
+        name, _, params = entry.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'dur' and name:
+                stages[name] = float(value)
+    return stages
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app_server(app, kind, stop_timeout=10):
+    """Serve app on a local port in a daemon thread; returns (base_url, stop).
+
+    stop() returns once the server thread has exited, or warns after
+    stop_timeout seconds if it hasn't.
+    """
+    port = free_port()
+    if kind == 'asgi':
+        import uvicorn
+        server = uvicorn.Server(uvicorn.Config(app.asgi_app, host='127.0.0.1', port=port, log_level='warning', lifespan='on'))
+        thread = threading.Thread(target=server.run, name='bench-asgi', daemon=True)
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError('uvicorn exited during startup')
+            time.sleep(0.05)
+
+        def shutdown():
+            server.should_exit = True
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no per-request access log
+        server = make_server('127.0.0.1', port, app.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, name='bench-wsgi', daemon=True)
+        thread.start()
+
+        def shutdown():
+            # shutdown() itself waits for serve_forever, so run it where it can't hang stop()
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def stop():
+        shutdown()
+        thread.join(stop_timeout)
+        if thread.is_alive():
+            print(f"warning: {kind} server still running {stop_timeout}s after shutdown", file=sys.stderr)
+    return f"http://127.0.0.1:{port}", stop
+
+
+def run_level(base_url, scenario, concurrency, total, timeout):
+    """Issue total requests with concurrency clients; returns the level's summary.
+
+    Raises LevelTimeout when the requests haven't all finished within timeout seconds.
+    """
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body = scenario_request(scenario, i)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=min(60, timeout))
+            response.content
+            status = response.status_code
+            timing = response.headers.get('Server-Timing')
+        except requests.RequestException:
+            status, timing = 'error', None
+        return time.perf_counter() - started, status, timing
+
+    started = time.perf_counter()
+    deadline = started + timeout
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = [pool.submit(one, i) for i in range(total)]
+    try:
+        pending = futures
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise LevelTimeout(f"{scenario} c={concurrency}: {total - len(pending)}/{total} requests "
+                                   f"finished in {timeout:.0f}s")
+            _, pending = wait(pending, min(PROGRESS_INTERVAL, remaining), FIRST_EXCEPTION)
+            if pending:
+                print(f"  {scenario} c={concurrency}: {total - len(pending)}/{total} requests done", file=sys.stderr)
+    finally:
+        # Don't wait on stuck requests; their own timeout ends them
+        pool.shutdown(wait=False, cancel_futures=True)
+    samples = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    latencies = np.array([latency for latency, _, _ in samples]) * 1000
+    stage_samples = {}
+    for _, _, timing in samples:
+        for stage, ms in parse_server_timing(timing).items():
+            stage_samples.setdefault(stage, []).append(ms)
+
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': total,
+        'seconds': round(wall, 3),
+        'requests_per_second': round(total / wall, 2),
+        'latency_ms': {
+            'p50': round(float(np.percentile(latencies, 50)), 2),
+            'p95': round(float(np.percentile(latencies, 95)), 2),
+            'p99': round(float(np.percentile(latencies, 99)), 2),
+            'max': round(float(latencies.max()), 2)
+        },
+        'status': {str(status): count for status, count in Counter(status for _, status, _ in samples).items()},
+        'stages_ms': {stage: {
+            'mean': round(float(np.mean(values)), 3),
+            'p95': round(float(np.percentile(values, 95)), 3),
+            'responses': len(values)
+        } for stage, values in sorted(stage_samples.items())}
+    }
+
+
+def time_per_call(func, args_list):
+    started = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return round((time.perf_counter() - started) / len(args_list) * 1e6, 2)
+
+
+def run_micro(app, headlines):
+    """Microseconds per call for the CPU-bound analysis stages"""
+    # bench_lexicon imports app, so it can only be loaded once app is configured
+    from bench_lexicon import build_corpus
+    corpus = build_corpus(headlines)
+    app.sentiment_cache.clear()
+    results = {'analyze_sentiment_ml_cold_us': time_per_call(app.analyze_sentiment_ml, [(text,) for text in corpus])}
+    results['analyze_sentiment_ml_warm_us'] = time_per_call(app.analyze_sentiment_ml, [(text,) for text in corpus])
+
+    news_items = [dict(app.analyze_sentiment_ml(text), title=text, summary=f"{text}. Analysts weigh the outlook.")
+                  for text in corpus]
+    batches = [news_items[i:i + NEWS_ITEMS_PER_CALL] for i in range(0, len(news_items), NEWS_ITEMS_PER_CALL)]
+    results['extract_keywords_from_news_us'] = time_per_call(app.extract_keywords_from_news, [(batch,) for batch in batches])
+    results['generate_summarized_insights_us'] = time_per_call(
+        app.generate_summarized_insights, [(batch, 'AAPL', 'Apple Inc.') for batch in batches])
+    results['headlines'] = headlines
+    results['news_items_per_call'] = NEWS_ITEMS_PER_CALL
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--scenarios', default='analyze,markets,search')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated client counts')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario and concurrency level')
+    parser.add_argument('--delay', type=float, default=0.05, help='stand-in latency per upstream request, seconds')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures', help='recorded payloads (see benchmarks/record_fixtures.py)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache-ttl', type=float, help='override price and news cache TTLs, seconds')
+    parser.add_argument('--micro-headlines', type=int, default=2000)
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--level-timeout', type=float, default=300, help='abort if a level takes longer, seconds')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    stub, stub_url = yahoo_stub.serve_in_thread(0, args.delay, args.jitter, args.error_rate, args.fixtures, args.seed)
+    # app reads its configuration at import time
+    os.environ['YAHOO_QUERY_BASE_URL'] = stub_url
+    os.environ['YAHOO_WEB_BASE_URL'] = stub_url
+    os.environ['PREFETCH_ENABLED'] = 'false'
+    if args.cache_ttl is not None:
+        for name in ('STOCK_CACHE_TTL_OPEN', 'STOCK_CACHE_TTL_CLOSED', 'NEWS_CACHE_TTL'):
+            os.environ[name] = str(args.cache_ttl)
+    app = importlib.import_module('app')
+    base_url, stop = start_app_server(app, args.server)
+
+    results = []
+    try:
+        for scenario in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+            for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                try:
+                    level = run_level(base_url, scenario, concurrency, args.requests, args.level_timeout)
+                except LevelTimeout as e:
+                    print(f"error: level timed out: {e}", file=sys.stderr)
+                    sys.exit(1)
+                results.append(level)
+                latency = level['latency_ms']
+                print(f"{scenario:<8} c={concurrency:<4} {level['requests_per_second']:9.1f} req/s  "
+                      f"p50 {latency['p50']:8.1f} ms  p95 {latency['p95']:8.1f} ms  p99 {latency['p99']:8.1f} ms  "
+                      f"{level['status']}", file=sys.stderr)
+    finally:
+        stop()
+        stub.shutdown()
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'results': results,
+        'micro': None if args.skip_micro else run_micro(app, args.micro_headlines)
+    }
+    if report['micro']:
+        print(f"micro    {report['micro']}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Record Yahoo Finance payloads as replay fixtures for benchmarks/yahoo_stub.py.
+
+For each symbol this saves a daily chart for every range the price history
+serves and an intraday chart for every interval and range the intraday view
+offers, the search response the news fetch uses and the quote news page,
+plus spark entries for the symbols and the default market indices at each
+bulk price range. Needs network access; run from the repository root:
+
+    python benchmarks/record_fixtures.py --out benchmarks/fixtures [--symbols AAPL,MSFT,TCS,INFY]
+
+then replay them offline with
+
+    python benchmarks/yahoo_stub.py --fixtures benchmarks/fixtures
+    python benchmarks/bench_service.py --fixtures benchmarks/fixtures
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from yahoo_stub import chart_fixture_name, fixture_path, spark_fixture_name  # noqa: E402
+
+DEFAULT_SYMBOLS = 'AAPL,MSFT,GOOGL,TSLA,TCS,INFY,RELIANCE,HDFCBANK'
+
+
+def save(out, kind, name, extension, body):
+    path = fixture_path(out, kind, name, extension)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(body)
+    print(f"  {path} ({len(body)} bytes)")
+
+
+def fetch(url, params=None):
+    response = app.http_session.get(url, params=params, timeout=15)
+    response.raise_for_status()
+    return response.content
+
+
+def record_symbol(out, symbol):
+    yahoo_symbol = app.resolve_yahoo_symbol(symbol)
+    print(f"{symbol} ({yahoo_symbol})")
+    chart_requests = [(range_, '1d') for range_ in app.PRICE_HISTORY_RANGES]
+    chart_requests += [(range_, interval) for interval, ranges in app.PRICE_INTRADAY_RANGES.items() for range_ in ranges]
+    for range_, interval in chart_requests:
+        save(out, 'chart', chart_fixture_name(yahoo_symbol, range_, interval), '.json',
+             fetch(f"{app.YAHOO_QUERY_BASE_URL}/v8/finance/chart/{yahoo_symbol}", {'interval': interval, 'range': range_}))
+    save(out, 'search', symbol, '.json',
+         fetch(f"{app.YAHOO_QUERY_BASE_URL}/v1/finance/search", {'q': symbol, 'quotesCount': 1, 'newsCount': 15}))
+    # The scraper always asks for the .NS page, whichever market the symbol is on
+    save(out, 'news', f"{symbol}.NS", '.html', fetch(f"{app.YAHOO_WEB_BASE_URL}/quote/{symbol}.NS/news"))
+    return yahoo_symbol
+
+
+def record_spark(out, yahoo_symbols):
+    for range_ in sorted(set(app.BULK_PRICE_RANGES.values())):
+        for start in range(0, len(yahoo_symbols), app.SPARK_BATCH_SIZE):
+            chunk = yahoo_symbols[start:start + app.SPARK_BATCH_SIZE]
+            data = json.loads(fetch(f"{app.YAHOO_QUERY_BASE_URL}/v7/finance/spark",
+                                    {'symbols': ','.join(chunk), 'range': range_, 'interval': '1d'}))
+            for entry in (data.get('spark') or {}).get('result') or []:
+                save(out, 'spark', spark_fixture_name(entry['symbol'], range_), '.json', json.dumps(entry).encode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+    parser.add_argument('--symbols', default=DEFAULT_SYMBOLS, help='comma-separated symbols from data/symbols.csv')
+    args = parser.parse_args()
+
+    yahoo_symbols = []
+    for symbol in [s.strip() for s in args.symbols.split(',') if s.strip()]:
+        try:
+            yahoo_symbols.append(record_symbol(args.out, symbol))
+        except Exception as e:
+            print(f"  failed: {e}")
+    yahoo_symbols += [market['symbol'] for markets in app.DEFAULT_MARKETS.values() for market in markets]
+    try:
+        record_spark(args.out, yahoo_symbols)
+    except Exception as e:
+        print(f"Spark failed: {e}")
+
+if __name__ == '__main__':
+    main()
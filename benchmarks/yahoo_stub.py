@@ -0,0 +1,334 @@
+"""Local stand-in for the Yahoo Finance endpoints the app calls, for offline runs.
+
+Serves deterministic synthetic payloads for:
+
+    /v8/finance/chart/<symbol>     daily OHLCV bars for ?range= or from ?period1=,
+                                   or intraday ones with ?interval=1m/5m/15m
+    /v7/finance/spark?symbols=...  daily closes for up to 20 symbols
+    /v1/finance/search?q=<symbol>  news headlines mentioning the symbol
+    /quote/<symbol>/news           HTML page with h3.Mb(5px) headlines
+
+Run it and point the app at it:
+
+    python benchmarks/yahoo_stub.py --port 8900
+    YAHOO_QUERY_BASE_URL=http://127.0.0.1:8900 YAHOO_WEB_BASE_URL=http://127.0.0.1:8900 \
+        uvicorn app:asgi_app --port 8080
+
+--delay adds a fixed latency to every response, to see how many slow
+upstream requests one worker can hold open; --jitter adds up to that many
+more seconds at random, and --error-rate answers that share of requests
+with a 503.
+
+--fixtures replays payloads recorded by benchmarks/record_fixtures.py,
+laid out as
+
+    <dir>/chart/<yahoo symbol>@<interval>@<range>.json    whole chart response
+    <dir>/spark/<yahoo symbol>@<range>.json               one entry of spark.result
+    <dir>/search/<query>.json                             whole search response
+    <dir>/news/<path symbol>.html                         quote news page
+
+(names are URL-quoted). A chart or spark fixture only answers requests for
+its own range and interval. Incremental ?period1= chart requests are cut
+from the longest recorded daily chart of the symbol, so they only see bars
+up to the day it was recorded. Anything without a fixture is synthesized.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+DAY_SECONDS = 86400
+# Intraday bars cover a 6.5 hour session starting at 13:30 UTC
+SESSION_OPEN_SECONDS = 13 * 3600 + 1800
+SESSION_SECONDS = 390 * 60
+INTERVAL_MINUTES = {'1m': 1, '5m': 5, '15m': 15}
+# Daily chart ranges record_fixtures.py saves, longest first
+RECORDED_DAILY_RANGES = ('5y', '1y', '3mo', '30d')
+HEADLINE_TEMPLATES = [
+    '{symbol} shares surge after earnings beat estimates',
+    '{symbol} stock falls as margins disappoint analysts',
+    '{symbol} announces partnership to boost cloud revenue',
+    '{symbol} faces regulatory concern over data practices',
+    '{symbol} expands into new markets with acquisition deal',
+    '{symbol} cuts guidance amid weak consumer demand',
+    'Analysts upgrade {symbol} on record quarter',
+    '{symbol} plunges on layoff reports and rising volatility'
+]
+
+
+def symbol_seed(symbol):
+    return int.from_bytes(hashlib.blake2b(symbol.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+def build_bars(symbol, days):
+    """Deterministic (timestamps, opens, highs, lows, closes, volumes) ending at today's midnight UTC.
+
+    A day's bar depends only on the symbol and the day, so overlapping
+    ranges and period1 queries agree with each other.
+    """
+    seed = symbol_seed(symbol)
+    end_day = int(time.time()) // DAY_SECONDS
+    timestamps, opens, highs, lows, closes, volumes = [], [], [], [], [], []
+    for day in range(end_day - days + 1, end_day + 1):
+        wave = ((seed + day * 7919) % 2000) / 1000 - 1
+        close = round((50 + seed % 400) * (1 + 0.2 * wave), 2)
+        open_ = round(close * (1 - 0.01 * wave), 2)
+        timestamps.append(day * DAY_SECONDS)
+        opens.append(open_)
+        highs.append(round(max(open_, close) * 1.01, 2))
+        lows.append(round(min(open_, close) * 0.99, 2))
+        closes.append(close)
+        volumes.append(1000000 + (seed * (day % 97 + 1)) % 9000000)
+    return timestamps, opens, highs, lows, closes, volumes
+
+
+def build_intraday_bars(symbol, days, minutes):
+    """Deterministic intraday bars every minutes over the sessions of the last days days.
+
+    A bar depends only on the symbol and its minute, like build_bars.
+    """
+    seed = symbol_seed(symbol)
+    end_day = int(time.time()) // DAY_SECONDS
+    timestamps, opens, highs, lows, closes, volumes = [], [], [], [], [], []
+    for day in range(end_day - days + 1, end_day + 1):
+        base = (50 + seed % 400) * (1 + 0.2 * (((seed + day * 7919) % 2000) / 1000 - 1))
+        for offset in range(0, SESSION_SECONDS, minutes * 60):
+            minute = (day * DAY_SECONDS + SESSION_OPEN_SECONDS + offset) // 60
+            wave = ((seed + minute * 104729) % 2000) / 1000 - 1
+            close = round(base * (1 + 0.01 * wave), 2)
+            open_ = round(close * (1 - 0.001 * wave), 2)
+            timestamps.append(minute * 60)
+            opens.append(open_)
+            highs.append(round(max(open_, close) * 1.001, 2))
+            lows.append(round(min(open_, close) * 0.999, 2))
+            closes.append(close)
+            volumes.append(1000 + (seed * (minute % 89 + 1)) % 90000)
+    return timestamps, opens, highs, lows, closes, volumes
+
+
+def range_days(range_):
+    return {'1d': 1, '5d': 5, '10d': 10, '30d': 30, '1mo': 30, '3mo': 90, '1y': 365, '5y': 1825}.get(range_, 30)
+
+
+def chart_payload(symbol, range_='30d', period1=None, interval='1d'):
+    """Chart response for a range, or for every day from period1 on when it is given"""
+    days = range_days(range_)
+    if period1 is not None:
+        days = max(1, int(time.time()) // DAY_SECONDS - int(period1) // DAY_SECONDS + 1)
+    if interval in INTERVAL_MINUTES:
+        timestamps, opens, highs, lows, closes, volumes = build_intraday_bars(symbol, days, INTERVAL_MINUTES[interval])
+    else:
+        timestamps, opens, highs, lows, closes, volumes = build_bars(symbol, days)
+    return {'chart': {'result': [{
+        'meta': {'symbol': symbol},
+        'timestamp': timestamps,
+        'indicators': {'quote': [{'open': opens, 'high': highs, 'low': lows, 'close': closes, 'volume': volumes}]}
+    }], 'error': None}}
+
+
+def spark_payload(symbols, range_='10d'):
+    results = []
+    for symbol in symbols:
+        timestamps, _, _, _, closes, _ = build_bars(symbol, range_days(range_))
+        results.append({'symbol': symbol, 'response': [{
+            'meta': {'symbol': symbol},
+            'timestamp': timestamps,
+            'indicators': {'quote': [{'close': closes}]}
+        }]})
+    return {'spark': {'result': results, 'error': None}}
+
+
+def headlines(symbol, count):
+    seed = symbol_seed(symbol)
+    return [HEADLINE_TEMPLATES[(seed + i) % len(HEADLINE_TEMPLATES)].format(symbol=symbol) for i in range(count)]
+
+
+def search_payload(symbol, news_count=15):
+    now = int(time.time())
+    return {'quotes': [{'symbol': symbol}], 'news': [{
+        'title': title,
+        'summary': f"Synthetic summary {i} for {symbol}",
+        'link': f"https://example.com/news/{symbol}/{i}",
+        'publisher': 'Stub Wire',
+        'providerPublishTime': now - i * 3600
+    } for i, title in enumerate(headlines(symbol, news_count))]}
+
+
+def news_page(symbol):
+    base_symbol = symbol.split('.')[0]
+    items = ''.join(
+        f'<li><h3 class="Mb(5px)"><a href="/news/{base_symbol}/{i}">{html.escape(title)}</a></h3></li>'
+        for i, title in enumerate(headlines(base_symbol, 6))
+    )
+    return f"<html><head><title>{html.escape(symbol)} news</title></head><body><ul>{items}</ul></body></html>"
+
+
+class YahooStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def chart_fixture_name(symbol, range_, interval):
+    return f"{symbol}@{interval}@{range_}"
+
+
+def spark_fixture_name(symbol, range_):
+    return f"{symbol}@{range_}"
+
+
+def fixture_path(fixtures, kind, name, extension):
+    return os.path.join(fixtures, kind, quote(name, safe='') + extension)
+
+
+def load_fixture(fixtures, kind, name, extension='.json'):
+    """Recorded payload bytes, or None without a fixtures dir or a matching file"""
+    if not fixtures:
+        return None
+    try:
+        with open(fixture_path(fixtures, kind, name, extension), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def slice_chart(recorded, period1, period2=None):
+    """Recorded chart response cut down to the bars from period1 (to period2), as a payload dict"""
+    payload = json.loads(recorded)
+    result = payload['chart']['result'][0]
+    timestamps = result.get('timestamp') or []
+    keep = [i for i, ts in enumerate(timestamps) if ts >= int(period1) and (period2 is None or ts <= int(period2))]
+    result['timestamp'] = [timestamps[i] for i in keep]
+    for series in result.get('indicators', {}).values():
+        for columns in series:
+            for key, values in columns.items():
+                if isinstance(values, list) and len(values) == len(timestamps):
+                    columns[key] = [values[i] for i in keep]
+    return payload
+
+
+class YahooStubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    fixtures = None
+    rng = random.Random(0)
+
+    def do_GET(self):
+        if self.delay or self.jitter:
+            time.sleep(self.delay + self.rng.uniform(0, self.jitter))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.send_body(b'{"error": "injected"}', 'application/json', 503)
+            return
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        path = unquote(parts.path)
+
+        if path.startswith('/v8/finance/chart/'):
+            symbol = path.rsplit('/', 1)[1]
+            range_ = query.get('range', ['30d'])[0]
+            interval = query.get('interval', ['1d'])[0]
+            period1 = query.get('period1', [None])[0]
+            if period1 is not None:
+                recorded = self.daily_chart_fixture(symbol)
+                if recorded is not None:
+                    self.send_json(slice_chart(recorded, period1, query.get('period2', [None])[0]))
+                    return
+            else:
+                recorded = load_fixture(self.fixtures, 'chart', chart_fixture_name(symbol, range_, interval))
+                if recorded is not None:
+                    self.send_body(recorded, 'application/json')
+                    return
+            self.send_json(chart_payload(symbol, range_, period1, interval))
+        elif path == '/v7/finance/spark':
+            symbols = [s for s in query.get('symbols', [''])[0].split(',') if s][:20]
+            self.send_json(self.spark(symbols, query.get('range', ['10d'])[0]))
+        elif path == '/v1/finance/search':
+            q = query.get('q', [''])[0]
+            recorded = load_fixture(self.fixtures, 'search', q)
+            if recorded is not None:
+                self.send_body(recorded, 'application/json')
+                return
+            self.send_json(search_payload(q, int(query.get('newsCount', ['15'])[0])))
+        elif path.startswith('/quote/') and path.endswith('/news'):
+            symbol = path.split('/')[2]
+            recorded = load_fixture(self.fixtures, 'news', symbol, '.html')
+            self.send_body(recorded or news_page(symbol).encode('utf-8'), 'text/html; charset=utf-8')
+        else:
+            self.send_body(b'{"error": "not found"}', 'application/json', 404)
+
+    def daily_chart_fixture(self, symbol):
+        """The longest recorded daily chart for symbol, or None"""
+        for range_ in RECORDED_DAILY_RANGES:
+            recorded = load_fixture(self.fixtures, 'chart', chart_fixture_name(symbol, range_, '1d'))
+            if recorded is not None:
+                return recorded
+        return None
+
+    def spark(self, symbols, range_):
+        """Spark response mixing recorded per-symbol entries with synthetic ones"""
+        payload = spark_payload(symbols, range_)
+        results = payload['spark']['result']
+        for i, symbol in enumerate(symbols):
+            recorded = load_fixture(self.fixtures, 'spark', spark_fixture_name(symbol, range_))
+            if recorded is not None:
+                results[i] = json.loads(recorded)
+        return payload
+
+    def send_json(self, payload):
+        self.send_body(json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=0, delay=0.0, jitter=0.0, error_rate=0.0, fixtures=None, seed=0):
+    handler = type('ConfiguredYahooStubHandler', (YahooStubHandler,), {
+        'delay': delay,
+        'jitter': jitter,
+        'error_rate': error_rate,
+        'fixtures': fixtures,
+        'rng': random.Random(seed)
+    })
+    return YahooStubServer(('127.0.0.1', port), handler)
+
+
+def serve_in_thread(port=0, delay=0.0, jitter=0.0, error_rate=0.0, fixtures=None, seed=0):
+    """Start the stub on a daemon thread; returns (server, base_url). Call server.shutdown() to stop."""
+    server = make_server(port, delay, jitter, error_rate, fixtures, seed)
+    threading.Thread(target=server.serve_forever, name='yahoo-stub', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds, at random')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 503')
+    parser.add_argument('--fixtures', help='directory of recorded payloads to replay')
+    parser.add_argument('--seed', type=int, default=0, help='seed for jitter and injected errors')
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.delay, args.jitter, args.error_rate, args.fixtures, args.seed)
+    print(f"Yahoo stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""Shared setup: import app.py from the repository root with a quiet, offline configuration."""
+import os
+import sys
+
+# Set before app is imported, since it reads its configuration at import time
+os.environ.update({
+    'PREFETCH_ENABLED': 'false',
+    'PRICE_HISTORY_DB': '',
+    'NEWS_ARCHIVE_DB': '',
+    'SENTIMENT_CACHE_DB': '',
+    'PROFILE_TOKEN': '',
+    'PROFILE_DIR': '',
+    # Nothing listens on the discard port, so a stray upstream call fails fast
+    'YAHOO_QUERY_BASE_URL': 'http://127.0.0.1:9',
+    'YAHOO_WEB_BASE_URL': 'http://127.0.0.1:9'
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import app
+
+NEWS_ITEMS = [
+    {'title': 'Apple shares surge on record iPhone sales', 'summary': 'Strong growth', 'link': 'https://example.com/1',
+     'publisher': 'Wire', 'published': int(time.time()) - 3600, 'sentiment': 'Positive', 'confidence': 0.8}
+]
+
+
+def stock_data(symbol):
+    return {
+        'chart_data': {'date': [1700000000000, 1700086400000], 'price': [100.0, 101.5], 'volume': [1000, 1200]},
+        'current_price': 101.5,
+        'price_change': 1.5,
+        'price_change_percent': 1.5,
+        'data_timestamp': datetime.now().isoformat(),
+        'data_source': 'Yahoo Finance (Real-time)'
+    }
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Instant price and news fetches that record which ones ran"""
+    calls = []
+
+    def get_real_stock_data(symbol):
+        calls.append('stock_data')
+        return stock_data(symbol)
+
+    def get_stock_news_items(symbol, company_name):
+        calls.append('news')
+        return list(NEWS_ITEMS)
+
+    monkeypatch.setattr(app, 'get_real_stock_data', get_real_stock_data)
+    monkeypatch.setattr(app, 'get_stock_news_items', get_stock_news_items)
+    return calls
+
+
+class TestAnalyzeStock:
+    def test_all_sections(self, fetches):
+        """A full analysis has every section and isn't degraded."""
+        result = app.analyze_stock('AAPL')
+        assert sorted(fetches) == ['news', 'stock_data']
+        assert result['news_count'] == 1 and result['current_price'] == 101.5
+        assert {'insights', 'keywords', 'sentiment_data'} <= set(result)
+        assert result['degraded'] is False and result['degraded_sections'] == []
+
+    def test_skips_unneeded_fetches(self, fetches):
+        """Sections that need only prices or only news skip the other fetch."""
+        assert 'news_items' not in app.analyze_stock('AAPL', ('prices',))
+        assert fetches == ['stock_data']
+        fetches.clear()
+        assert 'chart_data' not in app.analyze_stock('AAPL', ('keywords',))
+        assert fetches == ['news']
+
+    def test_fetches_run_concurrently(self, monkeypatch):
+        """News and prices are fetched at the same time, not one after the other."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def get_real_stock_data(symbol):
+            barrier.wait()
+            return stock_data(symbol)
+
+        def get_stock_news_items(symbol, company_name):
+            barrier.wait()
+            return list(NEWS_ITEMS)
+
+        monkeypatch.setattr(app, 'get_real_stock_data', get_real_stock_data)
+        monkeypatch.setattr(app, 'get_stock_news_items', get_stock_news_items)
+        assert app.analyze_stock('AAPL')['degraded'] is False
+
+    def test_slow_prices_miss_the_deadline(self, fetches, monkeypatch):
+        """Prices that miss ANALYZE_DEADLINE_SECONDS are replaced by placeholders and reported."""
+        release = threading.Event()
+
+        def get_real_stock_data(symbol):
+            release.wait(5)
+            return stock_data(symbol)
+
+        monkeypatch.setattr(app, 'get_real_stock_data', get_real_stock_data)
+        monkeypatch.setattr(app, 'ANALYZE_DEADLINE_SECONDS', 0.2)
+        misses = app.DEADLINE_MISSES._values.get(('stock_data', 'US'), 0)
+        started = time.monotonic()
+        try:
+            result = app.analyze_stock('AAPL')
+        finally:
+            release.set()
+        assert time.monotonic() - started < 2
+        assert result['degraded'] is True and result['degraded_sections'] == ['stock_data']
+        assert result['data_source'] == app.SIMULATED_DATA_SOURCE
+        assert result['news_count'] == 1
+        assert app.DEADLINE_MISSES._values[('stock_data', 'US')] == misses + 1
+
+
+class TestStreamedAnalysis:
+    def test_sections_in_order(self, fetches):
+        """stream=1 sends one NDJSON line per section, meta first and done last."""
+        response = app.app.test_client().get('/api/analyze_sentiment?symbol=AAPL&stream=1')
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        sections = [line['section'] for line in lines]
+        assert sections[0] == 'meta' and sections[-2:] == ['sentiment_data', 'done']
+        assert sorted(sections) == sorted(['meta', *app.ANALYZE_SECTIONS, 'done'])
+        assert lines[0]['data']['symbol'] == 'AAPL'
+
+    def test_merged_stream_equals_response(self, fetches):
+        """The streamed sections merge into the same result as the single response."""
+        streamed = app.merge_analysis_sections(app.iter_analysis_sections('AAPL'))
+        single = app.analyze_stock('AAPL')
+        # Each fetch is stamped with its own time
+        assert streamed.pop('data_timestamp') <= single.pop('data_timestamp')
+        assert streamed == single
+
+    def test_news_section_before_slow_prices(self, monkeypatch, fetches):
+        """The news section is sent while prices are still loading."""
+        release = threading.Event()
+
+        def get_real_stock_data(symbol):
+            release.wait(5)
+            return stock_data(symbol)
+
+        monkeypatch.setattr(app, 'get_real_stock_data', get_real_stock_data)
+        sections = app.iter_analysis_sections('AAPL')
+        try:
+            assert next(sections)[0] == 'meta'
+            assert next(sections)[0] == 'news'
+        finally:
+            release.set()
+        assert [section for section, _ in sections][-1] == 'done'
@@ -0,0 +1,97 @@
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+import uvicorn
+
+import app
+
+SEARCH_QUERIES = ['app', 'micro', 'tata', 'bank', 'inf', 'goo', 'rel', 'hdfc', 'tes', 'am']
+
+
+def call_asgi(scope, body=b''):
+    """Run asgi_app on one request in a fresh event loop; returns (status, headers dict, body)"""
+    messages = []
+    requests_left = [{'type': 'http.request', 'body': body}]
+
+    async def receive():
+        if requests_left:
+            return requests_left.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = dict({'type': 'http', 'method': 'GET', 'query_string': b'', 'headers': [], 'http_version': '1.1',
+                  'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234), 'root_path': ''}, **scope)
+    asyncio.run(asyncio.wait_for(app.asgi_app(scope, receive, send), 10))
+    start = next(message for message in messages if message['type'] == 'http.response.start')
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in start['headers']}
+    return start['status'], headers, b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+
+
+@pytest.fixture(scope='module')
+def server():
+    """asgi_app under uvicorn on a free local port, with lifespan events"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    config = uvicorn.Config(app.asgi_app, lifespan='on', log_level='warning')
+    uvicorn_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uvicorn_server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not uvicorn_server.started:
+        assert time.monotonic() < deadline, 'uvicorn did not start'
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    uvicorn_server.should_exit = True
+    thread.join(10)
+    sock.close()
+
+
+class TestAsgiRouting:
+    def test_async_routes_skip_flask(self, monkeypatch):
+        """ASYNC_ROUTES are served on the loop, with Server-Timing added like Flask routes."""
+        async def handler(scope, receive, send):
+            await app.send_asgi_json(send, {'served_by': 'async'})
+
+        monkeypatch.setitem(app.ASYNC_ROUTES, ('GET', '/api/get_default_markets'), handler)
+        status, headers, body = call_asgi({'path': '/api/get_default_markets'})
+        assert status == 200 and b'async' in body
+        assert 'total;dur=' in headers['server-timing']
+
+    def test_profile_requests_take_the_flask_path(self, monkeypatch):
+        """?profile=1 on an async route goes through Flask, which checks the token."""
+        async def handler(scope, receive, send):
+            raise AssertionError('async handler used for a profiled request')
+
+        monkeypatch.setitem(app.ASYNC_ROUTES, ('GET', '/api/get_default_markets'), handler)
+        status, _, _ = call_asgi({'path': '/api/get_default_markets', 'query_string': b'profile=1'})
+        assert status == 403
+
+    def test_other_routes_reach_flask(self):
+        status, headers, body = call_asgi({'path': '/api/search_stocks', 'query_string': b'q=aapl'})
+        assert status == 200 and b'AAPL' in body
+        assert 'ETag' in headers or 'etag' in headers
+
+
+class TestAsgiServer:
+    def test_sequential_wsgi_requests(self, server):
+        """Many Flask-routed requests in a row all complete under uvicorn."""
+        with requests.Session() as session:
+            for i in range(60):
+                response = session.get(f"{server}/api/search_stocks", params={'q': SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}, timeout=10)
+                assert response.status_code == 200
+
+    def test_concurrent_wsgi_requests(self, server):
+        """Concurrent Flask-routed requests complete, and the loop keeps serving async routes."""
+        def search(i):
+            return requests.get(f"{server}/api/search_stocks", params={'q': SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}, timeout=10).status_code
+
+        with ThreadPoolExecutor(16) as pool:
+            assert set(pool.map(search, range(80))) == {200}
+        assert requests.get(f"{server}/api/analyze_sentiment", timeout=10).status_code == 400
@@ -0,0 +1,97 @@
+import asyncio
+
+import app
+from app import AsyncUpstreamClient, TTLCache
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+
+class TestAsyncCacheLoads:
+    def test_concurrent_misses_share_one_load(self):
+        """Concurrent get_or_load misses await one loader task and count as one miss."""
+        client = AsyncUpstreamClient()
+        cache = TTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def main():
+            return await asyncio.gather(*(client.get_or_load(cache, 'k', loader, 60) for _ in range(10)))
+
+        assert run(main()) == ['value'] * 10
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert (stats['misses'], stats['coalesced'], stats['hits']) == (1, 9, 0)
+        assert cache.peek('k') == 'value'
+
+    def test_caller_timeout_keeps_shared_load(self):
+        """A caller giving up at its deadline doesn't cancel the load other callers wait on."""
+        client = AsyncUpstreamClient()
+        cache = TTLCache()
+
+        async def loader():
+            await asyncio.sleep(0.1)
+            return 'value'
+
+        async def main():
+            impatient = asyncio.wait_for(client.get_or_load(cache, 'k', loader, 60), 0.01)
+            patient = client.get_or_load(cache, 'k', loader, 60)
+            return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+        impatient, patient = run(main())
+        assert isinstance(impatient, asyncio.TimeoutError)
+        assert patient == 'value'
+
+    def test_stale_copy_served_while_refreshing(self):
+        """get_or_revalidate returns a stale copy at once and refreshes it in the background."""
+        client = AsyncUpstreamClient()
+        cache = TTLCache(stale_ttl=60)
+        cache.set('k', 'old', 0)
+
+        async def loader():
+            return 'new'
+
+        async def main():
+            value, age = await client.get_or_revalidate(cache, 'k', loader, 60)
+            await asyncio.gather(*client._background)
+            return value, age
+
+        value, age = run(main())
+        assert value == 'old' and age is not None
+        assert cache.peek('k') == 'new'
+
+    def test_none_is_not_cached(self):
+        """A loader returning None is handed back but not stored."""
+        client = AsyncUpstreamClient()
+        cache = TTLCache()
+
+        async def loader():
+            return None
+
+        assert run(client.get_or_load(cache, 'k', loader, 60)) is None
+        assert cache.stats()['entries'] == 0
+
+
+class TestAsyncAnalysis:
+    def test_matches_sync_sections(self, monkeypatch):
+        """analyze_stock_async yields the same sections as analyze_stock for the same data."""
+        stock_data = {
+            'chart_data': {'date': [1700000000000], 'price': [100.0], 'volume': [1]},
+            'current_price': 100.0, 'price_change': 0.0, 'price_change_percent': 0.0,
+            'data_timestamp': '2024-01-01T00:00:00', 'data_source': 'Yahoo Finance (Real-time)'
+        }
+
+        async def news_async(symbol, company_name):
+            return []
+
+        monkeypatch.setattr(app, 'get_stock_news_items', lambda symbol, company_name: [])
+        monkeypatch.setattr(app, 'get_stock_news_items_async', news_async)
+        sections = ('news', 'prices', 'keywords')
+        result = run(app.analyze_stock_async('AAPL', sections, stock_data))
+        assert result == app.analyze_stock('AAPL', sections, stock_data)
+        assert result['current_price'] == 100.0 and result['degraded'] is False
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import app
+
+
+def ohlcv_stock_data(symbol):
+    """Full chart data as the single-symbol chart fetch returns it"""
+    return {
+        'chart_data': {
+            'date': [1700000000000, 1700086400000],
+            'open': [99.0, 100.5],
+            'high': [101.0, 102.0],
+            'low': [98.5, 100.0],
+            'price': [100.0, 101.5],
+            'volume': [120000, 98000]
+        },
+        'current_price': 101.5,
+        'price_change': 1.5,
+        'price_change_percent': 1.5,
+        'data_timestamp': datetime.now().isoformat(),
+        'data_source': f"Yahoo Finance (Real-time) {symbol}"
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'get_real_stock_data', ohlcv_stock_data)
+    return app.app.test_client()
+
+
+def post_batch(client, **body):
+    response = client.post('/api/analyze_sentiment_batch', json=body)
+    assert response.status_code == 200
+    return {result['symbol']: result for result in map(json.loads, response.get_data(as_text=True).splitlines())}
+
+
+class TestAnalyzeSentimentBatch:
+    def test_prices_match_single_symbol(self, client):
+        """Batch chart_data carries the same OHLCV columns as /api/analyze_sentiment."""
+        results = post_batch(client, symbols=['AAPL', 'MSFT'], sections=['prices'])
+        assert set(results) == {'AAPL', 'MSFT'}
+        for symbol, result in results.items():
+            single = app.format_chart_series(app.analyze_stock(symbol, ('prices',)), False)
+            assert result['chart_data'] == single['chart_data']
+            assert set(result['chart_data'][0]) == {'date', 'open', 'high', 'low', 'price', 'volume'}
+            assert result['data_source'] == single['data_source']
+
+    def test_no_spark_lookup(self, client, monkeypatch):
+        """Batch prices don't go through the spark bulk layer."""
+        def fail(*args, **kwargs):
+            raise AssertionError('spark lookup')
+        monkeypatch.setattr(app, 'get_bulk_stock_data', fail)
+        assert set(post_batch(client, symbols=['AAPL', 'AAPL', ' '], sections=['prices'])) == {'AAPL'}
+
+    def test_rejects_unknown_section(self, client):
+        """Sections outside ANALYZE_SECTIONS are a 400."""
+        response = client.post('/api/analyze_sentiment_batch', json={'symbols': ['AAPL'], 'sections': ['bogus']})
+        assert response.status_code == 400
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+from urllib.parse import quote
+
+import pytest
+import requests
+
+# The benchmark scripts import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'benchmarks'))
+
+import bench_service  # noqa: E402
+import yahoo_stub  # noqa: E402
+
+DAY = yahoo_stub.DAY_SECONDS
+
+
+def write_fixture(fixtures, kind, name, payload):
+    os.makedirs(os.path.join(fixtures, kind), exist_ok=True)
+    with open(yahoo_stub.fixture_path(fixtures, kind, name, '.json'), 'w') as f:
+        json.dump(payload, f)
+
+
+@pytest.fixture
+def stub(request):
+    """Running stub server and its base URL; parametrize indirectly with serve_in_thread kwargs"""
+    server, base_url = yahoo_stub.serve_in_thread(**getattr(request, 'param', {}))
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+class TestYahooStub:
+    def test_bars_agree_across_ranges(self):
+        """A day's bar is the same whichever range or period1 it was asked for with."""
+        month = yahoo_stub.chart_payload('AAPL', '30d')['chart']['result'][0]
+        year = yahoo_stub.chart_payload('AAPL', '1y')['chart']['result'][0]
+        since = yahoo_stub.chart_payload('AAPL', period1=month['timestamp'][-5])['chart']['result'][0]
+        assert year['timestamp'][-30:] == month['timestamp']
+        assert year['indicators']['quote'][0]['close'][-30:] == month['indicators']['quote'][0]['close']
+        assert since['timestamp'] == month['timestamp'][-5:]
+
+    def test_slice_chart(self):
+        """slice_chart keeps the bars from period1 to period2 in every column."""
+        recorded = json.dumps(yahoo_stub.chart_payload('AAPL', '30d'))
+        timestamps = json.loads(recorded)['chart']['result'][0]['timestamp']
+        result = yahoo_stub.slice_chart(recorded, timestamps[10], timestamps[19])['chart']['result'][0]
+        assert result['timestamp'] == timestamps[10:20]
+        assert all(len(values) == 10 for values in result['indicators']['quote'][0].values())
+        assert yahoo_stub.slice_chart(recorded, timestamps[-1] + DAY)['chart']['result'][0]['timestamp'] == []
+
+    def test_fixture_names_are_quoted(self, tmp_path):
+        """Fixture files are named by symbol, interval and range, URL-quoted."""
+        name = yahoo_stub.chart_fixture_name('^NSEI', '1y', '1d')
+        assert name == '^NSEI@1d@1y'
+        assert yahoo_stub.fixture_path(str(tmp_path), 'chart', name, '.json').endswith(quote(name, safe='') + '.json')
+
+    def test_replays_fixtures(self, tmp_path):
+        """Recorded charts answer only their own range; period1 requests are cut from the longest daily one."""
+        fixtures = str(tmp_path)
+        recorded = yahoo_stub.chart_payload('AAPL', '1y')
+        recorded['chart']['result'][0]['meta']['recorded'] = True
+        write_fixture(fixtures, 'chart', yahoo_stub.chart_fixture_name('AAPL', '1y', '1d'), recorded)
+        write_fixture(fixtures, 'spark', yahoo_stub.spark_fixture_name('MSFT', '10d'), {'symbol': 'MSFT', 'recorded': True})
+        server, base_url = yahoo_stub.serve_in_thread(fixtures=fixtures)
+        try:
+            chart = base_url + '/v8/finance/chart/AAPL'
+            assert requests.get(chart, params={'range': '1y'}).json() == recorded
+            assert 'recorded' not in requests.get(chart, params={'range': '30d'}).json()['chart']['result'][0]['meta']
+            period1 = recorded['chart']['result'][0]['timestamp'][-3]
+            sliced = requests.get(chart, params={'period1': period1}).json()['chart']['result'][0]
+            assert sliced['meta']['recorded'] is True and len(sliced['timestamp']) == 3
+            spark = requests.get(base_url + '/v7/finance/spark', params={'symbols': 'AAPL,MSFT'}).json()['spark']['result']
+            assert [entry.get('recorded') for entry in spark] == [None, True]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @pytest.mark.parametrize('stub', [{'error_rate': 1.0}], indirect=True)
+    def test_injected_errors(self, stub):
+        """With error_rate 1 every request is answered with a 503."""
+        assert requests.get(stub + '/v1/finance/search', params={'q': 'AAPL'}).status_code == 503
+
+
+class TestBenchService:
+    def test_parse_server_timing(self):
+        """Stage durations are read from dur= parameters; entries without one are skipped."""
+        header = 'stock_fetch;dur=12.5, news_fetch;desc="news";dur=3, total'
+        assert bench_service.parse_server_timing(header) == {'stock_fetch': 12.5, 'news_fetch': 3.0}
+        assert bench_service.parse_server_timing(None) == {}
+
+    def test_run_level(self, stub):
+        """A level reports one status count per request."""
+        level = bench_service.run_level(stub, 'search', 2, 6, 30)
+        assert level['requests'] == 6 and sum(level['status'].values()) == 6
+
+    @pytest.mark.parametrize('stub', [{'delay': 1.0}], indirect=True)
+    def test_level_timeout(self, stub, monkeypatch):
+        """A level whose requests stall raises LevelTimeout instead of hanging the run."""
+        monkeypatch.setattr(bench_service, 'PROGRESS_INTERVAL', 0.1)
+        with pytest.raises(bench_service.LevelTimeout):
+            bench_service.run_level(stub, 'search', 1, 5, 0.3)
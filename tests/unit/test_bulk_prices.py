@@ -0,0 +1,82 @@
+import pytest
+
+import app
+from app import TTLCache
+
+DAY = 86400
+
+
+def spark_entry(yahoo_symbol, closes):
+    """One spark result as Yahoo returns it: closes only"""
+    return {
+        'symbol': yahoo_symbol,
+        'response': [{
+            'meta': {'symbol': yahoo_symbol},
+            'timestamp': [1700000000 + i * DAY for i in range(len(closes))],
+            'indicators': {'quote': [{'close': closes}]}
+        }]
+    }
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    monkeypatch.setattr(app, 'stock_data_cache', TTLCache(stale_ttl=3600))
+    monkeypatch.setattr(app, 'bulk_price_cache', TTLCache(stale_ttl=3600))
+
+
+@pytest.fixture
+def spark(caches, monkeypatch):
+    """fetch_yahoo_spark answered from canned closes; records the symbols of each call"""
+    calls = []
+    closes = {'AAPL': [100.0, 102.0], 'MSFT': [300.0, 297.0], 'TCS.NS': [3500.0, 3535.0]}
+
+    def fetch_yahoo_spark(yahoo_symbols, range_):
+        calls.append(list(yahoo_symbols))
+        return app.parse_yahoo_spark({'spark': {'result': [spark_entry(s, closes[s]) for s in yahoo_symbols if s in closes]}}, yahoo_symbols)
+
+    monkeypatch.setattr(app, 'fetch_yahoo_spark', fetch_yahoo_spark)
+    return calls
+
+
+class TestParseYahooSpark:
+    def test_closes_only(self):
+        """Spark results become stock data with closes, no OHLC, and the day's change."""
+        results = app.parse_yahoo_spark({'spark': {'result': [spark_entry('AAPL', [100.0, 102.0])]}}, ['AAPL'])
+        stock_data = results['AAPL']
+        assert stock_data['chart_data']['price'] == [100.0, 102.0]
+        assert 'open' not in stock_data['chart_data']
+        assert (stock_data['current_price'], stock_data['price_change'], stock_data['price_change_percent']) == (102.0, 2.0, 2.0)
+
+    def test_ignores_unrequested_and_empty(self):
+        """Symbols not asked for, or without a response, are left out."""
+        data = {'spark': {'result': [spark_entry('AAPL', [1.0]), {'symbol': 'MSFT', 'response': []}]}}
+        assert app.parse_yahoo_spark(data, ['MSFT']) == {}
+        assert app.parse_yahoo_spark({}, ['AAPL']) == {}
+
+
+class TestGetBulkStockData:
+    def test_one_fetch_for_all_misses(self, spark):
+        """Missing symbols are fetched together once, then served from bulk_price_cache."""
+        results = app.get_bulk_stock_data(['AAPL', 'MSFT', 'TCS'])
+        assert results['TCS']['current_price'] == 3535.0
+        assert spark == [['AAPL', 'MSFT', 'TCS.NS']]
+        assert app.get_bulk_stock_data(['AAPL', 'MSFT'])['MSFT']['current_price'] == 297.0
+        assert len(spark) == 1
+
+    def test_cached_chart_answers(self, spark):
+        """A full chart already in stock_data_cache is used instead of a spark fetch."""
+        app.stock_data_cache.set('AAPL', {'chart_data': {'date': [1], 'price': [5.0]}, 'current_price': 5.0}, 60)
+        assert app.get_bulk_stock_data(['AAPL'])['AAPL']['current_price'] == 5.0
+        assert spark == []
+
+    def test_failed_symbol_falls_back(self, spark):
+        """A symbol the fetch didn't return gets its last known entry, or else simulated prices."""
+        app.bulk_price_cache.set(app.get_bulk_cache_key('quote', 'GOOGL'), {'chart_data': {'date': [1], 'price': [9.0]}, 'current_price': 9.0}, 0)
+        results = app.get_bulk_stock_data(['GOOGL', 'AMZN'])
+        assert results['GOOGL']['current_price'] == 9.0 and 'data_age_seconds' in results['GOOGL']
+        assert results['AMZN']['data_source'] == app.SIMULATED_DATA_SOURCE
+
+    def test_unknown_mode(self):
+        """Only the modes in BULK_PRICE_RANGES are accepted."""
+        with pytest.raises(ValueError):
+            app.get_bulk_stock_data(['AAPL'], mode='history')
@@ -0,0 +1,82 @@
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import app
+from app import chart_columns_to_rows, format_chart_series, wants_columnar
+
+CHART = {
+    'date': [1700000000000, 1700086400000, 1700172800000],
+    'price': [100.0, 101.5, 99.0],
+    'volume': [1000, 1200, 900],
+    'open': [99.0, None, 100.0],
+    'high': [101.0, 102.0, 100.5],
+    'low': [98.5, 100.0, 98.0]
+}
+
+
+@pytest.fixture
+def chart(monkeypatch):
+    stock_data = {
+        'chart_data': CHART, 'current_price': 99.0, 'price_change': -2.5, 'price_change_percent': -2.46,
+        'data_timestamp': datetime.now().isoformat(), 'data_source': 'Yahoo Finance (Real-time)'
+    }
+    monkeypatch.setattr(app, 'get_real_stock_data', lambda symbol, range_='30d', interval='1d': dict(stock_data))
+
+
+class TestColumnarFormat:
+    def test_negotiation(self):
+        """Columns are sent for ?format=columnar or the columnar media type in Accept."""
+        assert wants_columnar('columnar', None)
+        assert wants_columnar(None, f"{app.COLUMNAR_MEDIA_TYPE}, application/json")
+        assert not wants_columnar(None, 'application/json') and not wants_columnar('rows', '')
+
+    def test_rows_match_columns(self):
+        """The default format has one object per point, with OHLC only where the bar has all three."""
+        rows = chart_columns_to_rows(CHART)
+        assert [row['price'] for row in rows] == CHART['price']
+        assert rows[0] == {'date': CHART['date'][0], 'price': 100.0, 'volume': 1000, 'open': 99.0, 'high': 101.0, 'low': 98.5}
+        assert 'open' not in rows[1]
+
+    def test_format_chart_series(self):
+        """Chart and sentiment series are converted to rows unless columnar; other fields are untouched."""
+        fields = {'chart_data': CHART, 'sentiment_data': {'date': ['2024-01-01'], 'sentiment': [0.3]}, 'symbol': 'AAPL'}
+        assert format_chart_series(fields, True) is fields
+        rows = format_chart_series(fields, False)
+        assert rows['sentiment_data'] == [{'date': '2024-01-01', 'sentiment': 0.3}]
+        assert rows['symbol'] == 'AAPL' and fields['chart_data'] is CHART
+        assert format_chart_series({'symbol': 'AAPL'}, False) == {'symbol': 'AAPL'}
+
+    def test_price_history_formats(self, chart):
+        """/api/price_history sends the same points in either format and varies on Accept."""
+        client = app.app.test_client()
+        rows = client.get('/api/price_history?symbol=AAPL&range=30d')
+        columns = client.get('/api/price_history?symbol=AAPL&range=30d', headers={'Accept': app.COLUMNAR_MEDIA_TYPE})
+        assert columns.get_json()['chart_data'] == CHART
+        assert rows.get_json()['chart_data'] == chart_columns_to_rows(CHART)
+        assert 'Accept' in rows.headers['Vary']
+
+
+class TestOrjsonProvider:
+    def test_round_trip(self):
+        """dumps/loads round-trip plain JSON compactly, in dict order."""
+        payload = {'b': [1, 2.5, None], 'a': {'nested': 'é'}}
+        text = app.app.json.dumps(payload)
+        assert text == '{"b":[1,2.5,null],"a":{"nested":"é"}}'
+        assert app.app.json.loads(text) == payload
+
+    def test_extra_types(self):
+        """numpy values and non-string keys are serialized natively; other types go through default."""
+        text = app.app.json.dumps({1: np.float64(1.5), 'array': np.array([1, 2]), 'price': Decimal('101.25')})
+        assert app.app.json.loads(text) == {'1': 1.5, 'array': [1, 2], 'price': '101.25'}
+        with pytest.raises(TypeError):
+            app.app.json.dumps({'items': {1, 2}})
+
+    def test_response(self):
+        """jsonify responses are orjson bytes with a trailing newline."""
+        with app.app.app_context():
+            response = app.jsonify({'ok': True})
+        assert response.get_data() == b'{"ok":true}\n'
+        assert response.mimetype == 'application/json'
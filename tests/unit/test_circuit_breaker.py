@@ -0,0 +1,119 @@
+import pytest
+
+import app
+from app import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_WINDOW', 10)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_MIN_CALLS', 4)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_ERROR_RATE', 0.5)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_SLOW_CALL_SECONDS', 1.0)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_SLOW_CALL_RATE', 0.8)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_OPEN_SECONDS', 30)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_HALF_OPEN_PROBES', 1)
+
+
+def record_calls(breaker, outcomes, elapsed=0.01):
+    for failed in outcomes:
+        breaker.record(breaker.acquire(), failed, elapsed)
+
+
+def open_breaker(monkeypatch, breaker):
+    """Trip breaker, then let its open period run out"""
+    record_calls(breaker, [True] * 4)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_OPEN_SECONDS', 0)
+
+
+class TestCircuitBreaker:
+    def test_stays_closed_below_min_calls(self):
+        """Failures are not judged until the window has min_calls outcomes."""
+        breaker = CircuitBreaker('example.com')
+        record_calls(breaker, [True] * 3)
+        assert breaker.state == 'closed'
+
+    def test_opens_on_error_rate(self):
+        """Reaching the error rate opens the breaker and further calls are rejected."""
+        breaker = CircuitBreaker('example.com')
+        record_calls(breaker, [False, True, False, True])
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+        stats = breaker.stats()
+        assert (stats['rejected'], stats['times_opened'], stats['failures']) == (1, 1, 2)
+
+    def test_stays_closed_below_error_rate(self):
+        """One failure in six is below a 50% error rate."""
+        breaker = CircuitBreaker('example.com')
+        record_calls(breaker, [False, False, True, False, False, False])
+        assert breaker.state == 'closed'
+
+    def test_opens_on_slow_calls(self):
+        """Successful but slow calls count against the slow call rate."""
+        breaker = CircuitBreaker('example.com')
+        record_calls(breaker, [False] * 4, elapsed=2.0)
+        assert breaker.state == 'open'
+        assert breaker.slow_calls == 4
+
+    def test_half_open_admits_limited_probes(self, monkeypatch):
+        """After the open period one probe goes through while others are rejected."""
+        breaker = CircuitBreaker('example.com')
+        open_breaker(monkeypatch, breaker)
+        assert breaker.acquire() is True
+        assert breaker.state == 'half_open'
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+
+    def test_successful_probe_closes(self, monkeypatch):
+        """A good probe closes the breaker with a fresh window."""
+        breaker = CircuitBreaker('example.com')
+        open_breaker(monkeypatch, breaker)
+        breaker.record(breaker.acquire(), False, 0.01)
+        assert breaker.state == 'closed'
+        assert breaker.stats()['window_calls'] == 0
+        assert breaker.acquire() is False
+
+    def test_failed_probe_reopens(self, monkeypatch):
+        """A failed probe opens the breaker for another full period."""
+        breaker = CircuitBreaker('example.com')
+        open_breaker(monkeypatch, breaker)
+        probe = breaker.acquire()
+        monkeypatch.setattr(app, 'CIRCUIT_BREAKER_OPEN_SECONDS', 30)
+        breaker.record(probe, True, 0.01)
+        assert breaker.state == 'open'
+        assert breaker.times_opened == 2
+
+    def test_released_probe_frees_its_slot(self, monkeypatch):
+        """A cancelled probe lets the next caller probe instead."""
+        breaker = CircuitBreaker('example.com')
+        open_breaker(monkeypatch, breaker)
+        breaker.release(breaker.acquire())
+        assert breaker.acquire() is True
+
+    def test_late_outcomes_do_not_reopen(self):
+        """Calls admitted before the breaker opened do not count once it is open."""
+        breaker = CircuitBreaker('example.com')
+        admitted = [breaker.acquire() for _ in range(6)]
+        for probe in admitted[:4]:
+            breaker.record(probe, True, 0.01)
+        for probe in admitted[4:]:
+            breaker.record(probe, True, 0.01)
+        assert breaker.times_opened == 1
+
+
+class TestCircuitBreakerSession:
+    def test_open_breaker_rejects_without_calling(self, monkeypatch):
+        """http_session raises CircuitOpenError for a host whose breaker is open."""
+        registry = CircuitBreakerRegistry(enabled=True)
+        monkeypatch.setattr(app, 'circuit_breakers', registry)
+        breaker = registry.get('127.0.0.1:9')
+        record_calls(breaker, [True] * 4)
+        with pytest.raises(CircuitOpenError):
+            app.http_session.get('http://127.0.0.1:9/v8/finance/chart/AAPL', timeout=1)
+        assert breaker.calls == 4
+        assert breaker.rejected == 1
+
+    def test_disabled_registry(self):
+        """With breakers disabled the session gets no breaker for any host."""
+        assert CircuitBreakerRegistry(enabled=False).get('example.com') is None
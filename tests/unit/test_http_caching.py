@@ -0,0 +1,172 @@
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+
+import app
+from app import TTLCache, build_cache_control, cacheable_json_response, etag_matches, get_body_etag, negotiate_content_encoding
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+class TestEtagMatches:
+    def test_weak_comparison(self):
+        """Weak and strong forms of the same tag match each other."""
+        assert etag_matches('W/"abc"', 'W/"abc"')
+        assert etag_matches('"abc"', 'W/"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+
+    def test_list_and_wildcard(self):
+        """Any tag in a list matches, and so does *."""
+        assert etag_matches('"x", W/"abc"', 'W/"abc"')
+        assert etag_matches('*', 'W/"abc"')
+
+    def test_no_match(self):
+        """A missing header or a different tag does not match."""
+        assert not etag_matches(None, 'W/"abc"')
+        assert not etag_matches('', 'W/"abc"')
+        assert not etag_matches('W/"abd"', 'W/"abc"')
+
+    def test_body_etag_is_weak_and_stable(self):
+        """The same body always gets the same weak tag."""
+        assert get_body_etag(b'{}') == get_body_etag(b'{}')
+        assert get_body_etag(b'{}').startswith('W/"')
+        assert get_body_etag(b'{}') != get_body_etag(b'[]')
+
+
+class TestCacheableJsonResponse:
+    def test_sets_etag_and_cache_control(self):
+        """A cacheable response gets a body ETag and the given Cache-Control."""
+        with app.app.test_request_context('/api/search_stocks'):
+            response = cacheable_json_response({'a': 1}, build_cache_control(60))
+        assert response.status_code == 200
+        assert response.headers['ETag'] == get_body_etag(response.get_data())
+        assert response.headers['Cache-Control'].startswith('public, max-age=60')
+
+    def test_not_modified_when_etag_matches(self):
+        """A matching If-None-Match gets an empty 304 with the same validators."""
+        with app.app.test_request_context('/api/search_stocks'):
+            etag = cacheable_json_response({'a': 1}, 'public, max-age=60').headers['ETag']
+        with app.app.test_request_context('/api/search_stocks', headers={'If-None-Match': etag}):
+            response = cacheable_json_response({'a': 1}, 'public, max-age=60')
+        assert response.status_code == 304
+        assert response.get_data() == b''
+        assert response.headers['ETag'] == etag
+        assert response.headers['Cache-Control'] == 'public, max-age=60'
+
+    def test_changed_payload_is_sent(self):
+        """A stale ETag gets the new body."""
+        with app.app.test_request_context('/api/search_stocks'):
+            etag = cacheable_json_response({'a': 1}, 'public, max-age=60').headers['ETag']
+        with app.app.test_request_context('/api/search_stocks', headers={'If-None-Match': etag}):
+            response = cacheable_json_response({'a': 2}, 'public, max-age=60')
+        assert response.status_code == 200
+
+    def test_post_is_never_not_modified(self):
+        """Only GET and HEAD are answered with a 304."""
+        with app.app.test_request_context('/api/search_stocks'):
+            etag = cacheable_json_response({'a': 1}, 'public, max-age=60').headers['ETag']
+        with app.app.test_request_context('/api/search_stocks', method='POST', headers={'If-None-Match': etag}):
+            assert cacheable_json_response({'a': 1}, 'public, max-age=60').status_code == 200
+
+    def test_no_store_skips_etag(self):
+        """A no-store response carries no validator to revalidate with."""
+        with app.app.test_request_context('/api/search_stocks', headers={'If-None-Match': '*'}):
+            response = cacheable_json_response({'a': 1}, 'no-store')
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert response.headers['Cache-Control'] == 'no-store'
+
+
+class TestApiResponses:
+    def test_search_revalidates(self, client):
+        """A repeated search with the returned ETag gets a 304."""
+        first = client.get('/api/search_stocks?q=aapl')
+        assert first.status_code == 200 and first.get_json()
+        second = client.get('/api/search_stocks?q=aapl', headers={'If-None-Match': first.headers['ETag']})
+        assert second.status_code == 304
+        assert second.headers['ETag'] == first.headers['ETag']
+
+    def test_large_response_is_compressed(self, client, monkeypatch):
+        """Bodies above COMPRESS_MIN_BYTES are gzipped for gzip-only clients, with the same ETag."""
+        monkeypatch.setattr(app, 'COMPRESS_MIN_BYTES', 1)
+        plain = client.get('/api/search_stocks?q=a')
+        compressed = client.get('/api/search_stocks?q=a', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in plain.headers
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in compressed.headers['Vary']
+        assert gzip.decompress(compressed.get_data()) == plain.get_data()
+        assert compressed.headers['ETag'] == plain.headers['ETag']
+
+
+def fetched_stock_data(seconds_ago):
+    return {
+        'chart_data': {'date': [1700000000000], 'price': [100.0]},
+        'data_timestamp': (datetime.now() - timedelta(seconds=seconds_ago)).isoformat(),
+        'data_source': 'Yahoo Finance (Real-time)'
+    }
+
+
+def max_age(cache_control):
+    return int(cache_control.split('max-age=')[1].split(',')[0])
+
+
+@pytest.fixture
+def cache_ttls(monkeypatch):
+    monkeypatch.setattr(app, 'get_stock_cache_ttl', lambda yahoo_symbol: 60)
+    monkeypatch.setattr(app, 'news_cache', TTLCache())
+    monkeypatch.setattr(app, 'NEWS_CACHE_TTL', 300)
+
+
+class TestMaxAge:
+    def test_ttl_cache_remaining(self):
+        """get_ttl reports time left on a live entry and None otherwise."""
+        cache = TTLCache()
+        cache.set('a', 1, 30)
+        cache.set('b', 1, 0)
+        assert 29 < cache.get_ttl('a') <= 30
+        assert cache.get_ttl('b') is None
+        assert cache.get_ttl('missing') is None
+
+    def test_stock_data_counts_down(self, cache_ttls):
+        """Prices fetched 40s into a 60s TTL are fresh for the remaining 20s."""
+        assert 19 <= app.get_stock_data_max_age('AAPL', fetched_stock_data(40)) <= 20
+        assert app.get_stock_data_max_age('AAPL', fetched_stock_data(90)) == 0
+
+    def test_stale_and_placeholder_prices(self, cache_ttls):
+        """Last-known-good prices get max-age 0 and simulated ones none at all."""
+        assert app.get_stock_data_max_age('AAPL', dict(fetched_stock_data(0), data_age_seconds=5)) == 0
+        assert app.get_stock_data_max_age('AAPL', dict(fetched_stock_data(0), data_source=app.SIMULATED_DATA_SOURCE)) is None
+
+    def test_analysis_uses_first_expiry(self, cache_ttls):
+        """An analysis is fresh until its news or its prices expire, whichever is first."""
+        app.news_cache.set('AAPL', [], 30)
+        result = dict(fetched_stock_data(10), news_items=[])
+        assert 29 <= max_age(app.get_analysis_cache_control('AAPL', result)) <= 30
+        app.news_cache.set('AAPL', [], 300)
+        assert 49 <= max_age(app.get_analysis_cache_control('AAPL', result)) <= 50
+
+    def test_analysis_without_cached_news(self, cache_ttls):
+        """With its news no longer cached, an analysis is only good for revalidation."""
+        result = dict(fetched_stock_data(0), news_items=[])
+        assert max_age(app.get_analysis_cache_control('AAPL', result)) == 0
+
+
+class TestNegotiateContentEncoding:
+    def test_prefers_brotli_on_tie(self):
+        """br wins when both codings are equally acceptable."""
+        assert negotiate_content_encoding('gzip, deflate, br') == 'br'
+
+    def test_respects_quality(self):
+        """q values rank the codings, and q=0 refuses one."""
+        assert negotiate_content_encoding('br;q=0.5, gzip') == 'gzip'
+        assert negotiate_content_encoding('br;q=0, gzip;q=0') is None
+        assert negotiate_content_encoding('*;q=0.1') == 'br'
+
+    def test_no_header(self):
+        """Without gzip or br in Accept-Encoding the body is sent as is."""
+        assert negotiate_content_encoding(None) is None
+        assert negotiate_content_encoding('identity') is None
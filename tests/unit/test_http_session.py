@@ -0,0 +1,87 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+from app import CircuitBreakerRegistry
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.append(self.client_address[1])
+            status = server.statuses.pop(0) if server.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    """Local HTTP server that answers with the queued statuses, then 200s, and records client ports"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.lock = threading.Lock()
+    server.hits = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join(5)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(app, 'HTTP_BACKOFF_FACTOR', 0)
+    monkeypatch.setattr(app, 'circuit_breakers', CircuitBreakerRegistry(enabled=False))
+    session = app.create_http_session()
+    yield session
+    session.close()
+
+
+class TestHttpSession:
+    def test_retries_server_errors(self, session, upstream):
+        """A 503 is retried and the caller only sees the final 200."""
+        upstream.statuses = [503]
+        response = session.get(f"http://127.0.0.1:{upstream.server_port}/v8/finance/chart/AAPL", timeout=5)
+        assert response.status_code == 200
+        assert len(upstream.hits) == 2
+
+    def test_gives_up_after_max_retries(self, session, upstream):
+        """After HTTP_MAX_RETRIES retries the last error response is returned."""
+        upstream.statuses = [500] * (app.HTTP_MAX_RETRIES + 1)
+        response = session.get(f"http://127.0.0.1:{upstream.server_port}/v8/finance/chart/AAPL", timeout=5)
+        assert response.status_code == 500
+        assert len(upstream.hits) == app.HTTP_MAX_RETRIES + 1
+
+    def test_reuses_connections(self, session, upstream):
+        """Sequential requests share one keep-alive connection."""
+        for _ in range(5):
+            assert session.get(f"http://127.0.0.1:{upstream.server_port}/", timeout=5).status_code == 200
+        assert len(set(upstream.hits)) == 1
+
+
+class TestDefaultMarkets:
+    def test_index_charts_fetched_concurrently(self, monkeypatch):
+        """get_market_charts fetches every index of a market at the same time."""
+        markets = app.DEFAULT_MARKETS['US']
+        barrier = threading.Barrier(len(markets), timeout=5)
+
+        def get_real_stock_data(symbol, range_, interval):
+            barrier.wait()
+            return {'chart_data': {'date': [1, 2], 'price': [1.0, 2.0]}, 'data_timestamp': symbol}
+
+        monkeypatch.setattr(app, 'get_real_stock_data', get_real_stock_data)
+        charts = app.get_market_charts(markets, '30d', '1d', 10)
+        assert set(charts) == {market['symbol'] for market in markets}
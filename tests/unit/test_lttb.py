@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app import downsample_chart_columns, downsample_stock_data, lttb_indices
+
+
+def reference_lttb(x, y, threshold):
+    """Textbook Largest-Triangle-Three-Buckets, one point at a time"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        average_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        average_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[a] - average_x) * (y[j] - y[a]) - (x[a] - x[j]) * (average_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+class TestLttbIndices:
+    @pytest.mark.parametrize('threshold', [0, 2, 10, 11])
+    def test_small_series_kept_whole(self, threshold):
+        """Nothing is dropped when the series already fits, or the threshold is too small to use."""
+        assert lttb_indices(list(range(10)), [0] * 10, threshold).tolist() == list(range(10))
+
+    @pytest.mark.parametrize('n, threshold', [(11, 3), (100, 10), (1000, 37), (5000, 500)])
+    def test_matches_reference(self, n, threshold):
+        """The vectorized version picks the same points as the textbook algorithm."""
+        rng = np.random.default_rng(n)
+        x = np.cumsum(rng.uniform(1, 3, n)).tolist()
+        y = np.cumsum(rng.normal(0, 1, n)).tolist()
+        assert lttb_indices(x, y, threshold).tolist() == reference_lttb(x, y, threshold)
+
+    def test_keeps_endpoints_and_order(self):
+        """Exactly threshold indices, strictly increasing, from the first point to the last."""
+        y = np.sin(np.linspace(0, 20, 2000))
+        kept = lttb_indices(np.arange(2000), y, 150)
+        assert len(kept) == 150
+        assert kept[0] == 0 and kept[-1] == 1999
+        assert np.all(np.diff(kept) > 0)
+
+    def test_keeps_isolated_spike(self):
+        """A one-point spike in a flat series survives downsampling."""
+        y = [1.0] * 1000
+        y[613] = 50.0
+        assert 613 in lttb_indices(list(range(1000)), y, 20).tolist()
+
+
+class TestDownsampleChartColumns:
+    def test_columns_follow_kept_points(self):
+        """Every column is cut to the bars LTTB kept on (date, price)."""
+        columns = {
+            'date': list(range(0, 500000, 1000)),
+            'price': [float(i % 17) for i in range(500)],
+            'volume': list(range(500))
+        }
+        reduced = downsample_chart_columns(columns, 50)
+        assert len(reduced['date']) == len(reduced['price']) == len(reduced['volume']) == 50
+        for date, price, volume in zip(reduced['date'], reduced['price'], reduced['volume']):
+            assert columns['price'][volume] == price and columns['date'][volume] == date
+
+
+class TestDownsampleStockData:
+    def test_short_series_untouched(self):
+        """A chart that already fits is returned as is, without source_points."""
+        stock_data = {'chart_data': {'date': [1, 2, 3], 'price': [1.0, 2.0, 3.0]}, 'data_timestamp': 't1'}
+        assert downsample_stock_data(stock_data, 'TEST.SHORT', '1y', '1d', 10) is stock_data
+
+    def test_reports_source_points_and_memoizes(self):
+        """A long chart is reduced once per source timestamp and reports its full length."""
+        columns = {'date': list(range(400)), 'price': [float(i % 9) for i in range(400)]}
+        stock_data = {'chart_data': columns, 'data_timestamp': 't1'}
+        first = downsample_stock_data(stock_data, 'TEST.LONG', '1y', '1d', 40)
+        second = downsample_stock_data(stock_data, 'TEST.LONG', '1y', '1d', 40)
+        assert first['source_points'] == 400
+        assert len(first['chart_data']['date']) == 40
+        assert second['chart_data'] is first['chart_data']
+        assert stock_data['chart_data'] is columns
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import app
+from app import CircuitBreakerRegistry
+
+UPSTREAM_HOST = '127.0.0.1:9'
+
+
+def scrape():
+    """/metrics as {sample name with labels: value}"""
+    response = app.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def rejected_sample(market):
+    return f'stock_sentiment_upstream_requests_total{{host="{UPSTREAM_HOST}",market="{market}",outcome="rejected"}}'
+
+
+@pytest.fixture
+def open_breaker(monkeypatch):
+    """Every request to the stub host is rejected by its open breaker, without any I/O"""
+    registry = CircuitBreakerRegistry(enabled=True)
+    monkeypatch.setattr(app, 'circuit_breakers', registry)
+    monkeypatch.setattr(app, 'CIRCUIT_BREAKER_MIN_CALLS', 1)
+    breaker = registry.get(UPSTREAM_HOST)
+    breaker.record(breaker.acquire(), True, 0.01)
+    assert breaker.state == 'open'
+    return breaker
+
+
+class TestMetricLabels:
+    def test_label_names(self):
+        """Each labelled family renders the label names it was declared with."""
+        assert app.UPSTREAM_REQUESTS.label_names == ('host', 'market', 'outcome')
+        assert app.UPSTREAM_SECONDS.label_names == ('host', 'market')
+        assert app.FALLBACKS.label_names == ('kind', 'market')
+        assert app.DEADLINE_MISSES.label_names == ('source', 'market')
+
+    def test_histogram_samples_carry_labels(self):
+        """Histogram buckets add le to the family's labels; sum and count don't."""
+        histogram = app.Histogram('example_seconds', 'Example', ('host', 'market'), buckets=(0.1, 1))
+        histogram.observe(0.5, ('example.com', 'US'))
+        assert histogram.render()[2:] == [
+            'example_seconds_bucket{host="example.com",market="US",le="0.1"} 0',
+            'example_seconds_bucket{host="example.com",market="US",le="1"} 1',
+            'example_seconds_bucket{host="example.com",market="US",le="+Inf"} 1',
+            'example_seconds_sum{host="example.com",market="US"} 0.5',
+            'example_seconds_count{host="example.com",market="US"} 1'
+        ]
+
+
+class TestUpstreamMarketLabel:
+    def test_chart_fetch_labels_market(self, open_breaker):
+        """A chart fetch for an NSE symbol is counted under market IN."""
+        before = scrape().get(rejected_sample('IN'), 0)
+        assert app.fetch_yahoo_chart('RELIANCE.NS') is None
+        assert scrape()[rejected_sample('IN')] == before + 1
+
+    def test_news_fetch_labels_market(self, open_breaker):
+        """A news search for one of our US symbols, and its news page fallback, count under market US."""
+        before = scrape().get(rejected_sample('US'), 0)
+        app.get_real_news_from_yahoo('AAPL', 'Apple Inc.')
+        assert scrape()[rejected_sample('US')] == before + 2
+
+    def test_async_fetch_labels_market(self, monkeypatch, open_breaker):
+        """AsyncUpstreamClient labels its requests the same way as the sync session."""
+        monkeypatch.setattr(app, 'async_upstream', app.AsyncUpstreamClient())
+
+        async def fetch():
+            try:
+                return await app.fetch_yahoo_chart_async('TCS.NS')
+            finally:
+                await app.async_upstream.close()
+
+        before = scrape().get(rejected_sample('IN'), 0)
+        assert asyncio.run(fetch()) is None
+        assert scrape()[rejected_sample('IN')] == before + 1
+
+    def test_unlabelled_request_is_unknown(self, open_breaker):
+        """Requests made without a market fall under unknown."""
+        before = scrape().get(rejected_sample('unknown'), 0)
+        with pytest.raises(app.CircuitOpenError):
+            app.http_session.get(f'http://{UPSTREAM_HOST}/v1/finance/search', timeout=1)
+        assert scrape()[rejected_sample('unknown')] == before + 1
+
+    def test_spark_chunks_hold_one_market(self, monkeypatch):
+        """Spark batches are split by market before chunking."""
+        monkeypatch.setattr(app, 'SPARK_BATCH_SIZE', 2)
+        chunks = app.get_spark_chunks(['AAPL', 'TCS.NS', 'MSFT', 'INFY.NS', 'GOOGL'])
+        assert chunks == [('US', ['AAPL', 'MSFT']), ('US', ['GOOGL']), ('IN', ['TCS.NS', 'INFY.NS'])]
@@ -0,0 +1,140 @@
+import sqlite3
+import time
+
+import pytest
+
+import app
+from app import SQLiteNewsArchive
+
+NOW = int(time.time())
+
+
+def news_item(i, hours_ago=1, **fields):
+    return dict({
+        'title': f"Acme headline number {i} about quarterly results",
+        'summary': f"Summary {i}",
+        'link': f"https://example.com/{i}",
+        'publisher': 'Wire',
+        'published': NOW - hours_ago * 3600 - i,
+        'sentiment': 'Positive',
+        'confidence': 0.75
+    }, **fields)
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = SQLiteNewsArchive(str(tmp_path / 'news.db'))
+    monkeypatch.setattr(app, 'news_archive', archive)
+    return archive
+
+
+class TestFallbackTag:
+    def test_round_trip(self, archive):
+        """is_fallback is stored and read back only on the items that had it."""
+        archive.add('ACME', [('a', news_item(1)), ('b', news_item(2, is_fallback=True))], ['a', 'b'])
+        items = archive.get_window('ACME', NOW - 86400)
+        assert [item.get('is_fallback') for item in items] == [None, True]
+        assert [item.get('is_fallback') for item in archive.get_day(items[1]['published'] // 86400)].count(True) == 1
+
+    def test_old_archive_gains_column(self, tmp_path):
+        """An archive created before the column existed reads its items as not fallback."""
+        path = str(tmp_path / 'old.db')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE news_items (item_id TEXT PRIMARY KEY, title TEXT NOT NULL, summary TEXT NOT NULL, link TEXT, '
+            'publisher TEXT, published INTEGER NOT NULL, day INTEGER NOT NULL, sentiment TEXT NOT NULL, '
+            'confidence REAL NOT NULL, ingested_at REAL NOT NULL)'
+        )
+        connection.execute(
+            'CREATE TABLE news_symbols (symbol TEXT NOT NULL, published INTEGER NOT NULL, item_id TEXT NOT NULL, '
+            'PRIMARY KEY (symbol, published, item_id)) WITHOUT ROWID'
+        )
+        connection.execute("INSERT INTO news_items VALUES ('a', 'Old', '', NULL, 'Wire', ?, ?, 'Neutral', 0.5, ?)", (NOW, NOW // 86400, NOW))
+        connection.execute("INSERT INTO news_symbols VALUES ('ACME', ?, 'a')", (NOW,))
+        connection.commit()
+        connection.close()
+
+        archive = SQLiteNewsArchive(path)
+        assert [item['title'] for item in archive.get_window('ACME', NOW - 60)] == ['Old']
+        assert 'is_fallback' not in archive.get_window('ACME', NOW - 60)[0]
+        assert archive.errors == 0
+
+    def test_archived_fallback_news_is_not_cached(self, archive, monkeypatch):
+        """An analysis showing archived fallback headlines gets no-store, like one built from news_cache."""
+        monkeypatch.setattr(app, 'add_generic_news', lambda news_items, symbol, company_name: None)
+        archive.add('ACME', [('a', news_item(1)), ('b', news_item(2, is_fallback=True))], ['a', 'b'])
+        result = {'data_timestamp': None, 'news_items': app.get_archived_news_items('ACME', 'Acme Corp')}
+        assert app.get_analysis_cache_control('ACME', result) == 'no-store'
+
+    def test_page_fallback_is_archived_as_fallback(self, archive, monkeypatch):
+        """Headlines ingested from the news page fallback are stored with the tag."""
+        monkeypatch.setattr(app, 'score_news_candidates', lambda candidates: [
+            dict(item, sentiment='Neutral', confidence=0.5) for _, _, item in candidates
+        ])
+        candidates = [(f"id{i}", item['title'], item) for i, item in enumerate([news_item(1), news_item(2)])]
+        app.archive_news_candidates('ACME', candidates[:1] + app.tag_fallback_candidates(candidates[1:]))
+        assert [item.get('is_fallback') for item in archive.get_window('ACME', NOW - 86400)] == [None, True]
+
+
+def candidate(item):
+    return (app.get_news_item_id(item), f"{item['title']} {item['summary']}", item)
+
+
+@pytest.fixture
+def scoring(monkeypatch):
+    """Counts the texts sent for scoring"""
+    scored = []
+
+    def score_news_candidates(candidates):
+        scored.extend(text for _, text, _ in candidates)
+        return [dict(item, sentiment='Positive', confidence=0.7) for _, _, item in candidates]
+
+    monkeypatch.setattr(app, 'score_news_candidates', score_news_candidates)
+    return scored
+
+
+class TestNewsArchive:
+    def test_round_trip(self, archive):
+        """Stored items are read back per symbol, newest first, and per UTC day."""
+        items = [news_item(i, hours_ago=i) for i in (1, 2, 3)]
+        archive.add('ACME', [(f"id{i}", item) for i, item in enumerate(items)], ['id0', 'id1', 'id2'])
+        window = archive.get_window('ACME', NOW - 86400)
+        assert [item['title'] for item in window] == [item['title'] for item in items]
+        assert window[0] == {key: items[0][key] for key in ('title', 'summary', 'link', 'publisher', 'published', 'sentiment', 'confidence')}
+        assert len(archive.get_window('ACME', NOW - 86400, limit=2)) == 2
+        assert archive.get_window('OTHER', 0) == []
+        assert items[0]['title'] in [item['title'] for item in archive.get_day(items[0]['published'] // 86400)]
+        assert archive.stats()['items_added'] == 3
+
+    def test_shared_item_keeps_publish_time(self, archive):
+        """An item linked to a second symbol is indexed under it at its original publish time."""
+        item = news_item(1)
+        archive.add('ACME', [('a', item)], ['a'])
+        archive.add('OTHER', [], ['a'])
+        assert archive.get_window('OTHER', NOW - 86400) == archive.get_window('ACME', NOW - 86400)
+        assert archive.get_known_clusters(['a', 'b']) == {'a': 'a'}
+
+    def test_last_ingested(self, archive):
+        """Every ingest records its time, even when nothing was new."""
+        assert archive.last_ingested('ACME') is None
+        archive.add('ACME', [], [])
+        assert archive.last_ingested('ACME') == pytest.approx(time.time(), abs=5)
+
+    def test_incremental_ingestion(self, archive, scoring):
+        """Only items the archive hasn't seen are scored and stored."""
+        first = [candidate(news_item(i)) for i in (1, 2)]
+        assert app.archive_news_candidates('ACME', first) == 2
+        assert len(scoring) == 2
+        second = first + [candidate(news_item(3, title='Acme opens a new plant in Texas'))]
+        assert app.archive_news_candidates('ACME', second) == 1
+        assert len(scoring) == 3
+        assert app.archive_news_candidates('ACME', second) == 0
+        assert len(archive.get_window('ACME', NOW - 86400)) == 3
+
+    def test_archived_items_served(self, archive, monkeypatch):
+        """With the archive on, a recent ingest is served from disk without fetching."""
+        monkeypatch.setattr(app, 'refresh_news_archive', lambda symbol, company_name: pytest.fail('fetched'))
+        monkeypatch.setattr(app, 'upstream_executor', None)
+        archive.add('ACME', [('a', news_item(1))], ['a'])
+        news_items = app.get_stock_news_items('ACME', 'Acme Corp')
+        assert news_items[0]['title'] == news_item(1)['title']
@@ -0,0 +1,130 @@
+import math
+
+import numpy as np
+import pytest
+
+import app
+from app import MinHashLSH, cluster_news_texts, collapse_news_items, get_news_cluster_weight, get_news_shingles
+
+PRIME = 4294967291
+STORY = 'Apple shares surge after record quarterly earnings beat analyst estimates on strong iPhone demand'
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+class TestNewsShingles:
+    def test_word_bigrams(self):
+        """Texts are shingled into lowercased word bigrams."""
+        assert get_news_shingles('Apple Beats, apple beats') == get_news_shingles('apple beats apple beats')
+        assert len(get_news_shingles('a b c d')) == 3
+
+    def test_single_word_and_empty(self):
+        """A one-word text is its own shingle; a text without words has none."""
+        assert len(get_news_shingles('Apple')) == 1
+        assert get_news_shingles('  ...  ') == set()
+
+
+class TestMinHashLSH:
+    def test_signatures_match_exact_arithmetic(self):
+        """Min-hashes equal (a*x + b) mod p in Python ints, so nothing overflowed."""
+        index = MinHashLSH(bands=4, rows=2)
+        shingle_sets = [{2 ** 32 - 1, 2 ** 31 + 7, 12345}, {1}, {PRIME, PRIME + 1}]
+        signatures = index.signatures(shingle_sets)
+        assert signatures.shape == (3, 8)
+        for shingles, signature in zip(shingle_sets, signatures.tolist()):
+            expected = [min((int(a) * (x % PRIME) + int(b)) % PRIME for x in shingles)
+                        for a, b in zip(index._a, index._b)]
+            assert signature == expected
+
+    def test_estimate_tracks_jaccard(self):
+        """The share of equal min-hashes estimates the Jaccard similarity."""
+        index = MinHashLSH(bands=32, rows=8)
+        base = set(range(1000, 1200))
+        similar = set(range(1050, 1250))
+        signatures = index.signatures([base, similar])
+        estimate = (signatures[0] == signatures[1]).mean()
+        assert estimate == pytest.approx(jaccard(base, similar), abs=0.1)
+
+    def test_query_finds_shared_bands_only(self):
+        """Identical sets share every band; disjoint ones share none."""
+        index = MinHashLSH()
+        band_keys = index.band_keys(index.signatures([set(range(100)), set(range(100)), set(range(500, 600))]))
+        index.insert('first', band_keys[0])
+        assert index.query(band_keys[1]) == ['first']
+        assert index.query(band_keys[2]) == []
+
+    def test_seeded(self):
+        """The same seed gives the same hash family, so clustering is repeatable."""
+        first, second = MinHashLSH(seed=3), MinHashLSH(seed=3)
+        assert np.array_equal(first.signatures([{1, 2, 3}]), second.signatures([{1, 2, 3}]))
+
+
+class TestClusterNewsTexts:
+    def test_syndicated_copies_collapse(self):
+        """Reworded copies of one story join the earliest; an unrelated story stays apart."""
+        texts = [
+            STORY,
+            'Oil prices slide as OPEC output rises',
+            STORY + ' - Reuters',
+            'Breaking: ' + STORY
+        ]
+        assert cluster_news_texts(texts) == [[0, 2, 3], [1]]
+
+    @pytest.fixture
+    def reworded_texts(self):
+        """300 copies of 40 random stories, each with up to five words replaced"""
+        rng = np.random.default_rng(7)
+        vocabulary = [f"word{i}" for i in range(300)]
+        stories = [' '.join(rng.choice(vocabulary, 20)) for _ in range(40)]
+        texts = []
+        for _ in range(300):
+            words = stories[rng.integers(len(stories))].split()
+            for position in rng.integers(len(words), size=rng.integers(0, 6)):
+                words[position] = str(rng.choice(vocabulary))
+            texts.append(' '.join(words))
+        return texts
+
+    def test_members_reach_threshold_with_leader(self, reworded_texts):
+        """Clusters partition the texts and every member is verified against its leader."""
+        clusters = cluster_news_texts(reworded_texts)
+        assert sorted(i for cluster in clusters for i in cluster) == list(range(len(reworded_texts)))
+        shingle_sets = [get_news_shingles(text) for text in reworded_texts]
+        for leader, *members in clusters:
+            assert leader < min(members, default=len(reworded_texts))
+            for member in members:
+                assert jaccard(shingle_sets[leader], shingle_sets[member]) >= app.NEWS_DUPLICATE_SIMILARITY
+
+    def test_close_copies_are_found(self, reworded_texts):
+        """LSH may miss pairs near the threshold, but no leader is a clear copy of an earlier one."""
+        shingle_sets = [get_news_shingles(text) for text in reworded_texts]
+        leaders = [cluster[0] for cluster in cluster_news_texts(reworded_texts)]
+        for position, leader in enumerate(leaders):
+            for earlier in leaders[:position]:
+                assert jaccard(shingle_sets[earlier], shingle_sets[leader]) < 0.8
+
+    def test_texts_without_words_stay_single(self):
+        """Texts with nothing to shingle are never merged."""
+        assert cluster_news_texts(['', '...', STORY, STORY]) == [[0], [1], [2, 3]]
+
+    def test_disabled(self, monkeypatch):
+        """With NEWS_DEDUP_ENABLED off every text is its own cluster."""
+        monkeypatch.setattr(app, 'NEWS_DEDUP_ENABLED', False)
+        assert cluster_news_texts([STORY, STORY]) == [[0], [1]]
+
+
+class TestCollapseNewsItems:
+    def test_keeps_first_item_with_cluster_size(self):
+        """Each story keeps its first item, carrying how many copies it stands for."""
+        items = [{'title': STORY, 'summary': '', 'link': f"https://example.com/{i}"} for i in range(3)]
+        items.append({'title': 'Oil prices slide as OPEC output rises', 'summary': '', 'link': 'https://example.com/oil'})
+        collapsed = collapse_news_items(items)
+        assert [item['link'] for item in collapsed] == ['https://example.com/0', 'https://example.com/oil']
+        assert collapsed[0]['cluster_size'] == 3
+        assert 'cluster_size' not in collapsed[1]
+
+    def test_cluster_weight_grows_logarithmically(self):
+        """A story weighs 1 + ln(copies)."""
+        assert get_news_cluster_weight({}) == 1
+        assert get_news_cluster_weight({'cluster_size': 8}) == pytest.approx(1 + math.log(8))
@@ -0,0 +1,50 @@
+import app
+
+
+def build_page(related_blocks):
+    """A Yahoo-like quote news page: navigation, three headlines, then related blocks with their own h3s"""
+    nav = ''.join(f'<li><a href="/nav/{i}">Section {i}</a></li>' for i in range(50))
+    headlines = ''.join(
+        f'<li><div><h3 class="Mb(5px)"><a href="/news/{i}"><u>{title}</u></a></h3><p>Teaser {i}</p></div></li>'
+        for i, title in enumerate(['TCS shares surge', 'Markets close flat', 'Tata Consultancy wins deal'])
+    )
+    related = ''.join(
+        f'<div class="related"><h3 class="Fz(s)">Related {i}</h3><p>{"lorem ipsum " * 20}</p></div>'
+        for i in range(related_blocks)
+    )
+    return f"<html><body><nav><ul>{nav}</ul></nav><main><ul>{headlines}</ul>{related}</main></body></html>".encode('utf-8')
+
+
+class TestNewsPage:
+    def test_candidates(self):
+        """Headlines about the stock are kept with their links, in page order."""
+        candidates = app.get_yahoo_news_page_candidates(build_page(5), 'TCS', 'Tata Consultancy Services')
+        assert [(item['title'], item['link']) for _, _, item in candidates] == [
+            ('TCS shares surge', '/news/0'),
+            ('Tata Consultancy wins deal', '/news/2')
+        ]
+
+    def test_headline_text_survives_until_next(self):
+        """A yielded headline keeps its text and link until the next one is requested."""
+        headlines = app.iter_yahoo_news_headlines(build_page(0))
+        first = next(headlines)
+        assert ''.join(first.itertext()) == 'TCS shares surge'
+        assert app.FIRST_LINK_XPATH(first) == ['/news/0']
+
+    def test_tree_stays_bounded(self, monkeypatch):
+        """Parsed markup before each h3 is dropped, so a long page doesn't accumulate in memory."""
+        sizes = []
+        original_iterparse = app.etree.iterparse
+
+        def iterparse(*args, **kwargs):
+            for event, element in original_iterparse(*args, **kwargs):
+                sizes.append(sum(1 for _ in element.getroottree().getroot().iter()))
+                yield event, element
+
+        page = build_page(2000)
+        page_elements = sum(1 for _ in app.etree.fromstring(page, app.etree.HTMLParser()).iter())
+        monkeypatch.setattr(app.etree, 'iterparse', iterparse)
+        assert len(list(app.iter_yahoo_news_headlines(page))) == 3
+        assert len(sizes) == 2003
+        # libxml2 parses a buffer ahead of the events, so the tree holds at most about that much
+        assert max(sizes) < page_elements / 10
@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+from app import PrefetchScheduler, RateBudget, TTLCache
+
+
+class TestRateBudget:
+    def test_burst_then_waits(self):
+        """The first burst calls go through at once; the next one waits for a token."""
+        budget = RateBudget(60, burst=3)
+        started = time.monotonic()
+        for _ in range(3):
+            assert budget.acquire()
+        assert time.monotonic() - started < 0.5
+        stop = threading.Event()
+        stop.set()
+        assert budget.acquire(stop) is False
+
+    def test_threads_share_tokens(self):
+        """Concurrent callers never take more than the burst between refills."""
+        budget = RateBudget(0.6, burst=5)  # one token per 100s
+        stop = threading.Event()
+        admitted = []
+
+        def take():
+            if budget.acquire(stop):
+                admitted.append(1)
+
+        with ThreadPoolExecutor(10) as executor:
+            futures = [executor.submit(take) for _ in range(10)]
+            time.sleep(0.3)
+            stop.set()
+            for future in futures:
+                future.result(5)
+        assert len(admitted) == 5
+
+    def test_file_shared_between_budgets(self, tmp_path):
+        """Budgets on the same path, as in separate worker processes, draw from one bucket."""
+        path = str(tmp_path / 'prefetch.budget')
+        first, second = RateBudget(0.6, burst=2, path=path), RateBudget(0.6, burst=2, path=path)
+        assert first.acquire() and second.acquire()
+        stop = threading.Event()
+        stop.set()
+        assert first.acquire(stop) is False
+        assert second.acquire(stop) is False
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    for name in ('stock_data_cache', 'news_cache', 'news_ingest_cache'):
+        monkeypatch.setattr(app, name, TTLCache())
+    monkeypatch.setattr(app, 'news_archive', None)
+
+
+class TestPrefetchScheduler:
+    def test_job_refreshes_caches(self, caches, monkeypatch):
+        """A stock job replaces the live chart and news entries the API reads."""
+        monkeypatch.setattr(app, 'load_stock_chart', lambda yahoo_symbol: {'chart': yahoo_symbol})
+        monkeypatch.setattr(app, 'get_real_news_from_yahoo', lambda symbol, company_name: [{'title': symbol}])
+        app.stock_data_cache.set('AAPL', {'chart': 'old'}, 60)
+        PrefetchScheduler(['AAPL'], {}, RateBudget(60))._run_job(('stock', 'AAPL'))
+        assert app.stock_data_cache.peek('AAPL') == {'chart': 'AAPL'}
+        assert app.news_cache.peek('AAPL') == [{'title': 'AAPL'}]
+
+    def test_job_joins_request_load(self, caches, monkeypatch):
+        """A job that runs while a request is loading the same chart reuses that load."""
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def load_stock_chart(yahoo_symbol):
+            loads.append(yahoo_symbol)
+            started.set()
+            release.wait(5)
+            return {'chart': yahoo_symbol}
+
+        monkeypatch.setattr(app, 'load_stock_chart', load_stock_chart)
+        monkeypatch.setattr(app, 'get_real_news_from_yahoo', lambda symbol, company_name: [])
+        scheduler = PrefetchScheduler(['AAPL'], {}, RateBudget(60))
+        with ThreadPoolExecutor(2) as executor:
+            request = executor.submit(app.stock_data_cache.get_or_load, 'AAPL', lambda: load_stock_chart('AAPL'), 60)
+            assert started.wait(5)
+            job = executor.submit(scheduler._run_job, ('stock', 'AAPL'))
+            time.sleep(0.05)
+            release.set()
+            request.result(5)
+            job.result(5)
+        assert loads == ['AAPL']
+
+    def test_start_once_per_process(self, monkeypatch):
+        """start_prefetch_scheduler starts the thread once in a process and stops it before a fork."""
+        scheduler = PrefetchScheduler([], {}, RateBudget(60))
+        monkeypatch.setattr(app, 'prefetch_scheduler', scheduler)
+        monkeypatch.setattr(app, 'prefetch_scheduler_pid', None)
+        app.start_prefetch_scheduler()
+        thread = scheduler._thread
+        app.start_prefetch_scheduler()
+        assert scheduler._thread is thread and thread.is_alive()
+        app.stop_prefetch_scheduler_before_fork()
+        assert not thread.is_alive()
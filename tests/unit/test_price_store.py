@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+import app
+from app import SQLitePriceStore
+
+DAY = 86400
+
+
+def daily_bars(first_day, last_day, close=10.0):
+    return [(day * DAY + 3600, close, close, close, close + day % 7, 1000) for day in range(first_day, last_day + 1)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SQLitePriceStore(str(tmp_path / 'prices.db'))
+    monkeypatch.setattr(app, 'price_store', store)
+    return store
+
+
+@pytest.fixture
+def today():
+    return int(time.time()) // DAY
+
+
+class TestSQLitePriceStore:
+    def test_unknown_symbol(self, store):
+        """A symbol that was never stored has no series and no bars."""
+        assert store.get_series('AAPL') is None
+        assert store.get_bars('AAPL', 0) == []
+
+    def test_add_bars_extends_series(self, store):
+        """covered_from only moves back and last_ts only moves forward."""
+        store.add_bars('AAPL', daily_bars(100, 109), 100 * DAY)
+        assert store.get_series('AAPL') == (100 * DAY, 109 * DAY + 3600)
+        store.add_bars('AAPL', daily_bars(109, 112), 105 * DAY)
+        assert store.get_series('AAPL') == (100 * DAY, 112 * DAY + 3600)
+        assert len(store.get_bars('AAPL', 0)) == 13
+
+    def test_later_bar_replaces_same_day(self, store):
+        """Refetching a day that was still forming overwrites its bar."""
+        store.add_bars('AAPL', [(100 * DAY + 3600, 1.0, 1.0, 1.0, 1.0, 10)], 100 * DAY)
+        store.add_bars('AAPL', [(100 * DAY + 7200, 1.0, 2.0, 1.0, 2.0, 20)], 100 * DAY)
+        assert store.get_bars('AAPL', 0) == [(100 * DAY + 7200, 1.0, 2.0, 1.0, 2.0, 20)]
+
+    def test_get_bars_from_day(self, store):
+        """get_bars starts at the UTC day of since_ts, oldest first."""
+        store.add_bars('AAPL', daily_bars(100, 109), 100 * DAY)
+        rows = store.get_bars('AAPL', 105 * DAY + 50000)
+        assert [row[0] // DAY for row in rows] == list(range(105, 110))
+
+
+class TestIncrementalRefresh:
+    def test_backfills_missing_range(self, store, today):
+        """Without stored bars the whole range is requested."""
+        start_ts, params, covered_from = app.plan_price_refresh('AAPL', '30d')
+        assert start_ts == (today - 29) * DAY
+        assert params == {'range': '30d'}
+        assert covered_from == start_ts
+
+    def test_fetches_from_last_stored_day(self, store, today):
+        """Once the range is on disk only bars from the last stored day on are requested."""
+        store.add_bars('AAPL', daily_bars(today - 40, today - 2), (today - 40) * DAY)
+        start_ts, params, covered_from = app.plan_price_refresh('AAPL', '30d')
+        assert params['period1'] == (today - 2) * DAY
+        assert params['period2'] >= params['period1']
+        assert covered_from == (today - 40) * DAY
+
+    def test_longer_range_backfills_again(self, store, today):
+        """A range reaching past covered_from is backfilled in one request."""
+        store.add_bars('AAPL', daily_bars(today - 29, today), (today - 29) * DAY)
+        assert app.plan_price_refresh('AAPL', '30d')[1].keys() == {'period1', 'period2'}
+        assert app.plan_price_refresh('AAPL', '1y')[1] == {'range': '1y'}
+
+    def test_load_price_history_merges_new_bars(self, store, today, monkeypatch):
+        """The first load backfills, the next only fetches the tail and both return the full range."""
+        requests = []
+
+        def fetch(yahoo_symbol, params):
+            requests.append(params)
+            first_day = today - 29 if 'range' in params else params['period1'] // DAY
+            return daily_bars(first_day, today)
+
+        monkeypatch.setattr(app, 'fetch_yahoo_bars', fetch)
+        first = app.load_price_history('AAPL', '30d')
+        second = app.load_price_history('AAPL', '30d')
+
+        assert requests[0] == {'range': '30d'}
+        assert requests[1]['period1'] == today * DAY
+        assert len(first['chart_data']['date']) == len(second['chart_data']['date']) == 30
+        assert second['data_source'] == 'Yahoo Finance (Real-time)'
+
+    def test_failed_refresh_serves_stored_bars(self, store, today, monkeypatch):
+        """When the fetch fails, stored bars are still returned and marked as such."""
+        store.add_bars('AAPL', daily_bars(today - 29, today - 1), (today - 29) * DAY)
+        monkeypatch.setattr(app, 'fetch_yahoo_bars', lambda yahoo_symbol, params: None)
+        stock_data = app.load_price_history('AAPL', '30d')
+        assert len(stock_data['chart_data']['date']) == 29
+        assert stock_data['data_source'] == 'Yahoo Finance (Stored)'
+
+    def test_nothing_stored_and_fetch_failed(self, store, monkeypatch):
+        """With no bars on disk a failed fetch gives None, as the plain chart fetch does."""
+        monkeypatch.setattr(app, 'fetch_yahoo_bars', lambda yahoo_symbol, params: None)
+        assert app.load_price_history('AAPL', '30d') is None
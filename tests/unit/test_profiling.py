@@ -0,0 +1,61 @@
+import pytest
+
+import app
+from app import PROFILED_CACHE_CONTROL
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', 'secret')
+    return app.app.test_client()
+
+
+class TestServerTiming:
+    def test_api_responses_carry_server_timing(self, client):
+        """API responses report the total time; other pages do not."""
+        assert 'total;dur=' in client.get('/api/search_stocks?q=aapl').headers['Server-Timing']
+        assert 'Server-Timing' not in client.get('/ping').headers
+
+
+class TestProfileRequests:
+    def test_disabled_without_token_configured(self, client, monkeypatch):
+        """With PROFILE_TOKEN unset no token is accepted, not even an empty one."""
+        monkeypatch.setattr(app, 'PROFILE_TOKEN', '')
+        response = client.get('/api/search_stocks?q=aapl&profile=1', headers={'X-Profile-Token': ''})
+        assert response.status_code == 403
+
+    def test_wrong_or_missing_token_is_forbidden(self, client):
+        """A missing or wrong X-Profile-Token gets a 403."""
+        assert client.get('/api/search_stocks?q=aapl&profile=1').status_code == 403
+        response = client.get('/api/search_stocks?q=aapl&profile=1', headers={'X-Profile-Token': 'guess'})
+        assert response.status_code == 403
+
+    def test_profile_is_added_to_object_payloads(self, client):
+        """A JSON object response gets the top functions under 'profile'."""
+        response = client.get('/api/circuit_breakers?profile=1', headers={'X-Profile-Token': 'secret'})
+        assert response.status_code == 200
+        profile = response.get_json()['profile']
+        assert profile['total_calls'] > 0
+        assert profile['hot_functions'] and profile['file'] is None
+
+    def test_profiled_response_is_private(self, client):
+        """A profiled response is never stored or revalidated, even on a cacheable endpoint."""
+        etag = client.get('/api/search_stocks?q=aapl').headers['ETag']
+        response = client.get('/api/search_stocks?q=aapl&profile=1',
+                              headers={'X-Profile-Token': 'secret', 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == PROFILED_CACHE_CONTROL
+        assert 'ETag' not in response.headers
+
+    def test_profile_saved_to_profile_dir(self, client, monkeypatch, tmp_path):
+        """With PROFILE_DIR set, a list payload points at the saved .prof file in a header."""
+        monkeypatch.setattr(app, 'PROFILE_DIR', str(tmp_path))
+        response = client.get('/api/search_stocks?q=aapl&profile=1', headers={'X-Profile-Token': 'secret'})
+        assert isinstance(response.get_json(), list)
+        path = response.headers['X-Profile-File']
+        assert path.startswith(str(tmp_path)) and path.endswith('.prof')
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_profile_flag_ignored_outside_api(self, client):
+        """?profile=1 only applies to /api/ endpoints."""
+        assert client.get('/ping?profile=1').status_code == 200
@@ -0,0 +1,132 @@
+import pytest
+
+import app
+from app import TTLCache, build_lexicon_index, find_lexicon_hits, get_lexicon_forms, tokenize_text
+
+
+@pytest.fixture(autouse=True)
+def fresh_sentiment_cache(monkeypatch):
+    monkeypatch.setattr(app, 'sentiment_cache', TTLCache())
+    monkeypatch.setattr(app, 'sentiment_store', None)
+
+
+class TestLexicon:
+    def test_inflected_forms(self):
+        """Lexicon words match their plurals and common verb and adjective endings."""
+        assert {'cuts', 'cutting'} <= get_lexicon_forms('cut')
+        assert {'rises', 'rising'} <= get_lexicon_forms('rise')
+        assert {'volatilities'} <= get_lexicon_forms('volatility')
+        assert {'dropped', 'dropping'} <= get_lexicon_forms('drop')
+        assert {'stronger', 'strongest'} <= get_lexicon_forms('strong')
+
+    def test_index_keeps_every_tag(self):
+        """A word in several lists counts towards each of them."""
+        index = build_lexicon_index({'a': ['growth'], 'b': ['growth', 'loss']})
+        assert index['growth'] == (('a', 'growth'), ('b', 'growth'))
+        assert index['losses'] == (('b', 'loss'),)
+
+    def test_whole_words_only(self):
+        """Tokens match whole lexicon forms, not substrings of longer words."""
+        assert find_lexicon_hits(tokenize_text('Highway traffic rallies')) == {
+            'positive': {'rally'}, 'keyword_positive': {'rally'}
+        }
+
+    def test_distinct_words_counted(self):
+        """Repeats and inflections of one word count once per tag."""
+        hits = find_lexicon_hits(tokenize_text('Profit rises, profits rising, profit!'))
+        assert hits['positive'] == {'profit', 'rise'}
+
+    def test_lexicon_bias(self):
+        """Each distinct positive word adds 0.1 and each negative word takes 0.1 from the VADER score."""
+        tokens = app.clean_sentiment_tokens('acme growth deal loss')
+        vader = app.vader_analyzer.polarity_scores(' '.join(tokens))['compound']
+        assert app.get_combined_sentiment_score(tokens) == pytest.approx(vader + 0.1)
+
+
+HEADLINES = [
+    'Apple shares surge after earnings beat estimates',
+    'Tesla stock falls as margins disappoint analysts',
+    'Infosys announces partnership to boost cloud revenue',
+    'Reliance faces regulatory concern over data practices',
+    'Walmart cuts guidance amid weak consumer demand',
+    'Nvidia to execute buyback plan, highlights record quarter',
+    'Zomato plunges on layoff reports and rising volatility',
+    'Markets close flat',
+    '',
+    '!!!'
+]
+
+
+class TestBatchScoring:
+    def test_matches_scalar(self, monkeypatch):
+        """Batch results equal analyze_sentiment_ml's, item for item, with nothing cached."""
+        scalar = [app.analyze_sentiment_ml(text) for text in HEADLINES]
+        monkeypatch.setattr(app, 'sentiment_cache', TTLCache())
+        assert app.analyze_sentiment_ml_batch(HEADLINES) == scalar
+        assert {result['sentiment'] for result in scalar} == {'Positive', 'Negative', 'Neutral'}
+
+    def test_empty_text_is_neutral(self):
+        """Texts without words score Neutral at 0.5 and aren't cached."""
+        assert app.analyze_sentiment_ml_batch(['', '...']) == [{'sentiment': 'Neutral', 'confidence': 0.5}] * 2
+        assert app.sentiment_cache.stats()['entries'] == 0
+
+    def test_repeats_scored_once(self, monkeypatch):
+        """Texts that clean to the same tokens are scored once and get equal, separate results."""
+        scored = []
+        original = app.get_combined_sentiment_score
+        monkeypatch.setattr(app, 'get_combined_sentiment_score', lambda tokens: scored.append(tokens) or original(tokens))
+        results = app.analyze_sentiment_ml_batch(['Profit rises!', 'profit rises', 'Loss widens'])
+        assert len(scored) == 2
+        assert results[0] == results[1] and results[0] is not results[1]
+
+    def test_cached_results_reused(self, monkeypatch):
+        """A second batch is answered from the sentiment cache without scoring."""
+        first = app.analyze_sentiment_ml_batch(HEADLINES)
+        monkeypatch.setattr(app, 'get_combined_sentiment_score', lambda tokens: pytest.fail('scored again'))
+        assert app.analyze_sentiment_ml_batch(HEADLINES) == first
+
+
+class TestSentimentMemo:
+    @pytest.fixture
+    def store(self, tmp_path, monkeypatch):
+        store = app.SQLiteSentimentStore(str(tmp_path / 'sentiment.db'), max_rows=100)
+        monkeypatch.setattr(app, 'sentiment_store', store)
+        return store
+
+    def test_store_round_trip(self, store, tmp_path):
+        """Results written by one store are read back by another on the same file."""
+        store.set('k', {'sentiment': 'Positive', 'confidence': 0.82})
+        assert store.get('k') == {'sentiment': 'Positive', 'confidence': 0.82}
+        assert store.get('missing') is None
+        reopened = app.SQLiteSentimentStore(store.path, max_rows=100)
+        assert reopened.get('k') == {'sentiment': 'Positive', 'confidence': 0.82}
+        assert (store.hits, store.misses, store.errors) == (1, 1, 0)
+
+    def test_store_trims_oldest(self, store, monkeypatch):
+        """Every 1000 writes the table is cut back to max_rows, keeping the newest."""
+        clock = iter(range(1, 10000))
+        monkeypatch.setattr(app.time, 'time', lambda: next(clock))
+        for i in range(1000):
+            store.set(f"k{i}", {'sentiment': 'Neutral', 'confidence': 0.5})
+        assert store.get('k999') is not None
+        assert store.get('k899') is None
+        assert store._connect().execute('SELECT COUNT(*) FROM sentiment_cache').fetchone()[0] == 100
+
+    def test_disk_result_fills_memory(self, store):
+        """A result found only on disk is copied into the in-memory cache."""
+        key = app.get_sentiment_cache_key(app.clean_sentiment_tokens('Profit rises'))
+        store.set(key, {'sentiment': 'Positive', 'confidence': 0.9})
+        assert app.analyze_sentiment_ml('Profit rises!') == {'sentiment': 'Positive', 'confidence': 0.9}
+        assert app.sentiment_cache.peek(key) == {'sentiment': 'Positive', 'confidence': 0.9}
+
+    def test_key_ignores_case_and_punctuation(self):
+        """Headlines that differ only in case and punctuation share a key, versioned by the word lists."""
+        key = app.get_sentiment_cache_key(app.clean_sentiment_tokens('Apple beats estimates!'))
+        assert key == app.get_sentiment_cache_key(app.clean_sentiment_tokens('apple  BEATS estimates'))
+        assert key.startswith(app.SENTIMENT_CACHE_VERSION + ':')
+
+    def test_results_are_copies(self):
+        """Callers can't change a memoized result through the dict they were given."""
+        first = app.analyze_sentiment_ml('Profit rises')
+        first['sentiment'] = 'changed'
+        assert app.analyze_sentiment_ml('Profit rises')['sentiment'] != 'changed'
@@ -0,0 +1,151 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+import app
+from app import DailySentimentSeries, SQLiteNewsArchive, compute_daily_sentiment
+
+DAY = 86400
+TODAY = int(time.time()) // DAY
+# 30 daily chart points ending today, in milliseconds like chart_data['date']
+DATES = [(TODAY - 29 + i) * DAY * 1000 for i in range(30)]
+LABELS = ['Positive', 'Negative', 'Neutral']
+
+
+def news_item(i, days_ago, **fields):
+    return dict({
+        'title': f"Headline {i}",
+        'summary': '',
+        'link': f"https://example.com/{i}",
+        'publisher': 'Wire',
+        'published': (TODAY - days_ago) * DAY + 3600 + i,
+        'sentiment': LABELS[i % 3],
+        'confidence': 0.5 + (i % 5) / 10
+    }, **fields)
+
+
+def candidate(item):
+    return (app.get_news_item_id(item), f"{item['title']} {item['summary']}", item)
+
+
+class TestComputeDailySentiment:
+    def test_news_lands_on_next_trading_day(self):
+        """News from a day without a chart point counts on the next one; older news is ignored."""
+        dates = [DATES[0], DATES[2]]
+        days = np.array([TODAY - 31, TODAY - 28], dtype=np.int64)
+        columns = compute_daily_sentiment(dates, days, np.array([1.0, -0.5]), np.array([1.0, 0.5]), np.array([1.0, 1.0]))
+        assert columns['news_count'] == [0, 1]
+        assert columns['daily'] == [None, -1.0]
+        assert columns['sentiment'] == [0.0, -1.0]
+
+    def test_empty_chart(self):
+        """No chart points give empty columns."""
+        columns = compute_daily_sentiment([], np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0))
+        assert columns['date'] == [] and columns['mean_7d'] == []
+
+
+class TestDailySentimentSeries:
+    def test_appending_updates_only_its_day(self):
+        """A new item touches only its own day and the result matches a rebuild from every item."""
+        items = [news_item(i, i % 20) for i in range(40)]
+        series = DailySentimentSeries()
+        series.add_items(items)
+        before = series.get_series(DATES)
+
+        late = news_item(99, 3, sentiment='Negative', confidence=0.9)
+        assert series.add_items([late]) == {TODAY - 3}
+        after = series.get_series(DATES)
+
+        rebuilt = DailySentimentSeries()
+        rebuilt.add_items(items + [late])
+        assert after == rebuilt.get_series(DATES)
+        changed = [i for i in range(30) if before['daily'][i] != after['daily'][i] or before['news_count'][i] != after['news_count'][i]]
+        assert changed == [DATES.index((TODAY - 3) * DAY * 1000)]
+
+    def test_seen_items_are_not_counted_again(self):
+        """Adding the same items again changes nothing and keeps the memoized series."""
+        items = [news_item(i, i % 10) for i in range(12)]
+        series = DailySentimentSeries()
+        series.add_items(items)
+        first = series.get_series(DATES)
+        assert series.add_items(items) == set()
+        assert series.get_series(DATES) is first
+
+    def test_order_does_not_matter(self):
+        """The series depends on the set of copies, not the order they were added in."""
+        items = [news_item(i, i % 7, cluster_id=f"story{i % 9}") for i in range(60)]
+        expected = DailySentimentSeries()
+        expected.add_items(items)
+        for seed in range(5):
+            shuffled = items[:]
+            random.Random(seed).shuffle(shuffled)
+            series = DailySentimentSeries()
+            for start in range(0, len(shuffled), 7):
+                series.add_items(shuffled[start:start + 7])
+            assert series.get_series(DATES) == expected.get_series(DATES)
+
+    def test_copies_count_once_on_the_earliest_day(self):
+        """Copies of a story add weight to one story, which moves to an earlier copy's day."""
+        series = DailySentimentSeries()
+        series.add_items([news_item(1, 2, cluster_id='story', sentiment='Positive')])
+        assert series.add_items([news_item(2, 2, cluster_id='story', sentiment='Negative')]) == {TODAY - 2}
+        columns = series.get_series(DATES)
+        assert columns['news_count'][-3] == 1
+        assert columns['daily'][-3] == 1.0
+
+        assert series.add_items([news_item(3, 5, cluster_id='story', sentiment='Negative')]) == {TODAY - 2, TODAY - 5}
+        columns = series.get_series(DATES)
+        assert columns['news_count'][-3] == 0 and columns['news_count'][-6] == 1
+        assert columns['daily'][-6] == -1.0
+
+    def test_collapsed_items_grow_with_cluster_size(self):
+        """A collapsed item seen again with more copies only adds the new copies."""
+        series = DailySentimentSeries()
+        series.add_items([news_item(1, 1, cluster_size=2)])
+        assert series.add_items([news_item(1, 1, cluster_size=2)]) == set()
+        assert series.add_items([news_item(1, 1, cluster_size=3)]) == {TODAY - 1}
+        assert series._stories[app.get_news_item_id(news_item(1, 1))][0] == 3
+
+
+class TestGenerateStockSentimentData:
+    def test_placeholders_are_ignored(self):
+        """Generic padding items don't pull the series toward neutral."""
+        items = [news_item(i, 1, sentiment='Positive') for i in range(2)]
+        placeholder = news_item(9, 1, sentiment='Neutral', is_placeholder=True)
+        columns = app.generate_stock_sentiment_data('TEST.PLACEHOLDER', {'date': DATES}, items + [placeholder])
+        assert columns['news_count'][-2] == 2
+        assert columns['daily'][-2] == 1.0
+
+    @pytest.fixture
+    def archive(self, tmp_path, monkeypatch):
+        archive = SQLiteNewsArchive(str(tmp_path / 'news.db'))
+        monkeypatch.setattr(app, 'news_archive', archive)
+        return archive
+
+    def test_archive_copies_join_their_story(self, archive):
+        """A later copy of an archived story is stored under its cluster ID and counted as the same story."""
+        story = news_item(1, 4, title='Acme shares surge after record quarterly earnings beat analyst estimates')
+        app.archive_news_candidates('ACME', [candidate(story), candidate(news_item(2, 6))])
+        first = app.generate_stock_sentiment_data('ACME', {'date': DATES}, [])
+        assert sum(first['news_count']) == 2
+
+        copy = dict(story, link='https://example.com/syndicated', title=story['title'] + ' - Reuters', published=story['published'] + 600)
+        app.archive_news_candidates('ACME', [candidate(story), candidate(copy), candidate(news_item(3, 1))])
+        assert archive.get_known_clusters([candidate(copy)[0]]) == {candidate(copy)[0]: candidate(story)[0]}
+
+        second = app.generate_stock_sentiment_data('ACME', {'date': DATES}, [])
+        assert sum(second['news_count']) == 3
+        rebuilt = DailySentimentSeries()
+        rebuilt.sync_archive(archive, 'ACME', DATES[0] // 1000)
+        assert second == rebuilt.get_series(DATES)
+
+    def test_moving_window_starts_over(self, archive):
+        """A later chart start drops stories published before it."""
+        app.archive_news_candidates('MOVE', [candidate(news_item(1, 20)), candidate(news_item(2, 2))])
+        series = DailySentimentSeries()
+        series.sync_archive(archive, 'MOVE', DATES[0] // 1000)
+        assert sum(series.get_series(DATES)['news_count']) == 2
+        series.sync_archive(archive, 'MOVE', DATES[15] // 1000)
+        assert sum(series.get_series(DATES[15:])['news_count']) == 1
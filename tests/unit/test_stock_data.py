@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+from app import TTLCache
+
+CHART = {
+    'chart_data': {'date': [1700000000000], 'price': [100.0], 'volume': [1]},
+    'current_price': 100.0, 'price_change': 0.0, 'price_change_percent': 0.0,
+    'data_timestamp': '2024-01-01T00:00:00', 'data_source': 'Yahoo Finance (Real-time)'
+}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TTLCache(stale_ttl=3600)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(app, 'stock_data_cache', cache)
+    monkeypatch.setattr(app, 'upstream_executor', executor)
+    yield cache
+    executor.shutdown(wait=True)
+
+
+def store_expired(cache, key, value, age):
+    """An entry fetched age seconds ago that expired a second ago"""
+    now = time.monotonic()
+    cache._entries[key] = (now - 1, value, now - age)
+
+
+def wait_for_refresh():
+    # One worker, so anything submitted after the refresh runs after it
+    app.upstream_executor.submit(lambda: None).result(5)
+
+
+class TestLastKnownGood:
+    def test_fresh_copy(self, cache, monkeypatch):
+        """A live entry is returned as a copy without an age."""
+        monkeypatch.setattr(app, 'load_stock_chart', lambda *args: pytest.fail('loaded'))
+        cache.set('AAPL', CHART, 60)
+        stock_data = app.get_real_stock_data('AAPL')
+        assert stock_data == CHART and stock_data is not CHART
+
+    def test_stale_copy_served_while_refreshing(self, cache, monkeypatch):
+        """An expired entry is returned at once with its age and reloaded in the background."""
+        monkeypatch.setattr(app, 'load_stock_chart', lambda *args: dict(CHART, current_price=101.0))
+        store_expired(cache, 'AAPL', CHART, 2 * 3600 + 60)
+        stock_data = app.get_real_stock_data('AAPL')
+        assert stock_data['current_price'] == 100.0
+        assert stock_data['data_age_seconds'] >= 2 * 3600 + 60
+        assert stock_data['data_source'] == 'Yahoo Finance (Real-time) (Last known good, 2h old)'
+        assert stock_data['data_timestamp'] == CHART['data_timestamp']
+        wait_for_refresh()
+        assert cache.peek('AAPL')['current_price'] == 101.0
+        assert 'data_age_seconds' not in app.get_real_stock_data('AAPL')
+
+    def test_failed_refresh_keeps_stale_copy(self, cache, monkeypatch):
+        """A refresh that fails leaves the stale copy for the next request."""
+        def load_stock_chart(*args):
+            raise ConnectionError('upstream down')
+
+        monkeypatch.setattr(app, 'load_stock_chart', load_stock_chart)
+        store_expired(cache, 'AAPL', CHART, 120)
+        assert app.get_real_stock_data('AAPL')['current_price'] == 100.0
+        wait_for_refresh()
+        assert app.get_real_stock_data('AAPL')['data_age_seconds'] >= 120
+
+    def test_simulated_without_any_copy(self, cache, monkeypatch):
+        """With nothing cached and the fetch failing, placeholder prices are returned and not cached."""
+        monkeypatch.setattr(app, 'load_stock_chart', lambda *args: None)
+        assert app.get_real_stock_data('AAPL')['data_source'] == app.SIMULATED_DATA_SOURCE
+        assert cache.stats()['entries'] == 0
+
+    def test_stale_prices_not_cached_downstream(self):
+        """Responses built from a last-known-good copy are sent with max-age=0."""
+        stale = app.mark_stale_stock_data(CHART, 300)
+        assert app.get_stock_data_max_age('AAPL', stale) == 0
+        assert app.get_analysis_cache_control('AAPL', dict(stale, news_items=[])) == app.build_cache_control(0)
+
+    def test_format_data_age(self):
+        """Ages are shown in their largest whole unit."""
+        assert [app.format_data_age(s) for s in (45, 720, 3 * 3600 + 5, 2 * 86400)] == ['45s', '12m', '3h', '2d']
@@ -0,0 +1,80 @@
+import random
+import string
+
+import app
+from app import Listing, SymbolRegistry
+
+LISTINGS = [
+    Listing('TCS', 'Tata Consultancy Services', 'NSE', 'INR', 'TCS.NS'),
+    Listing('TATAMOTORS', 'Tata Motors Limited', 'NSE', 'INR', 'TATAMOTORS.NS'),
+    Listing('TSLA', 'Tesla Inc.', 'NASDAQ', 'USD', 'TSLA'),
+    Listing('META', 'Meta Platforms Inc.', 'NASDAQ', 'USD', 'META'),
+    Listing('T', 'AT&T Inc.', 'NYSE', 'USD', 'T'),
+    Listing('DMART', 'Avenue Supermarts (DMart)', 'NSE', 'INR', 'DMART.NS')
+]
+
+
+def reference_search(registry, query, limit=20):
+    """search() by a linear scan: rank every listing, then order by rank and file position"""
+    query = query.strip().lower()
+    if not query:
+        return []
+    ranked = []
+    for position, listing in enumerate(registry.listings):
+        symbol, name = listing.symbol.lower(), listing.name.lower()
+        if symbol == query:
+            rank = 0
+        elif symbol.startswith(query):
+            rank = 1
+        elif name.startswith(query):
+            rank = 2
+        elif any(word.startswith(query) for word in name.split()):
+            rank = 3
+        elif len(query) >= 3 and (query in symbol or query in name):
+            rank = 4
+        else:
+            continue
+        ranked.append((rank, position, listing))
+    return [listing for _, _, listing in sorted(ranked)][:limit]
+
+
+class TestSymbolRegistry:
+    def test_lookup(self):
+        """Listings are found by symbol in O(1) and carry their Yahoo symbol."""
+        registry = SymbolRegistry(LISTINGS)
+        assert registry.get('TCS').yahoo_symbol == 'TCS.NS'
+        assert 'TSLA' in registry and 'NOPE' not in registry
+        assert len(registry) == len(LISTINGS)
+        assert registry.symbols()[:2] == ['TCS', 'TATAMOTORS']
+
+    def test_ranking(self):
+        """Exact symbol, then symbol prefix, name prefix, word prefix and substring matches."""
+        registry = SymbolRegistry(LISTINGS)
+        assert [listing.symbol for listing in registry.search('t')] == ['T', 'TCS', 'TATAMOTORS', 'TSLA']
+        assert [listing.symbol for listing in registry.search('motors')] == ['TATAMOTORS']
+        assert [listing.symbol for listing in registry.search('mart')] == ['DMART']
+        assert [listing.symbol for listing in registry.search('  Tesla ')] == ['TSLA']
+        assert registry.search('') == [] and registry.search('zzz') == []
+
+    def test_limit(self):
+        """search() stops at limit results."""
+        assert len(SymbolRegistry(LISTINGS).search('t', limit=2)) == 2
+
+    def test_matches_linear_scan(self):
+        """On the bundled listings, search() agrees with a linear scan for random queries."""
+        registry = app.symbol_registry
+        rng = random.Random(7)
+        queries = ['a', 'ba', 'ind', 'bank', 'ltd', 'inc.', 'hdfcbank', 'technologies', 'consultancy services']
+        for listing in rng.sample(registry.listings, min(40, len(registry.listings))):
+            text = rng.choice([listing.symbol, listing.name])
+            start = rng.randrange(len(text))
+            queries.append(text[start:start + rng.randint(1, 12)])
+        queries += [''.join(rng.choice(string.ascii_lowercase) for _ in range(3)) for _ in range(20)]
+        for query in queries:
+            for limit in (5, 20):
+                assert registry.search(query, limit) == reference_search(registry, query, limit), query
+
+    def test_search_endpoint(self):
+        """/api/search_stocks returns symbol, name and display text."""
+        results = app.app.test_client().get('/api/search_stocks?q=AAPL').get_json()
+        assert results[0] == {'symbol': 'AAPL', 'name': 'Apple Inc.', 'display': 'AAPL - Apple Inc.'}
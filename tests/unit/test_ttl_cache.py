@@ -0,0 +1,173 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import TTLCache
+
+
+class TestTTLCache:
+    def test_get_counts_hits_and_misses(self):
+        """A stored value is returned until it expires; lookups are counted."""
+        cache = TTLCache()
+        assert cache.get('a') is None
+        cache.set('a', 1, 60)
+        assert cache.get('a') == 1
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+    def test_expired_entry_is_a_miss(self):
+        """An entry past its TTL is not returned and, without stale_ttl, is dropped."""
+        cache = TTLCache()
+        cache.set('a', 1, 0)
+        assert cache.get('a') is None
+        assert cache.stats()['entries'] == 0
+
+    def test_evicts_least_recently_used(self):
+        """Reading an entry protects it from eviction."""
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get('a')
+        cache.set('c', 3, 60)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        assert cache.evictions == 1
+
+    def test_peek_does_not_count(self):
+        """peek leaves the counters to record_lookup."""
+        cache = TTLCache()
+        cache.set('a', 1, 60)
+        assert cache.peek('a') == 1
+        assert cache.peek('b') is None
+        assert (cache.hits, cache.misses) == (0, 0)
+        cache.record_lookup('hit')
+        cache.record_lookup('coalesced')
+        assert (cache.hits, cache.misses, cache.coalesced) == (1, 0, 1)
+
+    def test_get_or_load_coalesces_concurrent_misses(self):
+        """Concurrent misses for one key run the loader once and share its result."""
+        cache = TTLCache()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(cache.get_or_load, 'a', loader, 60) for _ in range(4)]
+            # Let every caller reach the cache before the leader finishes
+            while cache.misses + cache.coalesced < 4:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result(5) for future in futures]
+
+        assert results == ['value'] * 4
+        assert len(calls) == 1
+        assert (cache.misses, cache.coalesced) == (1, 3)
+        assert cache.get_or_load('a', loader, 60) == 'value'
+        assert cache.hits == 1
+
+    def test_get_or_load_does_not_cache_none(self):
+        """A None result is returned but the next call loads again."""
+        cache = TTLCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+
+        assert cache.get_or_load('a', loader, 60) is None
+        assert cache.get_or_load('a', loader, 60) is None
+        assert len(calls) == 2
+
+    def test_get_or_load_propagates_loader_errors(self):
+        """A failed load raises and leaves nothing cached or in flight."""
+        cache = TTLCache()
+
+        def loader():
+            raise ValueError('upstream down')
+
+        with pytest.raises(ValueError):
+            cache.get_or_load('a', loader, 60)
+        assert cache.get_or_load('a', lambda: 2, 60) == 2
+
+    def test_get_stale_within_stale_ttl(self):
+        """With stale_ttl an expired entry is still available through get_stale."""
+        cache = TTLCache(stale_ttl=60)
+        cache.set('a', 1, 0)
+        assert cache.get('a') is None
+        value, age = cache.get_stale('a')
+        assert value == 1 and age >= 0
+        assert cache.stale_hits == 1
+        assert TTLCache().get_stale('a') == (None, None)
+
+    def test_get_or_revalidate_serves_stale_and_refreshes_once(self):
+        """A stale copy is returned at once while a single background load replaces it."""
+        cache = TTLCache(stale_ttl=60)
+        cache.set('a', 'old', 0)
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return 'new'
+
+        with ThreadPoolExecutor(2) as executor:
+            first = cache.get_or_revalidate('a', loader, 60, executor)
+            second = cache.get_or_revalidate('a', loader, 60, executor)
+            release.set()
+
+        assert first[0] == 'old' and first[1] is not None
+        assert second[0] == 'old'
+        assert len(calls) == 1
+        assert cache.get_or_revalidate('a', loader, 60, None) == ('new', None)
+
+    def test_get_or_revalidate_without_copy_loads(self):
+        """With nothing cached it blocks on the load like get_or_load."""
+        cache = TTLCache(stale_ttl=60)
+        assert cache.get_or_revalidate('a', lambda: 1, 60, None) == (1, None)
+
+    def test_refresh_replaces_live_entry(self):
+        """refresh reloads even a live entry and doesn't count a lookup."""
+        cache = TTLCache()
+        cache.set('a', 'old', 60)
+        assert cache.refresh('a', lambda: 'new', 60) == 'new'
+        assert cache.peek('a') == 'new'
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_refresh_joins_inflight_load(self):
+        """A refresh during a get_or_load waits for that load instead of starting its own, and vice versa."""
+        cache = TTLCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return len(calls)
+
+        with ThreadPoolExecutor(2) as executor:
+            loading = executor.submit(cache.get_or_load, 'a', loader, 60)
+            assert started.wait(5)
+            refreshing = executor.submit(cache.refresh, 'a', loader, 60)
+            time.sleep(0.05)
+            release.set()
+            assert loading.result(5) == refreshing.result(5) == 1
+        assert len(calls) == 1
+
+        started.clear()
+        release.clear()
+        with ThreadPoolExecutor(2) as executor:
+            refreshing = executor.submit(cache.refresh, 'b', loader, 60)
+            assert started.wait(5)
+            loading = executor.submit(cache.get_or_load, 'b', loader, 60)
+            time.sleep(0.05)
+            release.set()
+            assert refreshing.result(5) == loading.result(5) == 2
+        assert cache.coalesced == 1